@@ -1,6 +1,14 @@
+import hashlib
+
 import streamlit as st
 import google.generativeai as genai
 from PIL import Image
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from backend import MODEL_NAME
+from prompts import get_variant
+from quality_check import REJECT, check_quality
+from usage import UsageStore, usage_counts
 
 # ==========================================
 # 1. 기본 설정
@@ -20,15 +28,21 @@ else:
 
 genai.configure(api_key=API_KEY)
 
-# 모델 설정
-MODEL_NAME = "gemini-2.5-flash" 
-
 st.set_page_config(
     page_title="Parenting Without Borders",
     page_icon="♡",
     layout="centered"
 )
 
+# secrets.toml 의 [quality] 표로 기준값을 바꿀 수 있습니다 (app.py 와 같은 표).
+QUALITY_THRESHOLDS = dict(st.secrets.get("quality", {}))
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_quality(image_hash, _image, thresholds):
+    # 같은 사진이면 재실행(언어/테마 변경, 체크박스)마다 다시 검사하지 않습니다.
+    return check_quality(_image, thresholds)
+
 # ==========================================
 # 2. 테마 설정 및 CSS
 # ==========================================
@@ -216,9 +230,18 @@ with st.container():
         st.markdown("### Preview")
         st.image(image, caption="Homework Image", use_column_width=True)
         
+        # 흐리거나 반사가 심한 사진은 API 를 부르기 전에 다시 찍도록 안내합니다.
+        quality = cached_quality(hashlib.sha256(image_data.getvalue()).hexdigest(), image, QUALITY_THRESHOLDS)
+        for level, message in quality.issues:
+            if level == REJECT:
+                st.error(f"📷 {message}")
+            else:
+                st.warning(f"📷 {message}")
+        blocked = quality.rejected and not st.checkbox("Send it anyway")
+        
         st.markdown("###") 
         
-        submit = st.button("🚀 Translate & Explain", type="primary", use_container_width=True)
+        submit = st.button("🚀 Translate & Explain", type="primary", use_container_width=True, disabled=blocked)
 
         if submit:
             status_text = st.empty()
@@ -228,21 +251,18 @@ with st.container():
                 p_lang = parent_lang.split("(")[0].strip()
                 t_lang = target_lang
                 
-                real_prompt = f"""
-                **Role:** You are a helpful AI tutor for parents.
-                **Goal:** Analyze the homework image (Language: {t_lang}) and explain it in **{p_lang}**.
-                
-                **Output Format:**
-                1. **Overview**: What is this homework about? (Subject, Topic)
-                2. **Detailed Explanation**: Translate and explain the questions step-by-step in {p_lang}.
-                3. **Vocabulary**: Key words table ({t_lang} -> {p_lang}).
-                4. **Coaching Tip**: How should the parent ask the child? (Provide sentences in {t_lang} and {p_lang}).
-                
-                **Constraint:** The final explanation must be in **{p_lang}**.
-                """
+                # 프롬프트는 prompts.py 레지스트리에서 가져옵니다 (이 화면의 기본값은 tutor@1).
+                variant = get_variant(st.secrets.get("PROMPT_VARIANT", "tutor@1"))
+                real_prompt = variant.render(p_lang, t_lang)
                 
                 model = genai.GenerativeModel(MODEL_NAME)
                 response = model.generate_content([real_prompt, image])
+                # app.py 와 같은 사용량 파일에 남겨서 프롬프트 버전끼리 비용을 비교합니다.
+                counts = usage_counts(response)
+                if counts is not None:
+                    ctx = get_script_run_ctx()
+                    session = ctx.session_id if ctx is not None else "background"
+                    UsageStore().record(session, p_lang, t_lang, MODEL_NAME, f"{variant.key}:{variant.hash[:8]}", counts)
                 
                 status_text.success("✅ Analysis Complete!")
                 
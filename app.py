@@ -1,21 +1,138 @@
+import time
+
+# 프로세스의 첫 실행은 아래 import 시간까지 포함해서 잽니다 (cold_start).
+RUN_STARTED = time.perf_counter()
+
+import importlib
+import json
+import os
+import threading
+
 import streamlit as st
-import google.generativeai as genai
-from PIL import Image
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from backend import MODEL_NAME, ReplayModel, RecordingModel
+from batch import run_batch
+from guide import (
+    SECTION_NAMES,
+    SECTION_TITLES,
+    GuideError,
+    guide_schema,
+    parse_guide,
+    parse_partial_sections,
+    section_markdown,
+    validate_guide,
+)
+from image_prep import PREVIEW_WIDTH, THUMBNAIL_WIDTH, PreparedImage, normalize_image, normalize_upload, preview_bytes
+from jobs import DONE as JOB_DONE
+from jobs import FAILED as JOB_FAILED
+from jobs import FINISHED as JOB_FINISHED
+from jobs import QUEUED as JOB_QUEUED
+from jobs import JobQueue
+from metrics import DEFAULT_METRICS_PATH, REGISTRY, span, start_file_exporter, start_http_exporter
+from prefetch import Prefetcher
+from prompts import (
+    EXTRACTION_PROMPT,
+    EXTRACTION_PROMPT_HASH,
+    GUIDE_PROMPT_HASH,
+    build_guide_prompt,
+    get_variant,
+)
+from result_cache import ResultCache, image_fingerprint, make_key
+from routing import DEFAULT_TIERS, Router
+from scheduler import Scheduler
+from theme import HEADER_HTML, STYLESHEETS, THEME_VARS, theme_name
+from upload_store import UploadExpired, UploadStore
+from usage import DEFAULT_PRICES, Budget, UsageStore, cost_usd, scoped_session, session_scope, usage_counts
+from usage import today as usage_today
+from vocab_memory import TranslationMemory, lemma
 
 # ==========================================
 # 1. 기본 설정
 # ==========================================
-if "GOOGLE_API_KEY" in st.secrets:
-    API_KEY = st.secrets["GOOGLE_API_KEY"]
+
+def load_secrets():
+    # secrets.toml 은 세션의 첫 실행 때 한 번만 읽어 평범한 dict 로 남기고, 재실행은 그 dict 에서 읽습니다.
+    # API 키는 세션에 남기지 않습니다 (아래에서 따로 한 번만 읽음).
+    if "secrets" not in st.session_state:
+        try:
+            secrets = {key: st.secrets[key] for key in st.secrets if key != "GOOGLE_API_KEY"}
+        except FileNotFoundError:
+            secrets = {}
+        st.session_state["secrets"] = secrets
+    return st.session_state["secrets"]
+
+
+SECRETS = load_secrets()
+
+# live: 실제 API / record: 실제 API + 응답 녹화 / replay: 녹화(없으면 가짜 응답)로만 동작 (backend.py)
+GEMINI_BACKEND = SECRETS.get("GEMINI_BACKEND", "live")
+
+
+@st.cache_resource
+def load_api_key():
+    # API 키는 프로세스당 한 번만 읽고 세션 상태에는 남기지 않습니다.
+    # 키가 없으면 예외가 그대로 올라가서 캐시되지 않으므로, secrets.toml 을 고친 뒤 다시 읽습니다.
+    return st.secrets["GOOGLE_API_KEY"]
+
+
+if GEMINI_BACKEND == "replay":
+    # 녹화된 응답만 쓰면 API 키가 없어도 됩니다.
+    API_KEY = None
 else:
     try:
-        API_KEY = st.secrets["GOOGLE_API_KEY"]
-    except:
+        API_KEY = load_api_key()
+    except Exception:
         st.error("API 키를 찾을 수 없습니다. secrets.toml 파일을 확인해주세요.")
         st.stop()
 
-genai.configure(api_key=API_KEY)
-MODEL_NAME = "gemini-2.5-flash"
+# 캐시/작업 큐/사용량/녹화 파일을 둘 폴더. 벤치마크는 임시 폴더를 줘서 실제 데이터와 섞이지 않게 합니다.
+CACHE_DIR = SECRETS.get("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+IMAGE_MAX_EDGE = int(SECRETS.get("IMAGE_MAX_EDGE", 1600))
+IMAGE_FORMAT = SECRETS.get("IMAGE_FORMAT", "JPEG")
+BATCH_CONCURRENCY = int(SECRETS.get("BATCH_CONCURRENCY", 4))
+# 유사 사진 답변 재사용은 기본으로 꺼 둡니다. 켜면 해시 후보를 썸네일로 한 번 더 확인한 뒤에만 재사용합니다.
+PHASH_ENABLED = bool(SECRETS.get("PHASH_ENABLED", False))
+PHASH_MAX_DISTANCE = int(SECRETS.get("PHASH_MAX_DISTANCE", 2))
+PHASH_MAX_PIXEL_DIFF = float(SECRETS.get("PHASH_MAX_PIXEL_DIFF", 14.0))
+# 2단계 모드는 1단계 추출(JSON 전체가 있어야 쓸 수 있어 스트리밍하지 않음)이 끝나야 2단계 스트리밍이 시작되므로
+# 첫 내용이 단일 호출보다 늦게 보입니다. 대신 언어만 바꾼 재실행과 섹션 재생성은 이미지를 다시 보내지 않습니다.
+# 차이는 bench_first_content.py 로 잽니다.
+TWO_STAGE = bool(SECRETS.get("TWO_STAGE", True))
+# 단일 호출 모드(TWO_STAGE = false)에서 쓸 프롬프트. prompts.PROMPT_VARIANTS 의 "이름@버전" 또는 이름.
+ACTIVE_PROMPT = get_variant(SECRETS.get("PROMPT_VARIANT", "tutor@3"))
+TILE_MAX_BLOCKS = int(SECRETS.get("TILE_MAX_BLOCKS", 6))
+BACKGROUND_JOBS = bool(SECRETS.get("BACKGROUND_JOBS", True))
+JOB_WORKERS = int(SECRETS.get("JOB_WORKERS", 8))
+# 업로드 사진 바이트를 메모리에 올려둘 한도 (세션별 / 서버 전체). 넘치면 디스크에서 다시 읽습니다.
+UPLOAD_SESSION_MB = float(SECRETS.get("UPLOAD_SESSION_MB", 4))
+UPLOAD_GLOBAL_MB = float(SECRETS.get("UPLOAD_GLOBAL_MB", 128))
+# 업로드하자마자 분석을 미리 시작합니다 (기본은 꺼짐, 사이드바에서 켤 수 있음).
+PREFETCH = bool(SECRETS.get("PREFETCH", False))
+# 어휘 번역 메모리: 아는 단어는 미리 채우고 모델에게는 새 단어만 받습니다 (2단계 가이드에서만).
+VOCAB_MEMORY = bool(SECRETS.get("VOCAB_MEMORY", True))
+# 모델 등급 표: secrets.toml 의 [[model_tiers]] 로 바꿀 수 있습니다 (routing.DEFAULT_TIERS 참고).
+# 가벼운 등급부터 적고, 조건(max_blocks / max_questions)과 deadline(초)을 붙입니다.
+MODEL_TIERS = [dict(tier) for tier in SECRETS.get("model_tiers", DEFAULT_TIERS)]
+HEDGE_AFTER = float(SECRETS.get("HEDGE_AFTER", 10.0))
+HEDGING = bool(SECRETS.get("HEDGING", True))
+# 단계별 지연: 파일(Prometheus 텍스트)로 내보내고, METRICS_PORT 를 주면 로컬 /metrics 도 엽니다.
+METRICS_FILE = SECRETS.get("METRICS_FILE", os.path.join(CACHE_DIR, os.path.basename(DEFAULT_METRICS_PATH)))
+METRICS_PORT = int(SECRETS.get("METRICS_PORT", 0))
+DEBUG_PANEL = bool(SECRETS.get("DEBUG_PANEL", False))
+# 토큰 예산 (0 이면 제한 없음). 하루 전체 / 브라우저 세션 하나 기준입니다.
+DAILY_TOKEN_BUDGET = int(SECRETS.get("DAILY_TOKEN_BUDGET", 0))
+SESSION_TOKEN_BUDGET = int(SECRETS.get("SESSION_TOKEN_BUDGET", 0))
+# 100만 토큰당 USD (입력, 출력). [prices] 표에 "모델 이름" = [입력, 출력] 으로 적습니다.
+PRICES = {**DEFAULT_PRICES, **{name: tuple(price) for name, price in SECRETS.get("prices", {}).items()}}
+# 미리 보여주는 예상치: count_tokens 로 센 입력 + 페이지당 출력(2단계 입력 포함) 어림값
+PREFLIGHT_OUTPUT_TOKENS = int(SECRETS.get("PREFLIGHT_OUTPUT_TOKENS", 2500))
+# secrets.toml 의 [quality] 표로 기준값을 바꿀 수 있습니다 (quality_check.DEFAULT_THRESHOLDS 참고).
+QUALITY_THRESHOLDS = dict(SECRETS.get("quality", {}))
+
+# .streamlit/config.toml 없이 띄우면 정적 파일을 못 쓰므로 스타일시트를 직접 넣습니다 (theme.stylesheet).
+STATIC_SERVING = bool(st.get_option("server.enableStaticServing"))
 
 st.set_page_config(
     page_title="Super Parents: Heroes Across Languages",
@@ -26,137 +143,1146 @@ st.set_page_config(
 # ==========================================
 # [AI Function] - 문제 해결 능력 대폭 강화
 # ==========================================
-def get_gemini_response(image, parent_lang, homework_lang):
-    prompt = f"""
-    ### Role & Objective
-    You are the **Lead AI Tutor** for the app "Super Parents".
-    **Your #1 Priority is ACCURACY and CLARITY.** A parent, who speaks **[ {parent_lang} ]**, needs to understand this homework (originally in **[ {homework_lang} ]**) perfectly to teach their child.
-
-    ### 🔍 Analysis Instructions (CRITICAL)
-    1.  **Solve EVERY problem** visible in the image. Do not skip questions.
-    2.  If the image contains text/reading, summarize the content and explain the key points.
-    3.  If the image contains math, show the **step-by-step calculation process**, not just the final answer.
-    4.  **The final output must be written entirely in {parent_lang} (except for the praise phrase).**
-
-    ### Output Format (Strictly Follow This Order)
-    
-    1. **📝 Detailed Solution & Explanation (Key Section)**
-       - **This is the most important part.**
-       - Provide the correct answer for each question found in the image.
-       - Explain *WHY* that is the answer.
-       - If it is a math problem, break it down: "Step 1 -> Step 2 -> Answer".
-       - If there are multiple questions, number them (1, 2, 3...) clearly.
-
-    2. **🗣️ Coaching Guide (How to Teach)**
-       - Now that the parent knows the answer, tell them *how* to explain it to the child.
-       - Provide specific questions to ask the child to spark their thinking (e.g., "Why do you think this formula applies here?").
-
-    3. **📚 Essential Vocabulary (Table Format)**
-       - [Word in Homework Language] | [Meaning in {parent_lang}] | [Pronunciation]
-
-    4. **💖 Praise the Hero (The Magic Moment)**
-       - Provide a specific praise sentence in **the language of the homework** (so the child understands).
-       - **Format:**
-         - 🗨️ **Say to Child:** "[Insert Praise in Homework Language]"
-         - 🗣️ **Pronunciation:** "[Write how to say it using {parent_lang} alphabet]"
-         - 🧠 **Meaning:** "[Meaning in {parent_lang}]"
-
-    ### Tone & Style
-    - **In Section 1 (Solution):** Precise, Logical, Academic yet easy to understand.
-    - **In Section 2 & 4 (Coaching/Praise):** Encouraging, Warm, Supportive.
-    - Use clear Markdown with bold text for answers.
-    """
+
+
+@st.cache_resource
+def configure_genai():
+    # SDK 는 import 만으로도 수백 ms 가 걸려서 첫 화면 전에는 불러오지 않습니다. 처음 모델이 필요할 때
+    # (보통은 첫 화면 뒤의 백그라운드 준비에서) 불러오고 설정합니다.
+    # genai.configure 는 내부 클라이언트를 새로 만들기 때문에 프로세스당 한 번만 실행합니다.
+    import google.generativeai as genai
+
+    genai.configure(api_key=API_KEY)
+    return genai
+
+
+@st.cache_resource
+def get_model(model_name=MODEL_NAME):
+    # 모델(등급)마다 객체 하나를 모든 세션/재실행이 재사용합니다 (같은 연결/gRPC 채널).
+    recordings = os.path.join(CACHE_DIR, "recordings")
+    if GEMINI_BACKEND == "replay":
+        latency = SECRETS.get("REPLAY_LATENCY")
+        return ReplayModel(
+            model_name,
+            path=recordings,
+            latency=None if latency is None else float(latency),
+            latency_scale=float(SECRETS.get("REPLAY_LATENCY_SCALE", 1.0)),
+            error_rate=float(SECRETS.get("REPLAY_ERROR_RATE", 0.0)),
+        )
+    genai = configure_genai()
+    model = genai.GenerativeModel(model_name)
+    if GEMINI_BACKEND == "record":
+        model = RecordingModel(model, model_name, path=recordings)
+    # 첫 요청이 TLS/채널 설정 비용을 내지 않도록 백그라운드에서 미리 연결해 둡니다.
+    threading.Thread(target=warm_up, args=(model,), daemon=True).start()
+    return model
+
+
+def warm_up(model):
+    try:
+        model.count_tokens("warm up")
+    except Exception:
+        pass
+
+
+@st.cache_resource
+def get_health_probe():
+    return {"result": None, "checked": None, "running": False, "lock": threading.Lock()}
+
+
+def probe_backend():
+    probe = get_health_probe()
+    start = time.perf_counter()
+    try:
+        get_model().count_tokens("ping")
+        result = (True, f"{(time.perf_counter() - start) * 1000:.0f} ms")
+    except Exception as e:
+        result = (False, str(e))
+    with probe["lock"]:
+        probe.update(result=result, checked=time.monotonic(), running=False)
+
+
+def check_backend_health(ttl=60.0):
+    # 마지막 결과만 돌려줍니다 (아직 없으면 None). 첫 확인은 첫 화면 뒤 start_background_warm_up 이 하고,
+    # 여기서는 그 뒤에 결과가 오래되었을 때만 백그라운드에서 다시 확인합니다.
+    # 그래서 첫 화면을 그리는 동안에는 SDK import/네트워크가 시작되지 않습니다.
+    probe = get_health_probe()
+    with probe["lock"]:
+        stale = probe["checked"] is not None and time.monotonic() - probe["checked"] > ttl
+        if not probe["running"] and stale:
+            probe["running"] = True
+            threading.Thread(target=with_script_context(probe_backend), daemon=True).start()
+        return probe["result"]
+
+
+# 첫 화면에는 필요 없고 업로드/분석에서 쓰는 모듈 (PIL, numpy 를 끌어옵니다)
+WARM_UP_MODULES = ("phash_index", "quality_check", "tiling")
+
+
+@st.cache_resource
+def start_background_warm_up():
+    # 첫 화면을 그린 뒤에 한 번: 업로드/분석에 필요한 무거운 모듈(PIL, numpy)과 모델 SDK 를 미리 불러오고
+    # 첫 연결 확인을 합니다.
+    probe = get_health_probe()
+    with probe["lock"]:
+        probe["running"] = True
+
+    def warm():
+        for name in WARM_UP_MODULES:
+            importlib.import_module(name)
+        probe_backend()
+
+    # bench_startup.py 가 이 이름으로 스레드가 시작하는 시점을 찾습니다.
+    threading.Thread(target=with_script_context(warm), name="warm-up", daemon=True).start()
+    return True
+
+
+@st.cache_resource
+def record_cold_start():
+    # 프로세스에서 처음 끝난 스크립트 실행 시간 (import 포함) = 첫 화면까지의 서버 쪽 시간
+    seconds = time.perf_counter() - RUN_STARTED
+    REGISTRY.observe("cold_start", seconds)
+    return seconds
+
+
+@st.cache_resource
+def start_metrics_exporters():
+    # 프로세스당 한 번만 내보내기 스레드/서버를 띄웁니다.
+    if METRICS_FILE:
+        start_file_exporter(METRICS_FILE)
+    if METRICS_PORT:
+        start_http_exporter(METRICS_PORT)
+    return True
+
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(
+        path=os.path.join(CACHE_DIR, "results.sqlite3"),
+        max_entries=int(SECRETS.get("CACHE_MAX_ENTRIES", 500)),
+        ttl_seconds=int(SECRETS.get("CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    )
+
+
+@st.cache_resource
+def get_near_duplicate_index():
+    from phash_index import NearDuplicateIndex
+
+    return NearDuplicateIndex(
+        path=os.path.join(CACHE_DIR, "phash.sqlite3"),
+        max_distance=PHASH_MAX_DISTANCE,
+        max_pixel_diff=PHASH_MAX_PIXEL_DIFF,
+    )
+
+
+@st.cache_resource
+def get_upload_store():
+    return UploadStore(
+        path=os.path.join(CACHE_DIR, "uploads"),
+        session_limit=int(UPLOAD_SESSION_MB * 1024 * 1024),
+        global_limit=int(UPLOAD_GLOBAL_MB * 1024 * 1024),
+    )
+
+
+@st.cache_resource
+def get_translation_memory():
+    return TranslationMemory(os.path.join(CACHE_DIR, "vocabulary.sqlite3"))
+
+
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(workers=int(SECRETS.get("PREFETCH_WORKERS", 4)))
+
+
+@st.cache_resource
+def get_router():
+    return Router(
+        MODEL_TIERS, hedge_after=HEDGE_AFTER, hedging=HEDGING, default_deadline=90.0, breaker=get_scheduler().breaker
+    )
+
+
+@st.cache_resource
+def get_usage_store():
+    return UsageStore(os.path.join(CACHE_DIR, "usage.sqlite3"))
+
+
+@st.cache_resource
+def get_budget():
+    return Budget(
+        get_usage_store(),
+        daily_limit=DAILY_TOKEN_BUDGET,
+        session_limit=SESSION_TOKEN_BUDGET,
+        max_wait=float(SECRETS.get("BUDGET_MAX_WAIT", 60.0)),
+    )
+
+
+@st.cache_resource
+def get_scheduler():
+    return Scheduler(
+        rpm=int(SECRETS.get("QUOTA_RPM", 1000)),
+        tpm=int(SECRETS.get("QUOTA_TPM", 1_000_000)),
+        max_retries=int(SECRETS.get("MAX_RETRIES", 4)),
+    )
+
+
+ERROR_PREFIX = "Error occurred during analysis"
+# 사용량 기록용 프롬프트 버전 (파일/단계 + 프롬프트 해시 앞 8자리)
+EXTRACTION_VERSION = f"app.py/extract:{EXTRACTION_PROMPT_HASH[:8]}"
+GUIDE_VERSION = f"app.py/guide:{GUIDE_PROMPT_HASH[:8]}"
+SINGLE_VERSION = f"{ACTIVE_PROMPT.key}:{ACTIVE_PROMPT.hash[:8]}"
+# 이미지 1장 + 긴 프롬프트 + 4개 섹션 답변 기준의 대략적인 토큰 수 (TPM 버킷용)
+ESTIMATED_REQUEST_TOKENS = 3000
+
+
+def image_keys(image):
+    # 유사 사진 검색이 꺼져 있으면 지문(pHash + 썸네일)을 만들지 않습니다.
+    phash = None
+    if PHASH_ENABLED:
+        from phash_index import fingerprint
+
+        phash = fingerprint(image.image if isinstance(image, PreparedImage) else image)
+    if isinstance(image, PreparedImage):
+        # 정규화된 이미지는 재인코딩된 바이트 자체를 키로 쓰고, 작은 JPEG/WebP 를 그대로 보냅니다.
+        return image.sha256, image.as_part(), phash
+    return image_fingerprint(image), image, phash
+
+
+def lookup_cached(cache_key, near_key=None):
+    with span("cache_lookup"):
+        cache = get_result_cache()
+        cached = cache.get(cache_key)
+        if cached is not None or near_key is None or not PHASH_ENABLED:
+            return cached
+        match = get_near_duplicate_index().lookup(*near_key)
+        if match is not None:
+            return cache.get(match[1])
+        return None
+
+
+def store_result(cache_key, near_key, text):
+    get_result_cache().set(cache_key, text)
+    if near_key is not None and PHASH_ENABLED:
+        get_near_duplicate_index().add(near_key[0], near_key[1], cache_key)
+
+
+def current_session():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return scoped_session() or (ctx.session_id if ctx is not None else "background")
+
+
+def record_usage(session, model_name, usage, response):
+    counts = usage_counts(response)
+    if counts is None:
+        return
+    get_usage_store().record(
+        session, usage.get("parent_lang"), usage.get("homework_lang"), model_name, usage["prompt_version"], counts
+    )
+
+
+def call_model(contents, on_wait=None, stream=False, features=None, usage=None, **kwargs):
+    # 등급 표에 따라 모델을 고르고, 늦으면 헤지/다음 등급으로 넘어갑니다 (routing.Router).
+    # features: 라우팅 조건에 쓸 특징(dict)을 돌려주는 함수. 실제로 호출할 때만 계산합니다.
+    # usage: 사용량 기록에 붙일 언어/프롬프트 버전. 예산을 넘으면 BudgetExceeded 가 올라갑니다.
+    def start(tier, attempt):
+        model = get_model(tier["model"])
+        deadline = float(tier.get("deadline", 90.0))
+
+        def send():
+            options = dict(kwargs)
+            if not stream:
+                # 재시도는 처음 보낸 시각부터의 같은 마감 안에서만 기다립니다.
+                options["request_options"] = {"timeout": max(1.0, attempt.remaining(deadline))}
+            return model.generate_content(contents, stream=stream, **options)
+
+        # 스트리밍이면 스트림을 여는 요청까지만 스케줄러를 거칩니다 (쿼터/재시도는 첫 응답 전에 결정됨).
+        # 헤지/마감 시계는 attempt.run 안(스케줄러를 통과한 뒤)부터 돌고, 진 복사본은 대기열에서 빠집니다.
+        # 시간 초과는 재시도하지 않고 라우터가 다음 등급으로 넘깁니다.
+        response = get_scheduler().call(
+            lambda: attempt.run(send),
+            estimated_tokens=ESTIMATED_REQUEST_TOKENS,
+            on_wait=on_wait,
+            cancelled=lambda: attempt.cancelled,
+            retry_timeouts=False,
+        )
+        if not stream:
+            return response, None
+        chunks = iter(response)
+        # 첫 청크가 도착한 시점을 "첫 응답"으로 봅니다.
+        return next(chunks, None), chunks
+
+    def discard(tier, first, rest):
+        # 헤지에서 진 요청도 이미 과금됐으므로 사용량을 남깁니다. 스트림은 첫 청크까지만 기록하고 닫습니다.
+        record_usage(session, tier["model"], usage or {"prompt_version": "unknown"}, first)
+        if rest is not None and hasattr(rest, "close"):
+            rest.close()
+
+    session = current_session()
+    budget = get_budget()
+    budget.acquire(session, ESTIMATED_REQUEST_TOKENS)
+    try:
+        with span("model_first_response"):
+            tier_name, first, rest = get_router().call(
+                with_script_context(start), features() if features else None, with_script_context(discard)
+            )
+    except Exception:
+        budget.release(session, ESTIMATED_REQUEST_TOKENS)
+        raise
+    model_name = next(tier["model"] for tier in MODEL_TIERS if tier["name"] == tier_name)
+
+    def finish(last):
+        try:
+            record_usage(session, model_name, usage or {"prompt_version": "unknown"}, last)
+        finally:
+            budget.release(session, ESTIMATED_REQUEST_TOKENS)
+
+    if not stream:
+        finish(first)
+        return first
+    return tracked_chunks(first, rest, finish)
+
+
+def tracked_chunks(first, rest, finish):
+    # 스트리밍은 마지막 청크에 전체 usage_metadata 가 붙어 옵니다. 다 읽거나 중간에 닫히면 기록합니다.
+    last = first
+    try:
+        if first is not None:
+            yield first
+        for chunk in rest:
+            last = chunk
+            yield chunk
+    finally:
+        finish(last)
+
+
+def image_features(image):
+    # 등급 표에 블록 수 조건이 있을 때만 페이지를 분석합니다.
+    if not any("max_blocks" in tier for tier in MODEL_TIERS):
+        return {}
+    from tiling import count_blocks
+
+    pil_image = image.image if isinstance(image, PreparedImage) else image
+    return {"blocks": count_blocks(pil_image)}
+
+
+def extraction_features(extraction):
+    return {"questions": len(json.loads(extraction).get("questions", []))}
+
+
+def iter_text(response, stream):
+    if not stream:
+        yield response.text
+        return
+    for chunk in response:
+        try:
+            yield chunk.text
+        except ValueError:
+            # 안전 필터 등으로 텍스트가 없는 청크는 건너뜁니다.
+            continue
+
+
+def extract_homework(image_hash, image_part, phash, homework_lang, on_wait=None, features=None):
+    # 1단계 결과는 부모님 언어와 무관하므로, 언어만 바꿔 다시 실행하면 이미지를 다시 보내지 않습니다.
+    cache_key = make_key(image_hash, "", homework_lang, MODEL_NAME, EXTRACTION_PROMPT_HASH)
+    near_key = None
+    if phash is not None:
+        near_key = (make_key("", "", homework_lang, MODEL_NAME, EXTRACTION_PROMPT_HASH), phash)
+    cached = lookup_cached(cache_key, near_key)
+    if cached is not None:
+        return cache_key, cached
+
+    response = call_model(
+        [EXTRACTION_PROMPT.format(homework_lang=homework_lang), image_part],
+        on_wait=on_wait,
+        features=features,
+        usage={"homework_lang": homework_lang, "prompt_version": EXTRACTION_VERSION},
+        generation_config={"response_mime_type": "application/json"},
+    )
+    extraction = response.text
+    json.loads(extraction)  # 깨진 JSON 은 캐시하지 않고 오류로 처리합니다.
+    store_result(cache_key, near_key, extraction)
+    return cache_key, extraction
+
+
+def extract_homework_tiled(image, image_hash, homework_lang):
+    # 빽빽한 페이지: 문제 블록별로 1단계를 동시에 실행하고 읽는 순서대로 합칩니다.
+    # 블록으로 나눌 수 없거나 한 블록이라도 실패하면 None (페이지 전체로 다시 합니다).
+    from tiling import merge_extractions, split_into_blocks
+
+    cache_key = make_key(image_hash, "tiled", homework_lang, MODEL_NAME, EXTRACTION_PROMPT_HASH)
+    cached = lookup_cached(cache_key)
+    if cached is not None:
+        return cache_key, cached
+
+    pil_image = image.image if isinstance(image, PreparedImage) else image
+    with span("tiling"):
+        tiles = [
+            normalize_image(tile, max_edge=IMAGE_MAX_EDGE, fmt=IMAGE_FORMAT)
+            for tile in split_into_blocks(pil_image, max_tiles=TILE_MAX_BLOCKS)
+        ]
+    if len(tiles) < 2:
+        return None
+
+    # 비슷하게 생긴 문제 블록끼리 답이 섞이지 않도록 블록에는 유사 이미지 검색을 쓰지 않습니다.
+    parts = [None] * len(tiles)
+    results = run_batch(
+        lambda tile: extract_homework(
+            tile.sha256, tile.as_part(), None, homework_lang, features=lambda: {"blocks": 1}
+        )[1],
+        tiles,
+        max_workers=BATCH_CONCURRENCY,
+        wrap=with_script_context,
+    )
+    for index, extraction, error in results:
+        if error is not None:
+            return None
+        parts[index] = json.loads(extraction)
+
+    merged = json.dumps(merge_extractions(parts), ensure_ascii=False)
+    store_result(cache_key, None, merged)
+    return cache_key, merged
+
+
+def known_vocabulary(extraction, parent_lang, homework_lang):
+    # 1단계가 뽑은 단어 중 번역 메모리에 있는 것을 1단계 순서대로 돌려줍니다: (메모리 언어, 아는 항목, 모두 아는지)
+    # "Auto Detect" 면 1단계가 읽어낸 언어로 묶고, 그것도 모르면 메모리를 쓰지 않습니다.
+    data = json.loads(extraction)
+    vocab_lang = homework_lang if homework_lang != "Auto Detect" else (data.get("homework_language") or "").strip()
+    lemmas = list(dict.fromkeys(
+        lemma(v.get("term", ""), vocab_lang) for v in data.get("vocabulary", []) if v.get("term")
+    ))
+    if not VOCAB_MEMORY or not vocab_lang or not lemmas:
+        return None, [], False
+    with span("vocab_lookup"):
+        found = get_translation_memory().lookup_lemmas(vocab_lang, parent_lang, lemmas)
+    known = [found[key] for key in lemmas if key in found]
+    return vocab_lang, known, len(known) == len(lemmas)
+
+
+def merge_vocabulary(text, vocab_lang, parent_lang, known):
+    # 모델이 새로 만든 단어는 메모리에 넣고, 미리 채운 단어 + 새 단어로 완성된 가이드 JSON 을 돌려줍니다.
+    if vocab_lang is None:
+        return text
+    guide = json.loads(text)
+    new = guide.get("vocabulary", [])
+    if new:
+        get_translation_memory().add(vocab_lang, parent_lang, new)
+    if not known:
+        return text
+    known_lemmas = {lemma(v["word"], vocab_lang) for v in known}
+    guide["vocabulary"] = known + [v for v in new if lemma(v["word"], vocab_lang) not in known_lemmas]
+    return json.dumps({name: guide[name] for name in SECTION_NAMES if name in guide}, ensure_ascii=False)
+
+
+def generate_guide(image, parent_lang, homework_lang, on_wait=None, stream=True, tiled=False):
+    # 지금까지 받은 전체 텍스트를 yield 합니다. 불완전한 답변은 캐시에 넣지 않습니다.
+    image = image[0] if isinstance(image, list) else image
+    image_hash, image_part, phash = image_keys(image)
+
+    if TWO_STAGE:
+        extracted = extract_homework_tiled(image, image_hash, homework_lang) if tiled else None
+        if extracted is None:
+            with span("extraction"):
+                extracted = extract_homework(
+                    image_hash, image_part, phash, homework_lang, on_wait, features=lambda: image_features(image)
+                )
+        extraction_key, extraction = extracted
+        features = lambda: extraction_features(extraction)
+        cache_key = make_key(extraction_key, parent_lang, homework_lang, MODEL_NAME, GUIDE_PROMPT_HASH)
+        near_key = None
+        # 번역 메모리에 있는 단어는 다시 만들지 않습니다. 모두 알면 어휘 섹션 자체를 요청하지 않습니다.
+        vocab_lang, known, all_known = known_vocabulary(extraction, parent_lang, homework_lang)
+        sections = tuple(name for name in SECTION_NAMES if name != "vocabulary") if all_known else SECTION_NAMES
+        with span("prompt_build"):
+            contents = [build_guide_prompt(
+                parent_lang, homework_lang, extraction, sections, known_terms=[v["word"] for v in known]
+            )]
+        usage = {"parent_lang": parent_lang, "homework_lang": homework_lang, "prompt_version": GUIDE_VERSION}
+        # 스키마를 강제한 JSON 으로 받아서 섹션별로 화면에 직접 그립니다.
+        options = {"generation_config": {
+            "response_mime_type": "application/json",
+            "response_schema": guide_schema(sections),
+        }}
+    else:
+        cache_key = make_key(image_hash, parent_lang, homework_lang, MODEL_NAME, ACTIVE_PROMPT.hash)
+        # 유사 이미지 검색은 같은 언어 쌍 + 같은 모델/프롬프트 안에서만 합니다.
+        near_key = (make_key("", parent_lang, homework_lang, MODEL_NAME, ACTIVE_PROMPT.hash), phash)
+        contents = [ACTIVE_PROMPT.render(parent_lang, homework_lang), image_part]
+        features = lambda: image_features(image)
+        usage = {"parent_lang": parent_lang, "homework_lang": homework_lang, "prompt_version": SINGLE_VERSION}
+        options = {}
+
+    # 같은 사진(또는 거의 같은 사진) + 같은 언어 + 같은 모델/프롬프트면 저장된 답변을 바로 돌려줍니다.
+    cached = lookup_cached(cache_key, near_key)
+    if cached is not None:
+        yield cached
+        return
+
+    # 스트리밍이면 model_total 에는 청크 사이 화면 그리기(render) 시간도 포함됩니다.
+    with span("model_total"):
+        response = call_model(contents, on_wait=on_wait, stream=stream, features=features, usage=usage, **options)
+        text = ""
+        for piece in iter_text(response, stream):
+            text += piece
+            yield text
+    if TWO_STAGE:
+        # 스키마에 맞지 않는 가이드는 캐시하지 않고 오류로 올립니다.
+        validate_guide(json.loads(text), sections)
+        merged = merge_vocabulary(text, vocab_lang, parent_lang, known)
+        if merged != text:
+            text = merged
+            yield text
+        validate_guide(json.loads(text))
+    if text:
+        store_result(cache_key, near_key, text)
+
+
+def regenerate_section(image, parent_lang, homework_lang, section, on_wait=None):
+    # 분석 전체를 다시 하지 않고 한 섹션(예: 칭찬)만 새로 만듭니다. 1단계 결과는 캐시에서 꺼냅니다.
+    image_hash, image_part, phash = image_keys(image)
+    _, extraction = extract_homework(
+        image_hash, image_part, phash, homework_lang, on_wait, features=lambda: image_features(image)
+    )
+    response = call_model(
+        [build_guide_prompt(parent_lang, homework_lang, extraction, (section,))],
+        on_wait=on_wait,
+        features=lambda: extraction_features(extraction),
+        usage={"parent_lang": parent_lang, "homework_lang": homework_lang, "prompt_version": GUIDE_VERSION},
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": guide_schema((section,)),
+            "temperature": 1.0,
+        },
+    )
+    return validate_guide(json.loads(response.text), (section,))[section]
+
+
+def get_gemini_response(image, parent_lang, homework_lang, on_wait=None, tiled=False):
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        # 이미지 처리 방식은 리스트로 감싸는 것이 안전합니다.
-        content_input = [prompt, image[0]] if isinstance(image, list) else [prompt, image]
-        response = model.generate_content(content_input)
-        return response.text
+        text = ""
+        for text in generate_guide(image, parent_lang, homework_lang, on_wait=on_wait, stream=False, tiled=tiled):
+            pass
+        return text
     except Exception as e:
-        return f"Error occurred during analysis: {e}"
+        return f"{ERROR_PREFIX}: {e}"
+
+
+def stream_gemini_response(image, parent_lang, homework_lang, on_wait=None, tiled=False):
+    # 중간에 끊기면 예외가 그대로 올라갑니다. 이미 받은 부분은 화면에 남겨두세요.
+    return generate_guide(image, parent_lang, homework_lang, on_wait=on_wait, stream=True, tiled=tiled)
+
+
+def with_script_context(fn):
+    # 워커 스레드에서도 st.cache_resource / st.secrets 를 쓸 수 있도록 현재 세션 컨텍스트를 붙입니다.
+    # 사용량/예산이 원래 세션에 잡히도록 세션 ID 도 함께 넘깁니다.
+    ctx = get_script_run_ctx(suppress_warning=True)
+    session = current_session()
+
+    def run(*args, **kwargs):
+        add_script_run_ctx(ctx=ctx)
+        with session_scope(session):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def rerun_fragment():
+    # 프래그먼트 안의 버튼으로 시작된 실행이면 그 영역만 다시 그립니다. 전체 스크립트 실행 중에는
+    # (다른 위젯과 함께 바뀐 경우, AppTest 는 항상 전체 실행) scope="fragment" 가 오류라서 전체를 다시 실행합니다.
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def show_queue_position(placeholder):
+    def on_wait(position):
+        placeholder.info(f"⏳ Many parents are using Super Parents right now. You are #{position} in line...")
+
+    return on_wait
+
+
+def render_result(placeholder, text):
+    # 내용(답변 글자나 가이드 항목)을 그렸으면 True
+    with span("render"):
+        return draw_result(placeholder, text)
+
+
+def draw_result(placeholder, text):
+    # 구조화된 가이드(JSON)면 섹션별로, 아니면(단일 호출 Markdown) 예전처럼 결과 박스 하나로 보여줍니다.
+    if not text.lstrip().startswith("{"):
+        placeholder.markdown(f'<div class="result-box">{text}</div>', unsafe_allow_html=True)
+        return bool(text.strip())
+    try:
+        guide = parse_guide(text)
+    except GuideError:
+        guide = None
+    if guide is None:
+        # 스트리밍 중: 끝까지 도착한 섹션과, 쓰이고 있는 풀이/어휘 섹션의 끝난 항목만 먼저 보여줍니다.
+        guide = parse_partial_sections(text)
+    if not guide:
+        placeholder.caption("✍️ Writing your coaching guide...")
+        return False
+    render_guide(placeholder.container(), guide)
+    return True
+
+
+def render_guide(container, guide):
+    for i, name in enumerate(SECTION_NAMES, 1):
+        if name not in guide:
+            continue
+        container.markdown(f"#### {i}. {SECTION_TITLES[name]}")
+        if name == "vocabulary":
+            container.dataframe(
+                [{"Word": v["word"], "Meaning": v["meaning"], "Pronunciation": v["pronunciation"]} for v in guide[name]],
+                hide_index=True,
+                width="stretch",
+            )
+        else:
+            container.markdown(
+                f'<div class="result-box">\n\n{section_markdown(name, guide[name])}\n\n</div>',
+                unsafe_allow_html=True,
+            )
 
 # ==========================================
 # 2. 테마 및 디자인 (CSS)
 # ==========================================
 
+start_metrics_exporters()
+
 with st.sidebar:
     st.header("⚙️ Settings")
     theme_mode = st.selectbox("Theme Mode", ["Light Mode (Default)", "Dark Mode"])
     st.divider()
+    stream_mode = st.toggle("⚡ Streaming Mode", value=True, help="Show the guide while it is being written.")
+    dense_mode = st.toggle(
+        "🧩 Dense Page Mode",
+        value=False,
+        help="Split crowded worksheets into question blocks and solve them in parallel.",
+        disabled=not TWO_STAGE,
+    )
+    prefetch_mode = st.toggle(
+        "🔮 Start Early",
+        value=PREFETCH,
+        help="Start reading the homework as soon as it is uploaded, before you press the button.",
+    )
+    st.divider()
     st.markdown("Developed with Google Gemini 2.5 Flash")
 
-if "Dark" in theme_mode:
-    bg_color = "#0E1117"
-    text_color = "#FAFAFA"
-    card_bg = "#262730"
-    border_color = "#374151"
-    header_bg = "#312E81"
-else:
-    bg_color = "#F3F4F6"
-    text_color = "#1F2937"
-    card_bg = "#FFFFFF"
-    border_color = "#E5E7EB"
-    header_bg = "#4F46E5"
-
-header_html = f"""
-<style>
-    .stApp {{ background-color: {bg_color} !important; }}
-    .stMarkdown, p, h1, h2, h3, li, span {{ color: {text_color}; }}
-    header {{visibility: hidden;}}
-    
-    .custom-header {{
-        background-color: {header_bg};
-        padding: 2.5rem 1rem;
-        text-align: center;
-        margin-top: -60px;
-        margin-left: -5rem;
-        margin-right: -5rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-    }}
-    .custom-header h1 {{
-        color: #FFFFFF !important;
-        font-family: sans-serif; font-weight: 800; font-size: 2.2rem;
-        margin-bottom: 15px; line-height: 1.2;
-    }}
-    .gold-text {{
-        color: #FFD700 !important; font-size: 1.2rem; font-weight: 800;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.8);
-    }}
-    .white-text {{
-        color: #FFFFFF !important; font-size: 1.0rem; font-weight: 400; opacity: 0.95;
-    }}
-    
-    div[data-testid="stFileUploader"] {{
-        border: 2px dashed {header_bg}; border-radius: 12px; padding: 20px;
-        background-color: {card_bg}; text-align: center;
-    }}
-    .result-box {{
-        background-color: {card_bg}; padding: 25px; border-radius: 12px;
-        border: 1px solid {border_color};
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }}
-</style>
-
-<div class="custom-header">
-    <div style="font-size: 3rem; margin-bottom: 10px;">🦸‍♂️ ♡ 🦸‍♀️</div>
-    <h1>Super Parents<br>Heroes Across<br> Languages</h1>
-    <p style="margin-bottom: 10px;">
-        <span class="gold-text">No barrier beats a parent’s love.</span>
-    </p>
-    <p>
-        <span class="white-text">Understand in your language, teach with confidence.<br>Children may speak differently, <br>but they listen with their hearts.</span>
-    </p>
-</div>
-"""
-
-st.markdown(header_html, unsafe_allow_html=True)
+    backend_health = check_backend_health()
+    if backend_health is None:
+        st.caption("⚪ Checking Gemini...")
+    elif backend_health[0]:
+        st.caption(f"🟢 Gemini reachable ({backend_health[1]})")
+    else:
+        st.caption(f"🔴 Gemini unreachable: {backend_health[1]}")
+
+    if get_scheduler().breaker.state == "open":
+        st.caption("🟠 AI service is recovering. New requests will wait a moment.")
+
+    with st.expander("🗄️ Result Cache"):
+        cache_stats = get_result_cache().stats()
+        st.caption(
+            f"Hits {cache_stats['hits']} · Misses {cache_stats['misses']} · "
+            f"Evictions {cache_stats['evictions']} · Entries {cache_stats['entries']}"
+        )
+
+    with st.expander("🚦 Model Tiers"):
+        tier_latency, route_counters = get_router().summary()
+        for tier_name, latency in tier_latency.items():
+            if latency["count"]:
+                st.caption(
+                    f"**{tier_name}** · {latency['count']} calls · p50 {latency['p50']:.1f} s · "
+                    f"p95 {latency['p95']:.1f} s · p99 {latency['p99']:.1f} s"
+                )
+            else:
+                st.caption(f"**{tier_name}** · no calls yet")
+        st.caption(
+            f"Hedges {route_counters.get('hedges', 0)} · Hedge wins {route_counters.get('hedge_wins', 0)} · "
+            f"Fallbacks {route_counters.get('fallbacks', 0)}"
+        )
+
+    with st.expander("💰 Usage"):
+        usage_store = get_usage_store()
+        daily_used = usage_store.day_total()
+        session_used = usage_store.session_total(current_session())
+        st.caption(
+            f"This session: {session_used:,} tokens"
+            + (f" / {SESSION_TOKEN_BUDGET:,}" if SESSION_TOKEN_BUDGET else "")
+        )
+        st.caption(
+            f"Today (everyone): {daily_used:,} tokens" + (f" / {DAILY_TOKEN_BUDGET:,}" if DAILY_TOKEN_BUDGET else "")
+        )
+        usage_rows = usage_store.aggregate(since_day=usage_today(), prices=PRICES)
+        if usage_rows:
+            st.dataframe(usage_rows, hide_index=True, width="stretch")
+
+    if DEBUG_PANEL:
+        with st.expander("🩺 Stage Timings"):
+            st.dataframe(REGISTRY.summary(), hide_index=True, width="stretch")
+
+    if prefetch_mode:
+        with st.expander("🔮 Start Early"):
+            prefetch_stats = get_prefetcher().snapshot()
+            st.caption(
+                f"Started {prefetch_stats['started']} · Used {prefetch_stats['used']} · "
+                f"Cancelled {prefetch_stats['cancelled']} · Wasted calls {prefetch_stats['wasted']} · "
+                f"In flight {prefetch_stats['in_flight']}"
+            )
+            st.caption(f"Waiting saved: {prefetch_stats['saved_seconds']:.1f} s in total")
+
+# 스타일시트는 정적 파일(static/theme.css)이라 브라우저가 캐시하고, 재실행마다 보내는 것은 @import 한 줄과
+# 테마 색 변수 블록뿐입니다. 테마 전환은 변수 블록 요소만 바꿉니다. 헤더는 고정 HTML 입니다.
+# <style> 만 있는 st.html 은 화면에 자리를 차지하지 않습니다.
+st.html(STYLESHEETS[STATIC_SERVING])
+st.html(THEME_VARS[theme_name(theme_mode)])
+st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
 
 # ==========================================
 # 3. 메인 화면
 # ==========================================
 
+def upload_id(uploaded_file):
+    return getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+
+
+def fixture_uploads():
+    # replay 백엔드 전용: AppTest 는 파일을 올릴 수 없어서, 측정 스크립트가 세션에 넣어 둔 사진을 업로드 대신 씁니다.
+    if GEMINI_BACKEND != "replay":
+        return None
+    return st.session_state.get("fixture_uploads")
+
+
+def load_pages(uploaded_files):
+    # 업로드마다 한 번만 디코딩/정규화하고, 품질 검사를 한 뒤 픽셀은 바로 놓아줍니다.
+    # 세션에는 스풀된 사진 정보(SpooledImage)와 품질 결과만 남습니다.
+    from quality_check import check_quality
+
+    store = get_upload_store()
+    session = current_session()
+    uploads = st.session_state.setdefault("uploads", {})
+    ids = [upload_id(f) for f in uploaded_files]
+    for uid, f in zip(ids, uploaded_files):
+        if uid not in uploads:
+            with span("decode"):
+                page = normalize_upload(f, max_edge=IMAGE_MAX_EDGE, fmt=IMAGE_FORMAT)
+            with span("quality_check"):
+                quality = check_quality(page.image, QUALITY_THRESHOLDS)
+            uploads[uid] = {
+                "page": store.put(session, page),
+                "quality": quality,
+            }
+    for uid in list(uploads):
+        if uid not in ids:
+            store.forget(session, uploads.pop(uid)["page"].sha256)
+    return [uploads[uid] for uid in ids]
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def preview_thumbnail(image_hash, width, _page):
+    # 내용 해시 + 폭으로 한 번만 만듭니다. 재실행/테마 전환/다른 세션에서도 같은 바이트가 나오므로
+    # 미디어 URL 이 그대로이고, 서버는 다시 인코딩하지 않고 브라우저도 다시 받지 않습니다.
+    return preview_bytes(_page.image, width)
+
+
+def release_uploader():
+    # 제출한 뒤에는 업로더를 새 키로 바꿔서 위젯이 원본 파일(휴대폰 사진 수 MB)을 더 붙잡지 않게 합니다.
+    # 화면의 사진과 결과는 스풀해 둔 페이지로 계속 보여줍니다.
+    st.session_state["uploader_round"] = st.session_state.get("uploader_round", 0) + 1
+    st.session_state["uploads_released"] = True
+
+
+def clear_uploads():
+    store = get_upload_store()
+    session = current_session()
+    for entry in st.session_state.pop("uploads", {}).values():
+        store.forget(session, entry["page"].sha256)
+    st.session_state["uploads_released"] = False
+
+
+def upload_expired(error):
+    # 오래 둔 사진의 스풀 파일이 정리된 경우: 세션에서 빼고 다시 올려 달라고 안내합니다.
+    clear_uploads()
+    st.warning(f"📷 {error}")
+
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def count_input_tokens(image_hash, _image_part, p_lang, t_lang):
+    # 같은 사진/언어는 다시 세지 않습니다 (이미지 바이트 대신 해시로 캐시).
+    if TWO_STAGE:
+        prompt = EXTRACTION_PROMPT.format(homework_lang=t_lang)
+    else:
+        prompt = ACTIVE_PROMPT.render(p_lang, t_lang)
+    return get_model().count_tokens([prompt, _image_part]).total_tokens
+
+
+def preflight_estimate(pages, p_lang, t_lang):
+    # (입력, 출력) 예상 토큰. 이미 결과가 있는 페이지는 빼고, 셀 수 없으면 None.
+    guides = st.session_state.get("guides", {})
+    pending = [page for page in pages if (page.sha256, p_lang, t_lang) not in guides]
+    if not pending:
+        return None
+    try:
+        input_tokens = sum(count_input_tokens(page.sha256, page.as_part(), p_lang, t_lang) for page in pending)
+    except Exception:
+        return None
+    return input_tokens, PREFLIGHT_OUTPUT_TOKENS * len(pending)
+
+
+def prefetch_key(image_hash, p_lang, t_lang, tiled):
+    # 세션마다 따로 잡습니다. 다른 세션이 같은 사진을 올려도 서로의 추측 실행을 버리거나 가져가지 않습니다.
+    # (작업 큐 워커에서는 session_scope 로 원래 세션이 잡혀 있습니다.)
+    return (current_session(), image_hash, p_lang, t_lang, bool(tiled))
+
+
+def update_prefetch(pages, p_lang, t_lang, tiled, enabled):
+    # 지금 화면의 사진/언어 조합만 미리 분석하고, 조합이 바뀌면 이전 요청은 취소하거나 버립니다.
+    prefetcher = get_prefetcher()
+    guides = st.session_state.get("guides", {})
+    keys = []
+    if enabled:
+        keys = [prefetch_key(page.sha256, p_lang, t_lang, tiled) for page in pages]
+    previous = st.session_state.get("prefetch_keys", [])
+    for key in previous:
+        if key not in keys:
+            prefetcher.discard(key)
+    for page, key in zip(pages, keys):
+        if key not in previous and (page.sha256, p_lang, t_lang) not in guides:
+            prefetcher.start(
+                key,
+                with_script_context(lambda page=page: get_gemini_response(page, p_lang, t_lang, tiled=tiled)),
+            )
+    st.session_state["prefetch_keys"] = keys
+
+
+def prefetched_response(image_hash, p_lang, t_lang, tiled):
+    # 미리 시작한 요청이 있으면 그 결과에 붙습니다. 없거나 실패했으면 None (평소처럼 새로 요청).
+    text = get_prefetcher().attach(prefetch_key(image_hash, p_lang, t_lang, tiled))
+    if not text or text.startswith(ERROR_PREFIX):
+        return None
+    return text
+
+
+def save_guide(image_hash, p_lang, t_lang, text):
+    st.session_state.setdefault("guides", {})[(image_hash, p_lang, t_lang)] = text
+
+
+def show_saved_guides(pages, p_lang, t_lang):
+    guides = st.session_state.get("guides", {})
+    texts = [guides.get((page.sha256, p_lang, t_lang)) for page in pages]
+    if not all(texts):
+        return False
+
+    st.markdown("### 🎉 Your Coaching Guide")
+    for i, (page, text) in enumerate(zip(pages, texts), 1):
+        if len(pages) > 1:
+            st.markdown(f"#### 📄 Page {i}")
+        result_area = st.empty()
+        if text.lstrip().startswith("{") and st.button("💖 New Praise Phrase", key=f"regenerate_praise_{i}"):
+            with st.spinner("💖 Writing a new praise phrase..."):
+                try:
+                    guide = json.loads(text)
+                    guide["praise"] = regenerate_section(page, p_lang, t_lang, "praise")
+                    text = json.dumps(guide, ensure_ascii=False)
+                    save_guide(page.sha256, p_lang, t_lang, text)
+                except Exception as e:
+                    st.error(f"{ERROR_PREFIX}: {e}")
+        render_result(result_area, text)
+    return True
+
+
+@st.fragment
+def homework_fragment(p_lang_clean, target_lang, stream_mode, dense_mode, prefetch_mode):
+    # 업로드/미리보기/결과 영역만 따로 재실행됩니다. 사이드바나 헤더가 바뀌어도 여기 상태는 세션에 남습니다.
+    image_data = st.file_uploader(
+        "Upload Image or Take Photo", 
+        type=["jpg", "png", "jpeg"], 
+        accept_multiple_files=True,
+        label_visibility="collapsed",
+        key=f"uploader_{st.session_state.get('uploader_round', 0)}",
+    )
+    if not image_data:
+        image_data = fixture_uploads()
+
+    if image_data:
+        st.session_state["uploads_released"] = False
+        entries = load_pages(image_data)
+    elif st.session_state.get("uploads_released") and st.session_state.get("uploads"):
+        entries = list(st.session_state["uploads"].values())
+        if st.button("🗑️ Remove photos", key="remove_uploads"):
+            clear_uploads()
+            rerun_fragment()
+    else:
+        update_prefetch([], p_lang_clean, target_lang, dense_mode, False)
+        return
+
+    pages = [entry["page"] for entry in entries]
+    
+    st.markdown("### Preview")
+    with span("preview"):
+        try:
+            if len(pages) == 1:
+                st.image(
+                    preview_thumbnail(pages[0].sha256, PREVIEW_WIDTH, pages[0]),
+                    caption="Uploaded Homework",
+                    width="stretch",
+                )
+            else:
+                st.image(
+                    [preview_thumbnail(page.sha256, THUMBNAIL_WIDTH, page) for page in pages],
+                    caption=[f"Page {i}" for i in range(1, len(pages) + 1)],
+                    width=THUMBNAIL_WIDTH,
+                )
+        except UploadExpired as e:
+            upload_expired(e)
+            return
+    
+    # 흐림/반사/너무 작은 글씨는 API 를 부르기 전에 알려서 다시 찍게 합니다.
+    from quality_check import REJECT as QUALITY_REJECT
+
+    rejected = False
+    for i, entry in enumerate(entries, 1):
+        prefix = f"Page {i}: " if len(entries) > 1 else ""
+        for level, message in entry["quality"].issues:
+            if level == QUALITY_REJECT:
+                rejected = True
+                st.error(f"📷 {prefix}{message}")
+            else:
+                st.warning(f"📷 {prefix}{message}")
+    if rejected:
+        rejected = not st.checkbox("Send it anyway", key="quality_override")
+
+    # 보내기 전에 예상 토큰/비용을 보여주고, 예산을 넘을 것 같으면 버튼을 막습니다.
+    over_budget = False
+    estimate = preflight_estimate(pages, p_lang_clean, target_lang)
+    if estimate:
+        input_tokens, output_tokens = estimate
+        cost = cost_usd(MODEL_NAME, input_tokens, output_tokens, PRICES)
+        st.caption(f"🧮 Estimated about {input_tokens + output_tokens:,} tokens (≈ ${cost:.4f})")
+        reason = get_budget().check(current_session(), input_tokens + output_tokens)
+        if reason:
+            st.warning(f"💰 {reason}")
+            over_budget = True
+
+    update_prefetch(pages, p_lang_clean, target_lang, dense_mode, prefetch_mode and not rejected and not over_budget)
+    
+    st.markdown("###") 
+    
+    submit = st.button(
+        "🚀 Activate Super Parent Mode",
+        type="primary",
+        width="stretch",
+        disabled=rejected or over_budget,
+    )
+
+    if not submit:
+        if show_saved_guides(pages, p_lang_clean, target_lang):
+            show_disclaimer()
+        return
+
+    if BACKGROUND_JOBS:
+        # 작업만 등록하고 바로 돌아갑니다. 작업 ID 는 주소창에 남겨서 새로고침해도 결과를 다시 찾습니다.
+        queue = get_job_queue()
+        try:
+            blobs = [page.data for page in pages]
+        except UploadExpired as e:
+            upload_expired(e)
+            return
+        job_ids = [
+            queue.submit(
+                "guide",
+                {
+                    "image": page.sha256,
+                    "mime_type": page.mime_type,
+                    "parent_lang": p_lang_clean,
+                    "homework_lang": target_lang,
+                    "page": i,
+                    "tiled": dense_mode,
+                    "session": current_session(),
+                },
+                blob,
+            )
+            for i, (page, blob) in enumerate(zip(pages, blobs), 1)
+        ]
+        st.query_params["jobs"] = ",".join(job_ids)
+        release_uploader()
+        st.rerun()
+
+    status_text = st.empty()
+    status_text.info("🤖 AI is preparing your coaching guide...It may take 30 seconds...")
+
+    if len(pages) > 1:
+        # 여러 페이지는 동시에 요청하고, 자리는 페이지 순서대로 먼저 잡아둔 뒤 끝나는 대로 채웁니다.
+        st.markdown("### 🎉 Your Coaching Guide")
+        page_areas = []
+        for i in range(1, len(pages) + 1):
+            st.markdown(f"#### 📄 Page {i}")
+            page_area = st.empty()
+            page_area.caption("⏳ Waiting...")
+            page_areas.append(page_area)
+
+        done, failed = 0, 0
+        results = run_batch(
+            lambda page: (
+                prefetched_response(page.sha256, p_lang_clean, target_lang, dense_mode)
+                or get_gemini_response(page, p_lang_clean, target_lang, tiled=dense_mode)
+            ),
+            pages,
+            max_workers=BATCH_CONCURRENCY,
+            wrap=with_script_context,
+        )
+        for index, page_text, error in results:
+            done += 1
+            if error is not None or page_text.startswith(ERROR_PREFIX):
+                failed += 1
+                page_areas[index].error(page_text or f"{ERROR_PREFIX}: {error}")
+            else:
+                save_guide(pages[index].sha256, p_lang_clean, target_lang, page_text)
+                render_result(page_areas[index], page_text)
+            status_text.info(f"🤖 {done} / {len(pages)} pages ready...")
+
+        if failed:
+            status_text.warning(f"⚠️ {len(pages) - failed} of {len(pages)} pages ready. Some pages failed.")
+            if failed < len(pages):
+                show_disclaimer()
+            return
+
+    elif stream_mode:
+        # 미리 시작한 요청이 있으면 새로 스트리밍하지 않고 그 결과를 기다려서 씁니다.
+        response_text = prefetched_response(pages[0].sha256, p_lang_clean, target_lang, dense_mode)
+        if response_text is None:
+            st.markdown("### 🎉 Your Coaching Guide")
+            result_area = st.empty()
+            result_area_started = False
+            # 버튼 -> 화면에 첫 내용(답변 글자나 풀이 한 문항)이 보일 때까지. 2단계 모드는 1단계 추출을 기다립니다.
+            clicked = time.perf_counter()
+            first_content = False
+            try:
+                for response_text in stream_gemini_response(
+                    pages[0], p_lang_clean, target_lang, on_wait=show_queue_position(status_text), tiled=dense_mode
+                ):
+                    if not result_area_started:
+                        status_text.info("✍️ Writing your coaching guide...")
+                        result_area_started = True
+                    if render_result(result_area, response_text) and not first_content:
+                        REGISTRY.observe("first_content", time.perf_counter() - clicked)
+                        first_content = True
+            except Exception as e:
+                # 스트리밍 도중 실패해도 이미 받은 부분은 그대로 보여줍니다.
+                status_text.error("❌ Error Occurred")
+                st.error(f"{ERROR_PREFIX}: {e}")
+                return
+        save_guide(pages[0].sha256, p_lang_clean, target_lang, response_text)
+
+    else:
+        response_text = prefetched_response(pages[0].sha256, p_lang_clean, target_lang, dense_mode)
+        if response_text is None:
+            response_text = get_gemini_response(
+                pages[0], p_lang_clean, target_lang, on_wait=show_queue_position(status_text), tiled=dense_mode
+            )
+        if response_text.startswith(ERROR_PREFIX):
+            status_text.error("❌ Error Occurred")
+            st.error(response_text)
+            return
+        save_guide(pages[0].sha256, p_lang_clean, target_lang, response_text)
+
+    # 모두 성공하면 세션에 저장된 결과로 이 영역만 다시 그립니다 (섹션 재생성 버튼 포함).
+    release_uploader()
+    rerun_fragment()
+
+
+def run_job(job, progress):
+    # 워커 스레드에서 실행됩니다. 중간 결과를 progress 로 남기면 화면이 폴링해서 보여줍니다.
+    params = job["params"]
+    with session_scope(params.get("session", "background")):
+        return run_guide_job(job, params, progress)
+
+
+def run_guide_job(job, params, progress):
+    # 업로드 직후 미리 시작한 요청이 같은 서버에서 돌고 있으면 다시 보내지 않고 그 결과를 씁니다.
+    text = prefetched_response(params["image"], params["parent_lang"], params["homework_lang"], params.get("tiled"))
+    if text is not None:
+        return text
+    page = PreparedImage.from_bytes(job["blob"], params["mime_type"])
+    text = ""
+    for text in stream_gemini_response(
+        page, params["parent_lang"], params["homework_lang"], tiled=params.get("tiled", False)
+    ):
+        progress(text)
+    return text
+
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue(run_job, path=os.path.join(CACHE_DIR, "jobs.sqlite3"), workers=JOB_WORKERS)
+
+
+def load_jobs(job_ids):
+    queue = get_job_queue()
+    jobs = [queue.get(job_id) for job_id in job_ids]
+    return [job for job in jobs if job is not None]
+
+
+def save_finished_jobs(jobs):
+    for job in jobs:
+        if job["status"] == JOB_DONE:
+            params = job["params"]
+            save_guide(params["image"], params["parent_lang"], params["homework_lang"], job["result"])
+
+
+def render_jobs(jobs, stream_mode):
+    queue = get_job_queue()
+    st.markdown("### 🎉 Your Coaching Guide")
+    for job in jobs:
+        if len(jobs) > 1:
+            st.markdown(f"#### 📄 Page {job['params']['page']}")
+        if job["status"] == JOB_DONE:
+            render_result(st.empty(), job["result"])
+        elif job["status"] == JOB_FAILED:
+            st.error(f"{ERROR_PREFIX}: {job['error']}")
+        elif job["status"] == JOB_QUEUED:
+            position = queue.position(job["id"])
+            st.info(f"⏳ Waiting in line... (#{position})" if position else "⏳ Waiting in line...")
+        elif stream_mode and job["partial"]:
+            render_result(st.empty(), job["partial"])
+        else:
+            st.info("🤖 AI is preparing your coaching guide...It may take 30 seconds...")
+
+
+@st.fragment(run_every=1.0)
+def job_progress(job_ids, stream_mode):
+    # 1초마다 이 영역만 다시 그리며 작업 상태를 확인합니다. 모두 끝나면 전체를 한 번 다시 그립니다.
+    jobs = load_jobs(job_ids)
+    if all(job["status"] in JOB_FINISHED for job in jobs):
+        save_finished_jobs(jobs)
+        st.rerun()
+    render_jobs(jobs, stream_mode)
+
+
+def jobs_section(job_ids, stream_mode):
+    jobs = load_jobs(job_ids)
+    if not jobs:
+        return
+    if not all(job["status"] in JOB_FINISHED for job in jobs):
+        job_progress(job_ids, stream_mode)
+        return
+    save_finished_jobs(jobs)
+    # 업로드가 살아 있고 모두 성공했다면 위의 업로드 영역이 결과를 그립니다.
+    # 새로고침 등으로 업로드가 사라졌거나 실패한 페이지가 있으면 여기서 작업 결과를 직접 보여줍니다.
+    if st.session_state.get("uploads") and all(job["status"] == JOB_DONE for job in jobs):
+        return
+    render_jobs(jobs, stream_mode)
+    show_disclaimer()
+
+
+def show_disclaimer():
+    st.markdown("""
+        <div style="text-align: center; font-size: 0.75rem; color: #6B7280; margin-top: 30px; margin-bottom: 50px;">
+            ⚠️ <b>Disclaimer:</b> This tool supports parents but does not replace teachers.
+        </div>
+    """, unsafe_allow_html=True)
+
+
 with st.container():
     
     col1, col2 = st.columns(2)
@@ -186,41 +1312,12 @@ with st.container():
     st.markdown("### 📸 Upload Homework")
     st.caption("Tap 'Browse files' below to take a photo or choose from gallery.")
     
-    image_data = st.file_uploader(
-        "Upload Image or Take Photo", 
-        type=["jpg", "png", "jpeg"], 
-        label_visibility="collapsed"
-    )
+    homework_fragment(parent_lang.split("(")[0].strip(), target_lang, stream_mode, dense_mode, prefetch_mode)
 
-    if image_data is not None:
-        image = Image.open(image_data)
-        
-        st.markdown("### Preview")
-        st.image(image, caption="Uploaded Homework", use_column_width=True)
-        
-        st.markdown("###") 
-        
-        submit = st.button("🚀 Activate Super Parent Mode", type="primary", use_container_width=True)
-
-        if submit:
-            status_text = st.empty()
-            status_text.info("🤖 AI is preparing your coaching guide...It may take 30 seconds...")
-            
-            p_lang_clean = parent_lang.split("(")[0].strip()
-            response_text = get_gemini_response(image, p_lang_clean, target_lang)
-            
-            if "Error:" in response_text:
-                status_text.error("❌ Error Occurred")
-                st.error(response_text)
-            else:
-                status_text.success("✅ Ready to teach!")
-                st.markdown("### 🎉 Your Coaching Guide")
-                
-                # 결과 박스 표시
-                st.markdown(f'<div class="result-box">{response_text}</div>', unsafe_allow_html=True)
-                
-                st.markdown("""
-                    <div style="text-align: center; font-size: 0.75rem; color: #6B7280; margin-top: 30px; margin-bottom: 50px;">
-                        ⚠️ <b>Disclaimer:</b> This tool supports parents but does not replace teachers.
-                    </div>
-                """, unsafe_allow_html=True)
\ No newline at end of file
+    if BACKGROUND_JOBS:
+        jobs_section([j for j in st.query_params.get("jobs", "").split(",") if j], stream_mode)
+
+# 전체 재실행 시간 (지표로만 남깁니다. 세션 보관 전/후 비교는 bench_rerun.py)
+REGISTRY.observe("rerun", time.perf_counter() - RUN_STARTED)
+record_cold_start()
+start_background_warm_up()
@@ -1,6 +1,11 @@
 import streamlit as st
 import google.generativeai as genai
 from PIL import Image
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from backend import MODEL_NAME
+from prompts import get_variant
+from usage import UsageStore, usage_counts
 
 # ==========================================
 # 1. 기본 설정
@@ -15,7 +20,6 @@ else:
         st.stop()
 
 genai.configure(api_key=API_KEY)
-MODEL_NAME = "gemini-2.5-flash" 
 
 st.set_page_config(
     page_title="Super Parents: Heros Across Languages",
@@ -26,30 +30,24 @@ st.set_page_config(
 # ==========================================
 # [AI Function]
 # ==========================================
+def record_usage(response, parent_lang, homework_lang, variant):
+    # app.py 와 같은 사용량 파일에 남겨서 프롬프트 버전끼리 비용을 비교합니다.
+    counts = usage_counts(response)
+    if counts is None:
+        return
+    ctx = get_script_run_ctx()
+    session = ctx.session_id if ctx is not None else "background"
+    UsageStore().record(session, parent_lang, homework_lang, MODEL_NAME, f"{variant.key}:{variant.hash[:8]}", counts)
+
 def get_gemini_response(image, parent_lang, homework_lang):
-    prompt = f"""
-    ### Role & Objective
-    You are the **Lead AI Tutor** for the app "Super Parents".
-    Your goal is to empower a parent who speaks **[ {parent_lang} ]** to perfectly understand and guide their child's homework (originally in **[ {homework_lang} ]**).
-
-    ### Instructions
-    Analyze the provided homework image and generate a structured guide.
-    **The final output must be written entirely in {parent_lang}.**
-
-    ### Output Format
-    1. **🎯 Homework Overview (1-Sentence Summary)**
-    2. **🗣️ Coaching Guide (Conversational Scripts)**
-    3. **📝 Essential Vocabulary (Table Format)**
-    4. **💡 Teacher's Pro Tip**
-
-    ### Tone & Style
-    - Professional, supportive, and encouraging.
-    - Use clear Markdown.
-    """
+    # 프롬프트는 prompts.py 레지스트리에서 가져옵니다 (이 화면의 기본값은 tutor@2).
+    variant = get_variant(st.secrets.get("PROMPT_VARIANT", "tutor@2"))
+    prompt = variant.render(parent_lang, homework_lang)
     try:
         model = genai.GenerativeModel(MODEL_NAME)
         content_input = [prompt, image[0]] if isinstance(image, list) else [prompt, image]
         response = model.generate_content(content_input)
+        record_usage(response, parent_lang, homework_lang, variant)
         return response.text
     except Exception as e:
         return f"Error occurred during analysis: {e}"
@@ -0,0 +1,287 @@
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+
+from result_cache import image_fingerprint
+from usage import usage_counts
+
+# ==========================================
+# 교체 가능한 Gemini 백엔드 (live / record / replay)
+# ==========================================
+# 앱은 get_model() 이 돌려주는 객체의 generate_content / count_tokens 만 씁니다.
+# 그 자리에 같은 모양의 객체를 넣어서 API 키나 네트워크 없이 앱 전체를 돌릴 수 있게 합니다.
+#   live   : 실제 genai.GenerativeModel
+#   record : 실제 호출 + 요청 지문(fingerprint)별로 응답/토큰/지연을 파일로 저장
+#   replay : 저장된 응답을 돌려줍니다. 녹화가 없으면 스키마에 맞는 가짜 응답을 만듭니다(stub).
+#            지연(배율 또는 고정값)과 오류 비율을 설정해서 느린/불안정한 백엔드도 흉내냅니다.
+
+DEFAULT_RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "recordings")
+
+# 기본 모델. 앱, 예전 화면(_app.py, app_20251120.py), 측정 스크립트가 모두 이 이름을 씁니다.
+MODEL_NAME = "gemini-2.5-flash"
+
+MODES = ("live", "record", "replay")
+# 측정 스크립트의 --backend 선택지 (bench_model)
+BENCH_BACKENDS = ("live", "record", "replay", "stub")
+
+STUB_TEXT = (
+    "### 1. Detailed Solution\n\n(stub)\n\n### 2. Coaching Guide\n\n(stub)\n\n"
+    "### 3. Essential Vocabulary\n\n(stub)\n\n### 4. Praise the Hero\n\n(stub)"
+)
+STUB_EXTRACTION = {
+    "subject": "Math",
+    "topic": "Addition",
+    "homework_language": "English",
+    "reading_summary": "",
+    "questions": [{"number": "1", "question": "2 + 3", "answer": "5", "steps": ["2 + 3 = 5"], "explanation": "stub"}],
+    "vocabulary": [{"term": "sum", "meaning_en": "the result of adding"}],
+}
+STUB_CHUNKS = 8
+# 토큰 어림값: 글자 4개 ≈ 1 토큰, 이미지 1장 ≈ 258 토큰
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+
+
+class FixtureUpload(io.BytesIO):
+    # st.file_uploader 의 UploadedFile 흉내 (name / size / file_id). 측정 스크립트가 세션에 넣어 씁니다.
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.file_id = hashlib.sha256(data).hexdigest()
+
+
+class SyntheticError(Exception):
+    # scheduler.is_retryable 이 재시도 대상으로 보도록 HTTP 상태 코드를 붙입니다.
+    def __init__(self, code=503):
+        super().__init__(f"synthetic backend error ({code})")
+        self.code = code
+
+
+class ModalityCount:
+    def __init__(self, modality, token_count):
+        self.modality = modality
+        self.token_count = token_count
+
+
+class Usage:
+    def __init__(self, prompt_token_count=0, candidates_token_count=0, image_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+        self.prompt_tokens_details = [ModalityCount("IMAGE", image_token_count)] if image_token_count else []
+
+
+class Chunk:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class TokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+def part_digest(part):
+    if isinstance(part, str):
+        return "text:" + hashlib.sha256(part.encode("utf-8")).hexdigest()
+    if isinstance(part, dict) and "data" in part:
+        return f"{part.get('mime_type', '')}:" + hashlib.sha256(part["data"]).hexdigest()
+    if hasattr(part, "tobytes"):
+        return "image:" + image_fingerprint(part)
+    return "repr:" + hashlib.sha256(repr(part).encode("utf-8")).hexdigest()
+
+
+def fingerprint(model_name, contents, kwargs):
+    # 같은 모델 + 같은 입력(텍스트/이미지 바이트) + 같은 생성 설정이면 같은 지문. 타임아웃 같은 전송 옵션은 뺍니다.
+    contents = contents if isinstance(contents, (list, tuple)) else [contents]
+    config = json.dumps(kwargs.get("generation_config", {}), sort_keys=True, default=str)
+    raw = "\x1f".join([model_name, config] + [part_digest(part) for part in contents])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(contents):
+    contents = contents if isinstance(contents, (list, tuple)) else [contents]
+    return sum(len(part) // CHARS_PER_TOKEN if isinstance(part, str) else IMAGE_TOKENS for part in contents)
+
+
+def estimate_image_tokens(contents):
+    contents = contents if isinstance(contents, (list, tuple)) else [contents]
+    return sum(IMAGE_TOKENS for part in contents if not isinstance(part, str))
+
+
+def stub_value(schema):
+    kind = schema["type"]
+    if kind == "STRING":
+        return "stub"
+    if kind == "ARRAY":
+        return [stub_value(schema["items"])]
+    return {key: stub_value(sub) for key, sub in schema["properties"].items()}
+
+
+def stub_text(kwargs):
+    config = kwargs.get("generation_config") or {}
+    if config.get("response_schema"):
+        return json.dumps(stub_value(config["response_schema"]), ensure_ascii=False)
+    if config.get("response_mime_type") == "application/json":
+        return json.dumps(STUB_EXTRACTION, ensure_ascii=False)
+    return STUB_TEXT
+
+
+def split_chunks(text, count):
+    size = max(1, -(-len(text) // count))
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class Response:
+    # generate_content 결과 흉내: 스트리밍이 아니면 .text, 스트리밍이면 청크 이터레이터
+    # recorded_latency 는 녹화 당시의 실제 지연(초)입니다. 지연 배율과 관계없이 벤치마크가 그대로 씁니다.
+    def __init__(self, chunks, usage, first_delay, chunk_delay, stream, recorded_latency=None):
+        self.chunks = chunks
+        self.recorded_latency = recorded_latency
+        self.usage_metadata = usage
+        self.first_delay = first_delay
+        self.chunk_delay = chunk_delay
+        self.stream = stream
+        if not stream:
+            time.sleep(first_delay + chunk_delay * len(chunks))
+        self.text = "".join(chunks)
+
+    def __iter__(self):
+        for i, text in enumerate(self.chunks):
+            time.sleep(self.first_delay if i == 0 else self.chunk_delay)
+            yield Chunk(text, self.usage_metadata if i == len(self.chunks) - 1 else None)
+
+
+class RecordingModel:
+    def __init__(self, model, model_name, path=DEFAULT_RECORDINGS_PATH):
+        self.model = model
+        self.model_name = model_name
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def count_tokens(self, contents):
+        return self.model.count_tokens(contents)
+
+    def _save(self, key, chunks, usage, first_latency, latency):
+        counts = usage_counts(Chunk("", usage)) or {}
+        entry = {
+            "model": self.model_name,
+            "chunks": chunks,
+            "prompt_tokens": counts.get("prompt_tokens", 0),
+            "image_tokens": counts.get("image_tokens", 0),
+            "output_tokens": counts.get("output_tokens", 0),
+            "first_latency": first_latency,
+            "latency": latency,
+        }
+        tmp = os.path.join(self.path, f"{key}.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, f"{key}.json"))
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        key = fingerprint(self.model_name, contents, kwargs)
+        start = time.perf_counter()
+        response = self.model.generate_content(contents, stream=stream, **kwargs)
+        if not stream:
+            latency = time.perf_counter() - start
+            self._save(key, [response.text], response.usage_metadata, latency, latency)
+            return response
+        return self._tee(key, response, start)
+
+    def _tee(self, key, response, start):
+        chunks, first_latency, usage = [], None, None
+        for chunk in response:
+            if first_latency is None:
+                first_latency = time.perf_counter() - start
+            try:
+                chunks.append(chunk.text)
+            except ValueError:
+                pass
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        self._save(key, chunks, usage, first_latency or 0.0, time.perf_counter() - start)
+
+
+class ReplayModel:
+    def __init__(self, model_name, path=DEFAULT_RECORDINGS_PATH, latency=None, latency_scale=1.0,
+                 error_rate=0.0, stub_missing=True, seed=None, stub=None, stub_chunks=STUB_CHUNKS):
+        # latency: 고정 지연(초). None 이면 녹화된 지연 x latency_scale, 녹화가 없으면 1초.
+        # stub(contents, kwargs) -> 텍스트: 녹화가 없을 때 쓸 가짜 응답 (기본은 stub_text), stub_chunks 조각으로 스트리밍.
+        # path 가 None 이면 녹화를 읽지 않고 늘 가짜 응답을 씁니다.
+        self.model_name = model_name
+        self.stub = stub
+        self.stub_chunks = stub_chunks
+        self.path = path
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.stub_missing = stub_missing
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def count_tokens(self, contents):
+        return TokenCount(estimate_tokens(contents))
+
+    def _load(self, key):
+        if self.path is None:
+            return None
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        with self.lock:
+            fail = self.random.random() < self.error_rate
+        if fail:
+            raise SyntheticError(self.random.choice((429, 503)))
+        key = fingerprint(self.model_name, contents, kwargs)
+        entry = self._load(key)
+        if entry is None:
+            if not self.stub_missing:
+                raise KeyError(f"No recording for request {key[:12]}")
+            text = self.stub(contents, kwargs) if self.stub else stub_text(kwargs)
+            entry = {
+                "chunks": split_chunks(text, self.stub_chunks),
+                "prompt_tokens": estimate_tokens(contents),
+                "image_tokens": estimate_image_tokens(contents),
+                "output_tokens": len(text) // CHARS_PER_TOKEN,
+                "first_latency": 0.3,
+                "latency": 1.0,
+            }
+        if self.latency is not None:
+            total, first = self.latency, self.latency * 0.3
+        else:
+            total = entry["latency"] * self.latency_scale
+            first = entry["first_latency"] * self.latency_scale
+        if stream:
+            chunks = entry["chunks"]
+            chunk_delay = max(0.0, total - first) / max(1, len(chunks) - 1)
+        else:
+            chunks = ["".join(entry["chunks"])]
+            chunk_delay = max(0.0, total - first)
+        usage = Usage(entry["prompt_tokens"], entry["output_tokens"], entry.get("image_tokens", 0))
+        return Response(chunks, usage, first, chunk_delay, stream, recorded_latency=entry["latency"])
+
+
+def bench_model(backend, recordings=DEFAULT_RECORDINGS_PATH, model_name=MODEL_NAME, stub=None, latency=None,
+                latency_scale=0.0):
+    # 측정 스크립트용 모델. live / record 만 실제 API 를 부르고(GOOGLE_API_KEY), SDK 도 그때만 import 합니다.
+    #   replay : 녹화된 응답만 씁니다 (없으면 KeyError). 지연은 녹화값 x latency_scale 만큼 기다립니다.
+    #   stub   : 녹화를 읽지 않는 가짜 응답 (stub 함수, 없으면 stub_text). latency 초를 기다립니다.
+    if backend in ("live", "record"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+        model = genai.GenerativeModel(model_name)
+        return RecordingModel(model, model_name, path=recordings) if backend == "record" else model
+    if backend == "replay":
+        return ReplayModel(model_name, path=recordings, latency_scale=latency_scale, stub_missing=False)
+    return ReplayModel(model_name, path=None, latency=latency, latency_scale=0.0, stub=stub)
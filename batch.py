@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ==========================================
+# 여러 페이지 동시 처리
+# ==========================================
+# 페이지마다 fn(item) 을 스레드 풀에서 동시에 실행하고, 끝나는 순서대로 (index, result, error) 를 돌려줍니다.
+# 한 페이지가 실패해도 나머지는 계속 진행됩니다.
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def run_batch(fn, items, max_workers=DEFAULT_MAX_WORKERS, wrap=None):
+    # wrap: 워커 스레드에서 실행될 callable 을 감싸는 함수 (예: Streamlit 컨텍스트 부착)
+    items = list(items)
+    if not items:
+        return
+    task = wrap(fn) if wrap is not None else fn
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="homework-page") as pool:
+        futures = {pool.submit(task, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result(), None
+            except Exception as e:
+                yield index, None, e
@@ -0,0 +1,86 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import google.generativeai as genai
+
+from backend import MODEL_NAME
+
+# ==========================================
+# 클라이언트 재사용 벤치마크 (로컬 스텁 서버)
+# ==========================================
+# 네트워크/API 키 없이, generateContent 를 흉내내는 로컬 HTTP 서버에 대해
+# "매 요청마다 configure + GenerativeModel 생성" 과 "한 번 만들어 재사용" 의 요청당 오버헤드를 비교합니다.
+# 사용법: python bench_client.py --requests 200
+
+STUB_RESPONSE = json.dumps({
+    "candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}, "finishReason": "STOP"}],
+    "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+}).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def configure(endpoint):
+    genai.configure(api_key="stub", transport="rest", client_options={"api_endpoint": endpoint})
+
+
+def run(label, n, call):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{label:<24} mean {statistics.mean(timings):7.2f} ms  "
+        f"p50 {timings[len(timings) // 2]:7.2f} ms  p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms"
+    )
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def fresh_client():
+        # 기존 app.py 방식: 재실행마다 configure, 요청마다 새 모델
+        configure(endpoint)
+        genai.GenerativeModel(MODEL_NAME).generate_content("ping")
+
+    configure(endpoint)
+    shared = genai.GenerativeModel(MODEL_NAME)
+    shared.generate_content("ping")
+
+    def reused_client():
+        shared.generate_content("ping")
+
+    before = run("before (fresh client)", args.requests, fresh_client)
+    after = run("after (shared client)", args.requests, reused_client)
+    print(f"\nper-request overhead saved: {before - after:.2f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
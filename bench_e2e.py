@@ -0,0 +1,136 @@
+import argparse
+import io
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image, ImageDraw
+
+from backend import FixtureUpload
+
+# ==========================================
+# 전체 흐름 성능 점검 (AppTest + replay 백엔드)
+# ==========================================
+# streamlit.testing 의 AppTest 로 app.py 를 실제처럼 실행해서 업로드 -> 버튼 -> 결과 표시까지의
+# 시간과 메모리(tracemalloc 최고치)를 경로별로 재고, 한도를 넘으면 종료 코드 1 로 끝납니다.
+# API 키와 네트워크가 필요 없습니다 (GEMINI_BACKEND = "replay", 녹화가 없으면 가짜 응답).
+# AppTest 는 파일 업로드를 못 하므로 사진은 세션의 fixture_uploads 로 넣습니다 (replay 에서만 읽음).
+# python bench_e2e.py --latency 1.0 --max-seconds 15 --max-mb 150
+# python bench_e2e.py --paths stream,jobs --error-rate 0.1
+
+PATHS = {
+    "stream": {"secrets": {"BACKGROUND_JOBS": False}},
+    "non-stream": {"secrets": {"BACKGROUND_JOBS": False}, "toggles": {"Streaming Mode": False}},
+    "batch": {"secrets": {"BACKGROUND_JOBS": False}, "pages": 3},
+    "jobs": {"secrets": {"BACKGROUND_JOBS": True}},
+    "jobs-batch": {"secrets": {"BACKGROUND_JOBS": True}, "pages": 3},
+    "single-call": {"secrets": {"BACKGROUND_JOBS": False, "TWO_STAGE": False}},
+    "dense": {"secrets": {"BACKGROUND_JOBS": False}, "toggles": {"Dense Page Mode": True}},
+    "prefetch": {"secrets": {"BACKGROUND_JOBS": False}, "toggles": {"Start Early": True}, "think_time": 2.0},
+}
+
+# 결과가 그려졌는지: 2단계 가이드의 섹션 제목과 단일 호출 Markdown 의 섹션 제목이 모두 이 말을 포함합니다.
+RESULT_MARKER = "Detailed Solution"
+
+
+def worksheet(seed):
+    # 품질 검사를 통과하는 선명한 가짜 학습지. 씨앗마다 모양이 달라 캐시에 걸리지 않습니다.
+    rng = random.Random(seed)
+    image = Image.new("L", (1200, 1600), 255)
+    draw = ImageDraw.Draw(image)
+    y = 100
+    while y < 1450:
+        for _ in range(rng.randint(1, 3)):
+            draw.rectangle((100, y, rng.randint(600, 1100), y + 14), fill=0)
+            y += 30
+        y += rng.randint(60, 140)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def result_count(at):
+    return sum(RESULT_MARKER in element.value for element in at.markdown)
+
+
+def run_path(name, spec, args, cache_dir, seed):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=args.timeout)
+    at.secrets.update({
+        "GEMINI_BACKEND": "replay",
+        "REPLAY_LATENCY": args.latency,
+        "REPLAY_ERROR_RATE": args.error_rate,
+        "CACHE_DIR": cache_dir,
+        "METRICS_FILE": "",
+        **spec.get("secrets", {}),
+    })
+    pages = spec.get("pages", 1)
+    at.run()
+    for toggle in at.sidebar.toggle:
+        for label, value in spec.get("toggles", {}).items():
+            if label in toggle.label:
+                toggle.set_value(value)
+    at.session_state["fixture_uploads"] = [
+        FixtureUpload(f"{name}-{i}.jpg", worksheet(seed * 100 + i)) for i in range(pages)
+    ]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    at.run()
+    time.sleep(spec.get("think_time", 0.0))
+    submit = next(button for button in at.button if "Super Parent Mode" in button.label)
+    clicked = time.perf_counter()
+    submit.click().run()
+    # 작업 큐 경로는 결과가 나올 때까지 폴링 영역이 다시 그려지도록 재실행합니다.
+    while result_count(at) < pages and not at.exception and time.perf_counter() - clicked < args.timeout:
+        time.sleep(0.2)
+        at.run()
+    finished = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    errors = [element.value for element in at.error] + [str(e.value) for e in at.exception]
+    return {
+        "path": name,
+        "pages": pages,
+        "upload_s": clicked - start,
+        "submit_s": finished - clicked,
+        "peak_mb": peak / 1024 / 1024,
+        "ok": result_count(at) >= pages and not errors,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--latency", type=float, default=1.0, help="synthetic seconds per model call")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-seconds", type=float, default=15.0, help="budget from click to rendered result")
+    parser.add_argument("--max-mb", type=float, default=150.0, help="budget for peak traced memory per path")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    failed = False
+    # 작업 워커 스레드가 끝난 뒤에도 캐시 폴더에 쓰고 있을 수 있어서 지우기 실패는 무시합니다.
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as cache_dir:
+        print(f"{'path':<12} {'pages':>5} {'upload s':>9} {'submit s':>9} {'peak MB':>8}  result")
+        for seed, name in enumerate(p.strip() for p in args.paths.split(",") if p.strip()):
+            row = run_path(name, PATHS[name], args, cache_dir, seed)
+            over = row["submit_s"] > args.max_seconds or row["peak_mb"] > args.max_mb
+            status = "ok" if row["ok"] and not over else ("OVER BUDGET" if row["ok"] else "FAILED")
+            failed |= status != "ok"
+            print(
+                f"{row['path']:<12} {row['pages']:>5} {row['upload_s']:9.2f} {row['submit_s']:9.2f} "
+                f"{row['peak_mb']:8.1f}  {status}"
+            )
+            for error in row["errors"]:
+                print(f"{'':<12} ! {error}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import tempfile
+import time
+
+from backend import ReplayModel
+from guide import guide_markdown, guide_schema, parse_partial_sections
+
+# ==========================================
+# 첫 내용이 보일 때까지의 시간 (단일 호출 vs 2단계)
+# ==========================================
+# 2단계 모드는 1단계 추출(JSON, 스트리밍 안 함)이 끝나야 2단계 가이드 스트리밍이 시작됩니다.
+# 버튼 -> 화면에 첫 내용이 보일 때까지와 전체 완료 시간을 세 가지로 비교합니다.
+#   single-call        : Markdown 한 번 스트리밍. 첫 글자가 오면 바로 보입니다.
+#   two-stage/section  : 가이드 JSON 의 최상위 섹션이 통째로 닫혀야 보입니다 (예전 화면).
+#   two-stage/item     : 풀이/어휘 섹션은 끝난 항목부터 보입니다 (지금 화면).
+# 모델은 replay 백엔드의 가짜 응답(문항 N 개 분량)이라 API 키가 필요 없습니다.
+# 지연은 replay 규칙 그대로: 첫 조각은 전체의 30%, 나머지는 조각마다 고르게.
+# python bench_first_content.py --questions 8 --extract-latency 4 --guide-latency 8
+
+
+def sample_guide(questions):
+    # 실제 답변과 비슷한 길이의 가이드 (문항마다 풀이 단계 3개 + 설명)
+    return {
+        "solution": [
+            {
+                "number": str(i),
+                "question": f"Reken uit: {10 + i} + {20 + i} en leg uit hoe je het hebt gedaan.",
+                "answer": str(30 + 2 * i),
+                "steps": [f"Stap {s}: tel eerst de tientallen en daarna de eenheden bij elkaar op." for s in range(1, 4)],
+                "explanation": "Splits beide getallen in tientallen en eenheden, tel die apart op en voeg ze samen. " * 2,
+            }
+            for i in range(1, questions + 1)
+        ],
+        "coaching": {
+            "how_to_explain": ["Laat uw kind eerst de tientallen tellen met blokjes of geld."] * 3,
+            "questions_to_ask": ["Hoeveel tientallen zie je in dit getal?"] * 3,
+        },
+        "vocabulary": [
+            {"word": f"woord {i}", "meaning": "betekenis in de taal van de ouder", "pronunciation": "uitspraak"}
+            for i in range(6)
+        ],
+        "praise": {"say_to_child": "Goed gedaan!", "pronunciation": "chood che-daan", "meaning": "Well done!"},
+    }
+
+
+def make_stub(questions):
+    guide = sample_guide(questions)
+    extraction = {
+        "subject": "Math",
+        "topic": "Addition",
+        "homework_language": "Dutch",
+        "reading_summary": "",
+        "questions": [
+            {"number": q["number"], "question": q["question"], "answer": q["answer"], "steps": q["steps"],
+             "explanation": q["explanation"]}
+            for q in guide["solution"]
+        ],
+        "vocabulary": [{"term": v["word"], "meaning_en": v["meaning"]} for v in guide["vocabulary"]],
+    }
+
+    def stub(contents, kwargs):
+        config = kwargs.get("generation_config") or {}
+        if config.get("response_schema"):
+            return json.dumps(guide, ensure_ascii=False)
+        if config.get("response_mime_type") == "application/json":
+            return json.dumps(extraction, ensure_ascii=False)
+        return guide_markdown(guide)
+
+    return stub
+
+
+def stream(model, contents, visible, **kwargs):
+    # (첫 내용까지 초, 스트림 끝까지 초)
+    start = time.perf_counter()
+    first = None
+    text = ""
+    for chunk in model.generate_content(contents, stream=True, **kwargs):
+        text += chunk.text
+        if first is None and visible(text):
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def single_call(models):
+    return stream(models["guide"], ["single-call prompt", "image"], lambda text: bool(text.strip()))
+
+
+def two_stage(models, partial_items):
+    start = time.perf_counter()
+    models["extract"].generate_content(
+        ["extraction prompt", "image"], generation_config={"response_mime_type": "application/json"}
+    ).text
+    waited = time.perf_counter() - start
+    first, total = stream(
+        models["guide"],
+        ["guide prompt"],
+        lambda text: bool(parse_partial_sections(text, partial_items=partial_items)),
+        generation_config={"response_mime_type": "application/json", "response_schema": guide_schema()},
+    )
+    return waited + first, waited + total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--extract-latency", type=float, default=4.0, help="seconds for the stage-1 extraction")
+    parser.add_argument("--guide-latency", type=float, default=8.0, help="seconds for a full guide stream")
+    parser.add_argument("--chunks", type=int, default=40, help="streamed chunks per guide")
+    args = parser.parse_args()
+
+    stub = make_stub(args.questions)
+    with tempfile.TemporaryDirectory() as recordings:
+        models = {
+            "extract": ReplayModel("bench", path=recordings, latency=args.extract_latency, stub=stub),
+            "guide": ReplayModel(
+                "bench", path=recordings, latency=args.guide_latency, stub=stub, stub_chunks=args.chunks
+            ),
+        }
+        print(f"{'mode':<20} {'first content s':>15} {'complete s':>11}")
+        for name, run in (
+            ("single-call", lambda: single_call(models)),
+            ("two-stage/section", lambda: two_stage(models, partial_items=False)),
+            ("two-stage/item", lambda: two_stage(models, partial_items=True)),
+        ):
+            first, total = run()
+            print(f"{name:<20} {first:>15.2f} {total:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import time
+
+from PIL import Image
+
+from backend import BENCH_BACKENDS, DEFAULT_RECORDINGS_PATH, bench_model
+from bench_e2e import worksheet
+from bench_first_content import make_stub
+from guide import SECTION_NAMES, guide_schema, validate_guide
+from image_prep import normalize_image
+from prompts import EXTRACTION_PROMPT, RENDER_MARKDOWN_PROMPT, build_guide_prompt
+
+# ==========================================
+# Markdown vs JSON 가이드 비교 벤치마크
+# ==========================================
+# 같은 1단계 추출 결과로 2단계를 Markdown 과 스키마 JSON 두 가지로 만들어
+# 출력 토큰 수와 지연 시간을 비교합니다.
+# 모델은 backend.bench_model 입니다 (bench_prompts 와 같은 --backend 선택지).
+#   --backend stub   : 기본값. 같은 내용(문항 --questions 개)의 가이드를 Markdown / JSON 으로 돌려주는 가짜 응답.
+#                      네트워크 없이 두 형식의 출력 토큰 차이를 봅니다. 지연은 의미가 없습니다.
+#   --backend record : 실제 API (GOOGLE_API_KEY 필요) + 응답을 --recordings 폴더에 녹화
+#   --backend replay : 녹화된 응답과 녹화 당시의 지연으로 다시 계산합니다 (네트워크 없음)
+# 폴더를 주지 않으면 bench_e2e 의 가짜 학습지(--generated 장)를 씁니다.
+# 사용법: python bench_guide_format.py fixtures/worksheets --parent-lang Korean --homework-lang Dutch --backend record
+
+
+def timed(model, contents, **kwargs):
+    start = time.perf_counter()
+    response = model.generate_content(contents, **kwargs)
+    latency = getattr(response, "recorded_latency", None)
+    if latency is None:
+        latency = time.perf_counter() - start
+    return response, latency
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="?")
+    parser.add_argument("--generated", type=int, default=4, help="generated worksheets when no folder is given")
+    parser.add_argument("--backend", choices=BENCH_BACKENDS, default="stub")
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS_PATH, help="folder written by record, read by replay")
+    parser.add_argument("--questions", type=int, default=8, help="questions per stub guide")
+    parser.add_argument("--parent-lang", default="Korean")
+    parser.add_argument("--homework-lang", default="Dutch")
+    args = parser.parse_args()
+
+    model = bench_model(args.backend, args.recordings, stub=make_stub(args.questions))
+
+    if args.fixtures:
+        paths = sorted(glob.glob(os.path.join(args.fixtures, "*")))
+        images = [
+            (os.path.basename(path), Image.open(path))
+            for path in paths if path.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+        ]
+    else:
+        images = [(f"generated-{seed}.jpg", Image.open(io.BytesIO(worksheet(seed)))) for seed in range(args.generated)]
+
+    rows = {"markdown": [], "json": []}
+    for name, image in images:
+        prepared = normalize_image(image)
+        extraction = model.generate_content(
+            [EXTRACTION_PROMPT.format(homework_lang=args.homework_lang), prepared.as_part()],
+            generation_config={"response_mime_type": "application/json"},
+        ).text
+
+        markdown, markdown_s = timed(model, [RENDER_MARKDOWN_PROMPT.format(
+            parent_lang=args.parent_lang, homework_lang=args.homework_lang, extraction=extraction
+        )])
+        structured, json_s = timed(
+            model,
+            [build_guide_prompt(args.parent_lang, args.homework_lang, extraction, SECTION_NAMES)],
+            generation_config={"response_mime_type": "application/json", "response_schema": guide_schema()},
+        )
+        validate_guide(json.loads(structured.text))
+
+        for label, response, seconds in (("markdown", markdown, markdown_s), ("json", structured, json_s)):
+            tokens = response.usage_metadata.candidates_token_count
+            rows[label].append((tokens, seconds))
+            print(f"{name:<30} {label:<9} {tokens:>6} output tokens  {seconds:6.1f} s")
+
+    if not rows["json"]:
+        raise SystemExit(f"No images found in {args.fixtures}")
+    print()
+    for label, values in rows.items():
+        print(
+            f"{label:<9} median {statistics.median(t for t, _ in values):7.0f} output tokens  "
+            f"median {statistics.median(s for _, s in values):5.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import glob
+import io
+import os
+import statistics
+import time
+
+from PIL import Image
+
+from backend import MODEL_NAME
+from bench_e2e import worksheet
+from image_prep import DEFAULT_FORMAT, DEFAULT_MAX_EDGE, normalize_image
+
+# ==========================================
+# 이미지 정규화 벤치마크
+# ==========================================
+# 사용법: python bench_image_prep.py [fixtures/worksheets] [--live]
+# 폴더를 주지 않으면 bench_e2e 의 가짜 학습지로 폰 카메라 사진(JPEG)과 스캔(PNG)을 만들어 씁니다.
+# --live 를 주면 GOOGLE_API_KEY 로 count_tokens / generate_content 를 원본과 정규화본에 각각 호출합니다.
+
+# 폰 카메라(12MP) 세로 사진과 A4 300dpi 스캔 크기
+PHOTO_SIZE = (3024, 4032)
+SCAN_SIZE = (2480, 3508)
+
+PROMPT = "Describe every question on this homework page."
+
+
+def measure_live(model, part):
+    tokens = model.count_tokens([PROMPT, part]).total_tokens
+    start = time.perf_counter()
+    model.generate_content([PROMPT, part])
+    return tokens, time.perf_counter() - start
+
+
+def load_fixtures(path):
+    paths = sorted(
+        p for p in glob.glob(os.path.join(path, "*"))
+        if p.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+    )
+    samples = []
+    for p in paths:
+        with open(p, "rb") as f:
+            samples.append((os.path.basename(p), f.read()))
+    return samples
+
+
+def generated_fixtures(count):
+    samples = []
+    for seed in range(count):
+        page = Image.open(io.BytesIO(worksheet(seed))).convert("RGB")
+        # 누런 종이색과 센서 노이즈를 얹어야 실제 사진처럼 JPEG 가 무거워집니다.
+        photo = Image.blend(
+            Image.composite(page, Image.new("RGB", page.size, (236, 228, 210)), page.convert("L")),
+            Image.effect_noise(page.size, 40).convert("RGB"),
+            0.06,
+        ).resize(PHOTO_SIZE, Image.BICUBIC)
+        buffer = io.BytesIO()
+        photo.save(buffer, format="JPEG", quality=95)
+        samples.append((f"photo-{seed}.jpg", buffer.getvalue()))
+        scan = Image.blend(page.convert("L"), Image.effect_noise(page.size, 40), 0.04).resize(SCAN_SIZE, Image.BICUBIC)
+        buffer = io.BytesIO()
+        scan.save(buffer, format="PNG")
+        samples.append((f"scan-{seed}.png", buffer.getvalue()))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="?", help="folder of photos; omit to use generated worksheets")
+    parser.add_argument("--generated", type=int, default=4, help="worksheets to generate without a folder")
+    parser.add_argument("--max-edge", type=int, default=DEFAULT_MAX_EDGE)
+    parser.add_argument("--format", default=DEFAULT_FORMAT)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    samples = load_fixtures(args.fixtures) if args.fixtures else generated_fixtures(args.generated)
+    if not samples:
+        raise SystemExit(f"No images found in {args.fixtures}")
+
+    model = None
+    if args.live:
+        import google.generativeai as genai
+        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+        model = genai.GenerativeModel(MODEL_NAME)
+
+    rows = []
+    for name, original_data in samples:
+        original_size = len(original_data)
+        prepared = normalize_image(
+            Image.open(io.BytesIO(original_data)), max_edge=args.max_edge, fmt=args.format, original_bytes=original_size
+        )
+        row = {
+            "name": name,
+            "before_bytes": original_size,
+            "after_bytes": len(prepared.data),
+            "prep_ms": prepared.elapsed * 1000,
+        }
+        if model is not None:
+            mime = "image/png" if name.lower().endswith(".png") else "image/jpeg"
+            row["before_tokens"], row["before_s"] = measure_live(model, {"mime_type": mime, "data": original_data})
+            row["after_tokens"], row["after_s"] = measure_live(model, prepared.as_part())
+        rows.append(row)
+
+    for row in rows:
+        line = f"{row['name']:<30} {row['before_bytes']:>10,} -> {row['after_bytes']:>9,} B  prep {row['prep_ms']:7.1f} ms"
+        if model is not None:
+            line += (
+                f"  tokens {row['before_tokens']:>5} -> {row['after_tokens']:>5}"
+                f"  latency {row['before_s']:5.1f}s -> {row['after_s']:5.1f}s"
+            )
+        print(line)
+
+    before = sum(r["before_bytes"] for r in rows)
+    after = sum(r["after_bytes"] for r in rows)
+    print(f"\n{len(rows)} images: {before:,} -> {after:,} bytes ({100 * (1 - after / before):.0f}% smaller)")
+    print(f"prep time median {statistics.median(r['prep_ms'] for r in rows):.1f} ms")
+    if model is not None:
+        print(
+            f"latency median {statistics.median(r['before_s'] for r in rows):.1f}s"
+            f" -> {statistics.median(r['after_s'] for r in rows):.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import collections
+import contextlib
+import importlib.metadata
+import json
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock
+
+from backend import FixtureUpload
+from bench_e2e import result_count, worksheet
+from metrics import percentile
+
+# ==========================================
+# 동시 접속 부하 테스트
+# ==========================================
+# 한 서버 프로세스에 부모님 N 명이 동시에 들어온 상황을 흉내내서, N 을 늘려가며
+# 처리량(req/s), 클릭 -> 결과 지연 p50/p95/p99, 세션당 RSS, 스크립트 스레드 점유율을 잽니다.
+# 각 가상 세션은 테마/언어를 바꾸고, 매번 다른 사진(1~2장)을 올리고, 버튼을 누릅니다.
+# 세션은 AppTest 로 만듭니다: 서버와 똑같이 세션마다 스크립트 스레드가 따로 돌고 st.cache_resource 는
+# 프로세스 전체가 공유합니다. 다만 `streamlit run` 서버를 띄우는 것이 아니라 같은 프로세스 안에서 돌리므로
+# 웹소켓 전송, 메시지 직렬화, tornado 이벤트 루프 비용은 들어가지 않습니다 (스크립트 실행 쪽 부하만 봅니다).
+# 모델은 replay 백엔드(가짜 응답 + 고정 지연)라 API 키가 필요 없습니다.
+# 실행할 때마다 .cache/load-reports/ 에 같은 형식의 JSON 보고서를 남겨서 실행끼리 비교합니다.
+# python bench_load.py --sessions 1,4,8,16 --iterations 3 --latency 1.0
+
+THEMES = ["Light Mode (Default)", "Dark Mode"]
+PARENT_LANGS = ["English", "Korean (한국어)", "Arabic (العربية)", "Turkish (Türkçe)", "Spanish (Español)"]
+HOMEWORK_LANGS = ["Dutch", "English", "German", "French"]
+
+DEFAULT_REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "load-reports")
+# shared_app_test_globals 가 바꾸는 Streamlit 내부를 확인한 버전 (major.minor).
+# requirements.txt 도 같은 범위로 고정합니다. 다른 버전에서는 내부를 건드리지 않고 멈춥니다.
+TESTED_STREAMLIT = "1.65"
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # /proc 이 없으면 최고치로 대신합니다 (macOS 는 바이트, Linux 는 KB).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def app_secrets(args, cache_dir):
+    return {
+        "GEMINI_BACKEND": "replay",
+        "REPLAY_LATENCY": args.latency,
+        "REPLAY_ERROR_RATE": args.error_rate,
+        "CACHE_DIR": cache_dir,
+        "METRICS_FILE": "",
+        "BACKGROUND_JOBS": args.jobs,
+    }
+
+
+@contextlib.contextmanager
+def shared_app_test_globals(secrets):
+    # AppTest.run() 은 실행마다 config(global.appTest), st.secrets, Runtime._instance 를 바꿨다가
+    # 끝나면 되돌립니다. 세션이 동시에 돌면 먼저 끝난 세션이 아직 도는 세션의 전역을 되돌려서
+    # 위젯 format_func 가 사라지거나(KeyError) st.secrets 가 비어 보입니다.
+    # 또 실행마다 app.py 를 새로 컴파일하는데, Python 3.11 의 compile() 은 여러 스레드에서 동시에 부르면
+    # "AST constructor recursion depth mismatch" 로 실패해서 빈 화면이 나옵니다.
+    # 서버 한 프로세스처럼 전역과 바이트코드 캐시를 부하 테스트 내내 하나로 고정합니다.
+    # 공개 API 가 아닌 내부를 바꾸므로 TESTED_STREAMLIT 버전에서만 합니다.
+    import streamlit as st
+
+    version = ".".join(st.__version__.split(".")[:2])
+    if version != TESTED_STREAMLIT:
+        raise SystemExit(
+            f"bench_load patches Streamlit {TESTED_STREAMLIT} internals, but {st.__version__} is installed. "
+            f"Install streamlit=={TESTED_STREAMLIT}.* (see requirements.txt) or re-check shared_app_test_globals."
+        )
+
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.bidi_component_registry = BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+
+    class DetachedRuntime(Runtime):
+        # AppTest 가 실행마다 대입하는 Runtime._instance 는 이 하위 클래스에만 남습니다.
+        pass
+
+    script_cache = ScriptCache()
+    saved = st.secrets, Runtime._instance, app_test.Runtime, local_script_runner.ScriptCache
+    st.secrets = Secrets()
+    st.secrets._secrets = dict(secrets)
+    Runtime._instance = runtime
+    app_test.Runtime = DetachedRuntime
+    local_script_runner.ScriptCache = lambda: script_cache
+    try:
+        with patch_config_options({"global.appTest": True}):
+            yield
+    finally:
+        st.secrets, Runtime._instance, app_test.Runtime, local_script_runner.ScriptCache = saved
+
+
+def select(elements, label, value):
+    for element in elements:
+        if element.label == label:
+            element.set_value(value)
+
+
+class Session:
+    def __init__(self, index, args, secrets):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.args = args
+        self.random = random.Random(index)
+        self.busy = 0.0
+        self.latencies = []
+        self.errors = []
+        self.at = AppTest.from_file("app.py", default_timeout=args.timeout)
+        self.at.secrets.update(secrets)
+
+    def run(self):
+        # 스크립트 스레드가 실제로 붙잡혀 있던 시간 (점유율 계산용)
+        start = time.perf_counter()
+        self.at.run()
+        self.busy += time.perf_counter() - start
+
+    def iteration(self, n):
+        at = self.at
+        select(at.sidebar.selectbox, "Theme Mode", self.random.choice(THEMES))
+        select(at.selectbox, "Select Parent Language", self.random.choice(PARENT_LANGS))
+        select(at.selectbox, "Select Homework Language", self.random.choice(HOMEWORK_LANGS))
+        pages = self.random.randint(1, 2)
+        at.session_state["fixture_uploads"] = [
+            FixtureUpload(f"s{self.index}-{n}-{i}.jpg", worksheet(self.random.getrandbits(32)))
+            for i in range(pages)
+        ]
+        self.run()
+        time.sleep(self.random.uniform(0, self.args.think_time))
+
+        submit = next((b for b in at.button if "Super Parent Mode" in b.label), None)
+        if submit is None:
+            self.errors.append("submit button missing")
+            return
+        clicked = time.perf_counter()
+        submit.click()
+        self.run()
+        while result_count(at) < pages and not at.exception and time.perf_counter() - clicked < self.args.timeout:
+            time.sleep(0.2)
+            self.run()
+        if result_count(at) >= pages and not at.error:
+            self.latencies.append(time.perf_counter() - clicked)
+        elif at.exception:
+            self.errors.append(at.exception[0].message)
+        elif at.error:
+            self.errors.append(at.error[0].value)
+        else:
+            self.errors.append("timed out")
+
+    def main(self):
+        self.run()
+        for n in range(self.args.iterations):
+            try:
+                self.iteration(n)
+            except Exception as e:
+                self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def run_level(n, args, cache_dir):
+    # 앞 단계에서 남은 캐시/모듈 메모리는 빼고, 이 단계에서 늘어난 만큼만 세션 수로 나눕니다.
+    baseline_rss = rss_mb()
+    secrets = app_secrets(args, cache_dir)
+    sessions = [Session(i, args, secrets) for i in range(n)]
+    threads = [threading.Thread(target=session.main, name=f"load-session-{i}") for i, session in enumerate(sessions)]
+    peak_rss, peak_threads = baseline_rss, threading.active_count()
+    with shared_app_test_globals(secrets):
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.25)
+            peak_rss = max(peak_rss, rss_mb())
+            peak_threads = max(peak_threads, threading.active_count())
+        wall = time.perf_counter() - start
+
+    latencies = [latency for session in sessions for latency in session.latencies]
+    errors = [error for session in sessions for error in session.errors]
+    busy = sum(session.busy for session in sessions)
+    return {
+        "sessions": n,
+        "completed": len(latencies),
+        "errors": len(errors),
+        # 실패 이유별 횟수 (보고서에서 어떤 실패였는지 확인용)
+        "error_reasons": dict(collections.Counter(error.partition("\n")[0][:120] for error in errors)),
+        "wall_s": wall,
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_s": percentile(latencies, 0.50),
+        "p95_s": percentile(latencies, 0.95),
+        "p99_s": percentile(latencies, 0.99),
+        "peak_rss_mb": peak_rss,
+        "rss_per_session_mb": (peak_rss - baseline_rss) / n,
+        # 세션 스크립트 스레드가 일하고 있던 시간 비율 (1.0 이면 모든 세션이 내내 스크립트 실행 중)
+        "script_busy": busy / (n * wall) if wall else 0.0,
+        "peak_threads": peak_threads,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="1,2,4,8")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=1.0, help="synthetic seconds per model call")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--think-time", type=float, default=2.0, help="max seconds between upload and submit")
+    parser.add_argument("--jobs", action=argparse.BooleanOptionalAction, default=True, help="BACKGROUND_JOBS")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--report-dir", default=DEFAULT_REPORT_DIR)
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    rows = []
+    print(f"{'N':>4} {'done':>5} {'err':>4} {'req/s':>6} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6} "
+          f"{'RSS MB':>7} {'MB/sess':>7} {'busy':>5} {'threads':>7}")
+    # 작업 워커 스레드가 끝난 뒤에도 캐시 폴더에 쓰고 있을 수 있어서 지우기 실패는 무시합니다.
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as cache_dir:
+        for n in levels:
+            row = run_level(n, args, cache_dir)
+            rows.append(row)
+            fmt = lambda value: f"{value:6.2f}" if value is not None else f"{'-':>6}"
+            print(
+                f"{row['sessions']:>4} {row['completed']:>5} {row['errors']:>4} {row['rps']:6.2f} "
+                f"{fmt(row['p50_s'])} {fmt(row['p95_s'])} {fmt(row['p99_s'])} "
+                f"{row['peak_rss_mb']:7.0f} {row['rss_per_session_mb']:7.1f} {row['script_busy']:5.0%} "
+                f"{row['peak_threads']:>7}"
+            )
+            for reason, count in row["error_reasons"].items():
+                print(f"{'':>4} {count:>5}x {reason}")
+
+    os.makedirs(args.report_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(args.report_dir, f"load-{stamp}-{git_revision()}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "revision": git_revision(),
+            "started": stamp,
+            "streamlit": importlib.metadata.version("streamlit"),
+            "config": {key: value for key, value in vars(args).items() if key != "report_dir"},
+            "levels": rows,
+        }, f, indent=2)
+    print(f"\nreport: {path}")
+
+
+if __name__ == "__main__":
+    main()
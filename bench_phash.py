@@ -0,0 +1,207 @@
+import argparse
+import glob
+import io
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFont
+
+from bench_e2e import worksheet
+from image_prep import normalize_image
+from metrics import percentile
+from phash_index import (
+    DEFAULT_MAX_DISTANCE,
+    DEFAULT_MAX_PIXEL_DIFF,
+    HASH_BITS,
+    Fingerprint,
+    NearDuplicateIndex,
+    fingerprint,
+    hamming,
+    thumbnail_distance,
+)
+
+# ==========================================
+# 유사 이미지 인덱스 벤치마크
+# ==========================================
+# 1) 정확도: 그룹 하나 = 같은 학습지를 다시 저장/축소/밝기만 바꾼 사진들.
+#    폴더를 주지 않으면 세트를 직접 만듭니다.
+#    - 같은 양식에 숫자만 다른 학습지 (--templates 장): 서로 절대 맞으면 안 되는 정밀도 세트.
+#      하나라도 맞으면 종료 코드 1 로 끝납니다.
+#    - bench_e2e 의 무작위 학습지 (--worksheets 장)
+#    각 학습지마다 재인코딩 변형을 만들어 재현율을 잽니다.
+#    python bench_phash.py
+#    실제 사진으로 잴 때: python bench_phash.py --fixtures fixtures/duplicates (폴더 하나 = 같은 학습지)
+#    폴더 구분 없이 사진만 있다면 --synthesize 로 변형을 만들어 씁니다.
+# 2) 속도: 파일(SQLite) 인덱스에 N 개를 넣고, 실제 앱처럼 매번 다른 프로세스의 추가분을 동기화하며 검색합니다.
+#    python bench_phash.py --size 300000
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def template_worksheet(seed):
+    # 제목/칸/문항 위치는 모두 같고 숫자만 다른 학습지 (같은 반의 다른 주차 숙제)
+    rng = random.Random(seed)
+    image = Image.new("L", (1240, 1754), 255)
+    draw = ImageDraw.Draw(image)
+    title, body = ImageFont.load_default(size=48), ImageFont.load_default(size=36)
+    draw.text((100, 80), "Rekenen - Week 12", font=title, fill=0)
+    draw.text((100, 160), "Naam: ____________", font=body, fill=0)
+    for i in range(12):
+        draw.text((100, 280 + i * 110), f"{i + 1}.  {rng.randint(10, 99)} + {rng.randint(10, 99)} = ______", font=body, fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def variants(image, rnd, count=4):
+    # 다시 저장(JPEG 품질), 축소, 밝기 변화. 각도/잘라내기가 다른 사진은 썸네일 확인에서 걸러지는 것이 정상입니다.
+    for _ in range(count):
+        v = ImageEnhance.Brightness(image).enhance(rnd.uniform(0.85, 1.15))
+        scale = rnd.uniform(0.5, 1.0)
+        v = v.resize((int(v.width * scale), int(v.height * scale)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        v.convert("RGB").save(buffer, format="JPEG", quality=rnd.randint(60, 90))
+        yield Image.open(buffer)
+
+
+def prepared(data):
+    # 업로드와 같은 JPEG -> normalize_image 경로
+    return normalize_image(Image.open(io.BytesIO(data))).image
+
+
+def generated_groups(templates, worksheets, rnd):
+    groups = []
+    pages = [("template", prepared(template_worksheet(seed))) for seed in range(templates)]
+    pages += [("worksheet", prepared(worksheet(seed))) for seed in range(worksheets)]
+    for kind, page in pages:
+        groups.append((kind, [fingerprint(page)] + [fingerprint(v) for v in variants(page, rnd)]))
+    return groups
+
+
+def load_groups(path, synthesize, rnd):
+    groups = []
+    if synthesize:
+        for file in sorted(glob.glob(os.path.join(path, "*"))):
+            if file.lower().endswith(EXTENSIONS):
+                image = Image.open(file).convert("RGB")
+                groups.append(("fixture", [fingerprint(image)] + [fingerprint(v) for v in variants(image, rnd)]))
+    else:
+        for folder in sorted(glob.glob(os.path.join(path, "*"))):
+            files = [f for f in sorted(glob.glob(os.path.join(folder, "*"))) if f.lower().endswith(EXTENSIONS)]
+            if files:
+                groups.append(("fixture", [fingerprint(Image.open(f)) for f in files]))
+    return groups
+
+
+def accuracy(groups, table_distance, max_distance, max_pixel_diff):
+    labelled = [(g, kind, fp) for g, (kind, fps) in enumerate(groups) for fp in fps]
+    print(f"{len(labelled)} images in {len(groups)} groups")
+    pairs = []
+    for (ga, ka, a), (gb, kb, b) in itertools.combinations(labelled, 2):
+        pairs.append((ga == gb, ka == kb == "template", hamming(a.value, b.value), thumbnail_distance(a.thumb, b.thumb)))
+
+    print("distance  hash-only precision  recall  | confirmed precision  recall")
+    for d in range(table_distance + 1):
+        row = []
+        for confirm in (False, True):
+            tp = fp = fn = 0
+            for same, _, distance, pixels in pairs:
+                match = distance <= d and (not confirm or pixels <= max_pixel_diff)
+                tp += match and same
+                fp += match and not same
+                fn += same and not match
+            row += [tp / (tp + fp) if tp + fp else 1.0, tp / (tp + fn) if tp + fn else 1.0]
+        print(f"{d:>8}  {row[0]:19.3f}  {row[1]:6.3f}  | {row[2]:19.3f}  {row[3]:6.3f}")
+
+    # 같은 양식의 다른 학습지끼리는 기본 설정(max_distance, max_pixel_diff)에서 하나도 맞으면 안 됩니다.
+    template_pairs = [p for p in pairs if p[1] and not p[0]]
+    leaked = sum(distance <= max_distance and pixels <= max_pixel_diff for _, _, distance, pixels in template_pairs)
+    if template_pairs:
+        closest = min(pixels for _, _, _, pixels in template_pairs)
+        print(
+            f"same-template different pages: {leaked}/{len(template_pairs)} matched "
+            f"(closest thumbnail diff {closest:.1f}, limit {max_pixel_diff:.1f})"
+        )
+    return leaked
+
+
+def latency(size, queries, max_distance, rnd):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "phash.sqlite3")
+        index = NearDuplicateIndex(path=path, max_distance=max_distance)
+        # 썸네일은 후보가 나왔을 때만 읽으므로, 근접 질의의 대상이 될 행에만 진짜 썸네일을 넣습니다.
+        targets = [fingerprint(prepared(worksheet(seed))) for seed in range(20)]
+        start = time.perf_counter()
+        conn = index._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO fingerprints (scope, hash, thumb, answer_key) VALUES (?, ?, ?, ?)",
+                ((
+                    "bench",
+                    (targets[i].value if i < len(targets) else rnd.getrandbits(HASH_BITS)).to_bytes(HASH_BITS // 8, "big"),
+                    targets[i].thumb if i < len(targets) else b"",
+                    str(i),
+                ) for i in range(size)),
+            )
+        conn.close()
+        # 새 프로세스가 뜬 것처럼 처음부터 읽어 들입니다.
+        index = NearDuplicateIndex(path=path, max_distance=max_distance)
+        print(f"indexed {len(index):,} fingerprints in {time.perf_counter() - start:.1f}s")
+
+        timings = []
+        hits = 0
+        for i in range(queries):
+            # 절반은 저장된 학습지에서 몇 비트만 바꾼 근접 질의 (썸네일 확인까지 감)
+            target = targets[rnd.randrange(len(targets))]
+            value = target.value if i % 2 else rnd.getrandbits(HASH_BITS)
+            if i % 2:
+                for bit in rnd.sample(range(HASH_BITS), rnd.randint(0, max_distance)):
+                    value ^= 1 << bit
+            query = Fingerprint(value, target.thumb)
+            start = time.perf_counter()
+            hits += index.lookup("bench", query) is not None
+            timings.append((time.perf_counter() - start) * 1e6)
+        print(
+            f"lookup (file-backed, sync each call) over {queries:,} queries, {hits:,} hits: "
+            f"p50 {percentile(timings, 0.50):.0f} us  p99 {percentile(timings, 0.99):.0f} us  max {max(timings):.0f} us"
+        )
+
+    image = prepared(worksheet(0))
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        fingerprint(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"fingerprint per upload: p50 {percentile(timings, 0.50):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures")
+    parser.add_argument("--synthesize", action="store_true")
+    parser.add_argument("--templates", type=int, default=30, help="same-template worksheets to generate")
+    parser.add_argument("--worksheets", type=int, default=10, help="random worksheets to generate")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    parser.add_argument("--max-pixel-diff", type=float, default=DEFAULT_MAX_PIXEL_DIFF)
+    parser.add_argument("--size", type=int, default=300_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    if args.fixtures:
+        groups = load_groups(args.fixtures, args.synthesize, rnd)
+    else:
+        groups = generated_groups(args.templates, args.worksheets, rnd)
+    leaked = accuracy(groups, max(args.max_distance, 10), args.max_distance, args.max_pixel_diff)
+    print()
+    latency(args.size, args.queries, args.max_distance, rnd)
+    if leaked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
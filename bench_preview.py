@@ -0,0 +1,106 @@
+import argparse
+import glob
+import hashlib
+import io
+import os
+import time
+
+from PIL import Image
+
+from bench_upload_memory import photo
+from image_prep import PREVIEW_WIDTH, THUMBNAIL_WIDTH, normalize_image, preview_bytes, preview_image
+
+# ==========================================
+# 미리보기 전송량 벤치마크
+# ==========================================
+# 미리보기 한 장을 그릴 때 브라우저가 받는 바이트와, 재실행(테마 전환 포함)마다 서버가 쓰는 인코딩 시간을
+# 방식별로 비교합니다. st.image 가 하는 일(긴 폭은 1460px 로 줄이고, JPEG 가 아니면 PNG 로 다시 인코딩,
+# 바이트 내용 해시로 미디어 URL 을 만듦)을 그대로 흉내내서 Streamlit 없이 잽니다.
+#   full      : 디코딩한 원본을 그대로 st.image (_app.py / app_20251120.py)
+#   pil       : 정규화본에서 700px 사본(PIL)을 만들어 st.image -> 재실행마다 PNG 로 인코딩
+#   thumbnail : 내용 해시로 캐시한 progressive JPEG 바이트 (app.py). 재실행 때는 캐시에서 꺼내기만 함
+# URL 이 같으면 브라우저는 다시 받지 않으므로, 두 번째 재실행부터 이미지 전송은 0 이고 나머지는 URL 이 든 작은 메시지뿐입니다.
+# python bench_preview.py fixtures/worksheets --reruns 10
+
+# st.image 의 최대 폭 (레티나 2배)
+MAXIMUM_CONTENT_WIDTH = 2 * 730
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def streamlit_bytes(image, width=-1):
+    # st.image(PIL 이미지) 가 미디어 파일로 보내는 바이트
+    fmt = "JPEG" if image.format == "JPEG" else "PNG"
+    limit = width if width > 0 else MAXIMUM_CONTENT_WIDTH
+    if image.width > limit:
+        image = image.copy()
+        image.thumbnail((limit, limit * 10))
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        image.convert("RGB").save(buffer, format="JPEG", quality=100)
+    else:
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def measure(label, render, reruns):
+    urls, sizes, elapsed = set(), [], []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        data = render()
+        elapsed.append(time.perf_counter() - start)
+        url = hashlib.sha224(data).hexdigest()
+        # 처음 보는 URL 만 브라우저가 받습니다.
+        sizes.append(0 if url in urls else len(data))
+        urls.add(url)
+    return {
+        "method": label,
+        "first_kb": sizes[0] / 1024,
+        "later_kb": sum(sizes[1:]) / max(1, reruns - 1) / 1024,
+        "total_kb": sum(sizes) / 1024,
+        "server_ms": sum(elapsed[1:]) / max(1, reruns - 1) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="?", help="directory of homework photos (default: synthetic 12 MP photo)")
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        paths = sorted(p for p in glob.glob(os.path.join(args.fixtures, "*")) if p.lower().endswith(EXTENSIONS))
+        if not paths:
+            raise SystemExit(f"No images found in {args.fixtures}")
+        sources = [(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    else:
+        sources = [("synthetic-12mp.jpg", photo(0, 4000, 3000))]
+
+    print(f"{'image':<22} {'method':<10} {'first KB':>9} {'rerun KB':>9} {'total KB':>9} {'server ms':>10}")
+    for name, raw in sources:
+        original = Image.open(io.BytesIO(raw))
+        original.load()
+        prepared = normalize_image(original, original_bytes=len(raw))
+        cache = {}
+
+        def thumbnail(width):
+            # st.cache_data(preview_thumbnail) 흉내: 내용 해시 + 폭으로 한 번만 인코딩
+            key = (prepared.sha256, width)
+            if key not in cache:
+                cache[key] = preview_bytes(prepared.image, width)
+            return cache[key]
+
+        rows = [
+            measure("full", lambda: streamlit_bytes(original), args.reruns),
+            measure("pil", lambda: streamlit_bytes(preview_image(prepared.image, PREVIEW_WIDTH)), args.reruns),
+            measure("thumbnail", lambda: thumbnail(PREVIEW_WIDTH), args.reruns),
+            measure("thumb-160", lambda: thumbnail(THUMBNAIL_WIDTH), args.reruns),
+        ]
+        for row in rows:
+            print(
+                f"{name[:22]:<22} {row['method']:<10} {row['first_kb']:9.1f} {row['later_kb']:9.1f} "
+                f"{row['total_kb']:9.1f} {row['server_ms']:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
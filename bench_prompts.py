@@ -0,0 +1,83 @@
+import argparse
+import glob
+import os
+import statistics
+import time
+
+from PIL import Image
+
+from backend import BENCH_BACKENDS, DEFAULT_RECORDINGS_PATH, MODEL_NAME, bench_model
+from image_prep import normalize_image
+from metrics import percentile
+from prompts import DEFAULT_VARIANT, PROMPT_VARIANTS, get_variant
+from usage import cost_usd, usage_counts
+
+# ==========================================
+# 프롬프트 A/B 벤치마크
+# ==========================================
+# 같은 학습지 묶음을 레지스트리의 프롬프트 버전마다 돌려서 입력/출력 토큰, 지연(p50/p95), 섹션 완전성을 비교합니다.
+# 모델은 앱과 같은 backend.py 의 녹화/재생 계층을 씁니다 (같은 요청 지문, 같은 녹화 파일).
+#   --backend live   : 실제 API (GOOGLE_API_KEY 필요)
+#   --backend record : 실제 API + 응답을 --recordings 폴더에 녹화
+#   --backend replay : 녹화된 응답을 그대로 다시 씁니다 (네트워크 없음, 녹화가 없으면 오류). 지연은 녹화 당시 값.
+#   --backend stub   : 프롬프트의 섹션 제목만 채운 가짜 응답. 입력 토큰(프롬프트 길이)과 하네스 자체를 점검할 때 씁니다.
+# python bench_prompts.py fixtures/worksheets --backend record
+# python bench_prompts.py fixtures/worksheets --backend replay
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def stub_sections(variant):
+    # 변형마다 요구하는 섹션 제목을 채운 가짜 답변
+    return lambda contents, kwargs: "\n\n".join(f"### {section}\n\n(stub)" for section in variant.sections)
+
+
+def generate(model, variant, prepared, parent_lang, homework_lang):
+    start = time.perf_counter()
+    response = model.generate_content([variant.render(parent_lang, homework_lang), prepared.as_part()])
+    latency = getattr(response, "recorded_latency", None)
+    if latency is None:
+        latency = time.perf_counter() - start
+    return {"text": response.text, "latency": latency, **usage_counts(response)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures")
+    parser.add_argument("--variants", default=",".join(sorted(PROMPT_VARIANTS)))
+    parser.add_argument("--backend", choices=BENCH_BACKENDS, default="stub")
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS_PATH, help="folder written by record, read by replay")
+    parser.add_argument("--parent-lang", default="Korean")
+    parser.add_argument("--homework-lang", default="Dutch")
+    args = parser.parse_args()
+
+    files = [f for f in sorted(glob.glob(os.path.join(args.fixtures, "*"))) if f.lower().endswith(EXTENSIONS)]
+    if not files:
+        raise SystemExit(f"No images found in {args.fixtures}")
+    pages = [(os.path.basename(f), normalize_image(Image.open(f))) for f in files]
+    variants = [get_variant(key.strip()) for key in args.variants.split(",") if key.strip()]
+
+    print(f"{'variant':<10} {'source':<16} {'in tok':>7} {'img tok':>7} {'out tok':>7} "
+          f"{'p50 s':>6} {'p95 s':>6} {'complete':>8} {'$/page':>8}")
+    for variant in variants:
+        # 지연은 기다리지 않고(배율 0) 녹화된 값을 씁니다.
+        model = bench_model(args.backend, args.recordings, stub=stub_sections(variant))
+        rows = []
+        for name, prepared in pages:
+            result = generate(model, variant, prepared, args.parent_lang, args.homework_lang)
+            rows.append((result, variant.completeness(result["text"])))
+        latencies = [result["latency"] for result, _ in rows]
+        prompt_tokens = statistics.mean(result["prompt_tokens"] for result, _ in rows)
+        output_tokens = statistics.mean(result["output_tokens"] for result, _ in rows)
+        marker = " *" if variant.key == DEFAULT_VARIANT else ""
+        print(
+            f"{variant.key:<10} {variant.source:<16} {prompt_tokens:7.0f} "
+            f"{statistics.mean(result['image_tokens'] for result, _ in rows):7.0f} {output_tokens:7.0f} "
+            f"{percentile(latencies, 0.50):6.1f} {percentile(latencies, 0.95):6.1f} "
+            f"{statistics.mean(score for _, score in rows):8.0%} "
+            f"{cost_usd(MODEL_NAME, prompt_tokens, output_tokens):8.5f}{marker}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import glob
+import io
+import os
+import statistics
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+from bench_e2e import worksheet
+from image_prep import normalize_image
+from quality_check import REJECT, check_quality
+
+# ==========================================
+# 사진 품질 검사 벤치마크
+# ==========================================
+# 라벨이 붙은 사진으로 정확도와 실행 시간(사진 한 장에 ~50 ms 이내)을 잽니다.
+# 폴더를 주지 않으면 bench_e2e 의 가짜 학습지(good)와 그 흐림/어두움/반사 변형으로 라벨 세트를 만들어 씁니다.
+# python bench_quality.py --generated 8
+# 실제 사진 폴더로 잴 때:
+#   fixtures/quality/good/*.jpg      -> 통과해야 하는 사진
+#   fixtures/quality/<그 외 폴더>/*.jpg -> 거절(또는 경고)되어야 하는 사진 (blurry, glare, dark ...)
+# python bench_quality.py fixtures/quality
+# 좋은 사진만 있다면 --synthesize 로 흐림/반사/어두움 변형을 만들어 라벨을 붙입니다.
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+BUDGET_MS = 50.0
+
+
+def synthesize(image):
+    yield "blurry", image.filter(ImageFilter.GaussianBlur(radius=6))
+    yield "dark", ImageEnhance.Brightness(image).enhance(0.25)
+    # 살짝 어두운 종이 위에 하얗게 날아간 반사광 얼룩
+    base = ImageEnhance.Brightness(image.convert("RGB")).enhance(0.85)
+    spot = Image.new("L", base.size, 0)
+    w, h = base.size
+    ImageDraw.Draw(spot).ellipse((w * 0.15, h * 0.2, w * 0.85, h * 0.75), fill=255)
+    spot = spot.filter(ImageFilter.GaussianBlur(radius=max(w, h) // 40))
+    yield "glare", Image.composite(Image.new("RGB", base.size, "white"), base, spot)
+
+
+def labelled(label, name, image, synth):
+    yield label, name, image
+    if synth and label == "good":
+        for bad_label, bad in synthesize(image):
+            yield bad_label, f"{name} ({bad_label})", bad
+
+
+def load_fixtures(path, synth):
+    samples = []
+    for folder in sorted(glob.glob(os.path.join(path, "*"))):
+        label = os.path.basename(folder)
+        for file in sorted(glob.glob(os.path.join(folder, "*"))):
+            if not file.lower().endswith(EXTENSIONS):
+                continue
+            image = normalize_image(Image.open(file)).image
+            samples.extend(labelled(label, os.path.basename(file), image, synth))
+    return samples
+
+
+def generated_fixtures(count):
+    # 씨앗마다 모양이 다른 학습지를 업로드와 같은 JPEG -> normalize_image 경로로 읽습니다.
+    samples = []
+    for seed in range(count):
+        image = normalize_image(Image.open(io.BytesIO(worksheet(seed)))).image
+        samples.extend(labelled("good", f"worksheet-{seed}.jpg", image, True))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="?", help="labelled folder; omit to use generated worksheets")
+    parser.add_argument("--synthesize", action="store_true")
+    parser.add_argument("--generated", type=int, default=8, help="worksheets to generate without a folder")
+    parser.add_argument("--count-warnings", action="store_true", help="treat warnings as rejections")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        samples = load_fixtures(args.fixtures, args.synthesize)
+    else:
+        samples = generated_fixtures(args.generated)
+    if not samples:
+        raise SystemExit(f"No labelled images found in {args.fixtures}")
+
+    correct = 0
+    timings = []
+    confusion = {"good_pass": 0, "good_flag": 0, "bad_pass": 0, "bad_flag": 0}
+    for label, name, image in samples:
+        report = check_quality(image)
+        timings.append(report.elapsed * 1000)
+        flagged = bool(report.issues) if args.count_warnings else report.rejected
+        expected_bad = label != "good"
+        correct += flagged == expected_bad
+        confusion[f"{'bad' if expected_bad else 'good'}_{'flag' if flagged else 'pass'}"] += 1
+        levels = ",".join("R" if level == REJECT else "W" for level, _ in report.issues) or "-"
+        m = report.metrics
+        print(
+            f"{label:<10} {name:<36} {levels:<6} sharp {m['sharpness']:7.1f}  bright {m['brightness']:5.1f}  "
+            f"glare {m['glare']:.2f}  text {m['text_height']:5.1f}px  {report.elapsed * 1000:5.1f} ms"
+        )
+
+    timings.sort()
+    print(f"\naccuracy {correct}/{len(samples)} = {correct / len(samples):.1%}")
+    print(
+        f"good passed {confusion['good_pass']}, good flagged {confusion['good_flag']}, "
+        f"bad flagged {confusion['bad_flag']}, bad passed {confusion['bad_pass']}"
+    )
+    over = sum(timing > BUDGET_MS for timing in timings)
+    print(
+        f"runtime median {statistics.median(timings):.1f} ms, max {timings[-1]:.1f} ms "
+        f"({over}/{len(timings)} over the {BUDGET_MS:.0f} ms budget)"
+    )
+
+
+if __name__ == "__main__":
+    main()
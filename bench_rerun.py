@@ -0,0 +1,112 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+
+from backend import FixtureUpload
+from bench_e2e import result_count, worksheet
+
+# ==========================================
+# 전체 재실행 비용 (테마 전환, 세션 보관 전/후)
+# ==========================================
+# 결과 가이드가 화면에 있는 상태에서 사이드바의 테마를 바꾸면 스크립트 전체가 다시 돕니다.
+#   after  : 지금 방식. 정규화한 페이지와 가이드가 세션(uploads / guides)에 남아 있어서
+#            재실행은 세션에서 다시 그리기만 합니다.
+#   before : 세션 보관 전 방식. 재실행마다 uploads / guides 를 비워서 사진을 다시 열고 정규화하며,
+#            가이드는 사라져서 버튼을 다시 눌러야 합니다 ("restore s" = 다시 눌러 결과가 나올 때까지).
+#            같은 사진이라 결과 캐시에 걸리므로 restore s 에는 모델 호출 시간이 들어가지 않습니다 (가장 좋은 경우).
+# "bytes" 는 재실행 한 번에 화면(본문 + 사이드바)으로 보내는 요소들의 직렬화 크기입니다.
+# fragment 만 다시 도는 경우(제출/섹션 버튼)는 AppTest 가 흉내 낼 수 없어서 여기서는 재지 않습니다.
+# 모델은 replay 백엔드라 API 키가 필요 없습니다.
+# python bench_rerun.py --pages 2 --toggles 10
+
+THEMES = ["Light Mode (Default)", "Dark Mode"]
+
+
+def payload_bytes(at):
+    return sum(node.proto.ByteSize() for block in (at.main, at.sidebar) for node in block if getattr(node, "proto", None) is not None)
+
+
+def submit(at, pages, timeout):
+    button = next(button for button in at.button if "Super Parent Mode" in button.label)
+    button.click().run()
+    started = time.perf_counter()
+    while result_count(at) < pages and not at.exception and time.perf_counter() - started < timeout:
+        time.sleep(0.2)
+        at.run()
+
+
+def run_mode(name, args, cache_dir, seed):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=args.timeout)
+    at.secrets.update({
+        "GEMINI_BACKEND": "replay",
+        "REPLAY_LATENCY": args.latency,
+        "CACHE_DIR": cache_dir,
+        "METRICS_FILE": "",
+        "BACKGROUND_JOBS": False,
+    })
+    at.run()
+    at.session_state["fixture_uploads"] = [
+        FixtureUpload(f"{name}-{i}.jpg", worksheet(seed * 100 + i)) for i in range(args.pages)
+    ]
+    at.run()
+    submit(at, args.pages, args.timeout)
+
+    timings, sizes, restores, kept = [], [], [], 0
+    for i in range(args.toggles):
+        if name == "before":
+            for key in ("uploads", "guides"):
+                if key in at.session_state:
+                    del at.session_state[key]
+        theme = next(box for box in at.sidebar.selectbox if box.label == "Theme Mode")
+        theme.set_value(THEMES[(i + 1) % len(THEMES)])
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(payload_bytes(at))
+        if result_count(at) >= args.pages:
+            kept += 1
+        else:
+            start = time.perf_counter()
+            submit(at, args.pages, args.timeout)
+            restores.append(time.perf_counter() - start)
+
+    errors = [element.value for element in at.error] + [str(e.value) for e in at.exception]
+    return {
+        "mode": name,
+        "rerun_ms": statistics.median(timings),
+        "bytes": statistics.median(sizes),
+        "kept": kept,
+        "restore_s": statistics.median(restores) if restores else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--toggles", type=int, default=6, help="theme switches per mode")
+    parser.add_argument("--latency", type=float, default=1.0, help="synthetic seconds per model call")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as cache_dir:
+        print(f"{'mode':<7} {'rerun ms':>9} {'bytes':>9} {'guide kept':>11} {'restore s':>10}")
+        for seed, name in enumerate(("before", "after")):
+            row = run_mode(name, args, cache_dir, seed)
+            failed |= bool(row["errors"])
+            print(
+                f"{row['mode']:<7} {row['rerun_ms']:9.0f} {row['bytes']:9,.0f} "
+                f"{row['kept']:>5}/{args.toggles:<5} {row['restore_s']:10.2f}"
+            )
+            for error in row["errors"]:
+                print(f"{'':<7} ! {error}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# ==========================================
+# 콜드 스타트 벤치마크 (회귀 지표)
+# ==========================================
+# 새 프로세스에서 app.py 를 처음 띄우는 비용을 잽니다 (오토스케일 컨테이너 / Streamlit Cloud 깨어남).
+#   import    : 파이썬 시작 + streamlit import
+#   paint     : 첫 스크립트 실행이 끝날 때까지 (app.py 의 import 포함) = 첫 화면
+#   response  : 첫 화면 뒤 사진을 올리고 버튼을 눌러 첫 결과가 나올 때까지
+#   sdk       : 모델 SDK(google.generativeai) import 시간 (설치돼 있을 때만)
+# "loaded" 는 첫 화면 시점에 이미 불러와진 무거운 모듈입니다 (비어 있어야 정상).
+# 첫 화면 끝에 app.py 가 미리 불러오기 스레드("warm-up")를 띄우므로, 그 스레드가 시작하는 순간에 봅니다.
+# 실행마다 중앙값을 .cache/startup-history.jsonl 에 남기고, 이전 기록들의 중앙값보다
+# --max-regression 이상 느려지면 종료 코드 1 로 끝납니다.
+# python bench_startup.py --repeat 5
+# python bench_startup.py --backend live      (GOOGLE_API_KEY 필요, 실제 첫 응답까지)
+
+HEAVY_MODULES = ("google.generativeai", "PIL", "numpy")
+METRICS = ("import_s", "paint_s", "response_s", "sdk_s")
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "startup-history.jsonl")
+
+
+def watch_warm_up(snapshot):
+    # 새 스레드는 시작하자마자(대상 함수보다 먼저) 프로파일 함수를 한 번 부릅니다.
+    # 그때 warm-up 스레드라면 무거운 모듈 목록을 적어 두고, 어느 스레드든 바로 프로파일을 끕니다.
+    def profile(frame, event, arg):
+        sys.setprofile(None)
+        if threading.current_thread().name == "warm-up" and "loaded" not in snapshot:
+            snapshot["loaded"] = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    threading.setprofile(profile)
+
+
+def child(args):
+    # 새 프로세스 안에서 한 번 잽니다. 결과는 JSON 한 줄로 출력합니다.
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    imported = time.perf_counter()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        at = AppTest.from_file("app.py", default_timeout=args.timeout)
+        secrets = {"GEMINI_BACKEND": args.backend, "CACHE_DIR": cache_dir, "METRICS_FILE": "", "BACKGROUND_JOBS": False}
+        if args.backend == "replay":
+            secrets.update({"REPLAY_LATENCY": args.latency})
+        else:
+            secrets["GOOGLE_API_KEY"] = os.environ["GOOGLE_API_KEY"]
+        at.secrets.update(secrets)
+        snapshot = {}
+        watch_warm_up(snapshot)
+        at.run()
+        painted = time.perf_counter()
+        threading.setprofile(None)
+        loaded = snapshot.get("loaded", [name for name in HEAVY_MODULES if name in sys.modules])
+
+        from backend import FixtureUpload
+        from bench_e2e import result_count, worksheet
+
+        at.session_state["fixture_uploads"] = [FixtureUpload("startup.jpg", worksheet(0))]
+        at.run()
+        submit = next(button for button in at.button if "Super Parent Mode" in button.label)
+        submit.click().run()
+        responded = time.perf_counter() if result_count(at) and not at.exception else None
+
+    sdk = None
+    if "google.generativeai" not in sys.modules:
+        try:
+            start = time.perf_counter()
+            importlib.import_module("google.generativeai")
+            sdk = time.perf_counter() - start
+        except ImportError:
+            pass
+    print(json.dumps({
+        "import_s": imported - started,
+        "paint_s": painted - imported,
+        "response_s": responded - painted if responded else None,
+        "sdk_s": sdk,
+        "loaded": loaded,
+    }))
+
+
+def median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def load_history(path, backend):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [entry for entry in map(json.loads, f) if entry.get("backend") == backend]
+    except FileNotFoundError:
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", choices=("replay", "live"), default="replay")
+    parser.add_argument("--latency", type=float, default=0.5, help="synthetic seconds per model call (replay)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--window", type=int, default=10, help="previous runs to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown of first paint")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    runs = []
+    print(f"{'run':>3} {'import s':>9} {'paint s':>8} {'response s':>11} {'sdk s':>6}  loaded at paint")
+    for i in range(args.repeat):
+        command = [
+            sys.executable, __file__, "--child", "--backend", args.backend,
+            "--latency", str(args.latency), "--timeout", str(args.timeout),
+        ]
+        run = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout.splitlines()[-1])
+        runs.append(run)
+        fmt = lambda value, width: f"{value:{width}.2f}" if value is not None else f"{'-':>{width}}"
+        print(
+            f"{i + 1:>3} {fmt(run['import_s'], 9)} {fmt(run['paint_s'], 8)} {fmt(run['response_s'], 11)} "
+            f"{fmt(run['sdk_s'], 6)}  {', '.join(run['loaded']) or '-'}"
+        )
+
+    # bench_load 은 PIL 을 불러오므로 자식 프로세스(첫 화면 측정)가 아닌 여기서만 가져옵니다.
+    from bench_load import git_revision
+
+    summary = {name: median(run[name] for run in runs) for name in METRICS}
+    history = load_history(args.history, args.backend)[-args.window:]
+    baseline = median(entry["paint_s"] for entry in history)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "ts": time.time(), "revision": git_revision(), "backend": args.backend, "repeat": args.repeat, **summary,
+        }) + "\n")
+
+    print("\nmedian: " + " · ".join(
+        f"{name[:-2]} {value:.2f} s" for name, value in summary.items() if value is not None
+    ))
+    if baseline is None:
+        print("no earlier runs to compare with")
+        return
+    change = summary["paint_s"] / baseline - 1
+    print(f"first paint vs median of last {len(history)} runs: {change:+.0%}")
+    if change > args.max_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import re
+import time
+
+from theme import HEADER_HTML, STATIC_CSS, STYLESHEETS, THEME_VARS, THEMES, theme_name
+
+# ==========================================
+# 테마 CSS 전송량 / 생성 시간 벤치마크
+# ==========================================
+# 재실행마다 화면에 보내는 테마 관련 마크다운 바이트와 그걸 만드는 시간을 비교합니다.
+#   inline : 예전 방식. 색을 박아 넣은 <style> + 헤더 전체를 재실행마다 f-string 으로 다시 만듦
+#   static : 정적 파일 @import 한 줄 + 테마별 변수 블록(미리 만들어 둠) + 고정 헤더.
+#            스타일시트 자체는 브라우저가 한 번 받아 캐시하므로 재실행 전송량에 들어가지 않습니다.
+#   fallback : 정적 파일을 못 쓸 때. 고정 스타일시트 전체 + 변수 블록 + 고정 헤더
+# "changed" 는 직전 실행과 내용이 달라진 요소의 바이트입니다. 달라진 요소만 브라우저가 다시 그립니다.
+# python bench_theme.py --reruns 1000
+
+# 예전 app.py 의 header_html f-string 과 같은 틀: 변수 자리에 색을 직접 넣습니다.
+OLD_HTML = "<style>" + re.sub(r"/\*.*?\*/\s*", "", STATIC_CSS) + "</style>" + HEADER_HTML
+INLINE_TEMPLATE = re.sub(r"var\(--sp-(\w+)\)", r"{\1}", OLD_HTML.replace("{", "{{").replace("}", "}}"))
+
+
+def inline_html(theme_mode):
+    return INLINE_TEMPLATE.format(**THEMES[theme_name(theme_mode)])
+
+
+def static_html(theme_mode):
+    return [STYLESHEETS[True], THEME_VARS[theme_name(theme_mode)], HEADER_HTML]
+
+
+def fallback_html(theme_mode):
+    return [STYLESHEETS[False], THEME_VARS[theme_name(theme_mode)], HEADER_HTML]
+
+
+def measure(render, modes):
+    sent, changed, elapsed = 0, 0, 0.0
+    previous = []
+    for mode in modes:
+        start = time.perf_counter()
+        elements = render(mode)
+        elapsed += time.perf_counter() - start
+        elements = elements if isinstance(elements, list) else [elements]
+        sent += sum(len(e.encode("utf-8")) for e in elements)
+        changed += sum(len(e.encode("utf-8")) for i, e in enumerate(elements) if i >= len(previous) or previous[i] != e)
+        previous = elements
+    return sent / len(modes), changed / len(modes), elapsed / len(modes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=1000)
+    args = parser.parse_args()
+
+    # 같은 테마로 계속 재실행하는 경우와, 매번 테마를 바꾸는 경우
+    scenarios = {
+        "rerun": ["Light Mode (Default)"] * args.reruns,
+        "theme switch": ["Light Mode (Default)", "Dark Mode"] * (args.reruns // 2),
+    }
+    print(f"{'scenario':<13} {'method':<8} {'bytes/run':>10} {'changed/run':>12} {'build µs':>9}")
+    for scenario, modes in scenarios.items():
+        for method, render in (("inline", inline_html), ("static", static_html), ("fallback", fallback_html)):
+            sent, changed, build_us = measure(render, modes)
+            print(f"{scenario:<13} {method:<8} {sent:10.0f} {changed:12.0f} {build_us:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
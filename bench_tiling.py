@@ -0,0 +1,120 @@
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from backend import BENCH_BACKENDS, DEFAULT_RECORDINGS_PATH, bench_model
+from bench_e2e import worksheet
+from image_prep import normalize_image
+from metrics import percentile
+from prompts import EXTRACTION_PROMPT
+from tiling import merge_extractions, split_into_blocks
+
+# ==========================================
+# 빽빽한 페이지: 한 번에 vs 블록 나눠서
+# ==========================================
+# 같은 학습지 사진을 (1) 페이지 전체 한 번의 1단계 요청과 (2) 문제 블록별 동시 요청 + 병합으로 처리해서
+# 찾아낸 문제 수(완전성)와 p50/p95 지연을 비교합니다.
+# 모델은 backend.bench_model 입니다 (bench_prompts 와 같은 --backend 선택지).
+#   --backend stub   : 기본값. 녹화 없이 가짜 추출 결과를 --latency 초 뒤에 돌려줍니다 (네트워크 없음).
+#                      문제 수는 의미가 없고, 블록 수와 동시 요청에 따른 지연 모양만 봅니다.
+#   --backend record : 실제 API (GOOGLE_API_KEY 필요) + 응답을 --recordings 폴더에 녹화
+#   --backend replay : 녹화된 응답과 녹화 당시의 지연으로 다시 돌립니다 (네트워크 없음)
+#   python bench_tiling.py fixtures/dense --rounds 3 --backend record
+#   python bench_tiling.py fixtures/dense --rounds 3 --backend replay
+# 폴더를 주지 않으면 bench_e2e 의 가짜 학습지(--generated 장)를 씁니다.
+# 폴더에 expected.json ({"파일명": 문제 수}) 이 있으면 빠뜨린 문제 수도 함께 셉니다.
+# --split-only 는 모델 없이 블록 나누기만 해서 블록 수와 로컬 처리 시간을 봅니다.
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def extract(model, prepared, homework_lang):
+    response = model.generate_content(
+        [EXTRACTION_PROMPT.format(homework_lang=homework_lang), prepared.as_part()],
+        generation_config={"response_mime_type": "application/json"},
+    )
+    return json.loads(response.text)
+
+
+def single_shot(model, image, homework_lang, max_tiles):
+    return extract(model, normalize_image(image), homework_lang)
+
+
+def tiled(model, image, homework_lang, max_tiles):
+    tiles = [normalize_image(tile) for tile in split_into_blocks(image, max_tiles=max_tiles)]
+    with ThreadPoolExecutor(max_workers=len(tiles)) as pool:
+        parts = list(pool.map(lambda tile: extract(model, tile, homework_lang), tiles))
+    return merge_extractions(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="?")
+    parser.add_argument("--generated", type=int, default=4, help="generated worksheets when no folder is given")
+    parser.add_argument("--backend", choices=BENCH_BACKENDS, default="stub")
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS_PATH, help="folder written by record, read by replay")
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per stub call")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--homework-lang", default="English")
+    parser.add_argument("--max-tiles", type=int, default=6)
+    parser.add_argument("--split-only", action="store_true")
+    args = parser.parse_args()
+
+    expected = {}
+    if args.fixtures:
+        files = [f for f in sorted(glob.glob(os.path.join(args.fixtures, "*"))) if f.lower().endswith(EXTENSIONS)]
+        if not files:
+            raise SystemExit(f"No images found in {args.fixtures}")
+        expected_path = os.path.join(args.fixtures, "expected.json")
+        if os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                expected = json.load(f)
+        images = [(os.path.basename(f), normalize_image(Image.open(f)).image) for f in files]
+    else:
+        images = [
+            (f"generated-{seed}.jpg", normalize_image(Image.open(io.BytesIO(worksheet(seed)))).image)
+            for seed in range(args.generated)
+        ]
+
+    if args.split_only:
+        for name, image in images:
+            start = time.perf_counter()
+            tiles = split_into_blocks(image, max_tiles=args.max_tiles)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{name:<36} {len(tiles)} blocks  {elapsed:6.1f} ms")
+        return
+
+    # replay 는 녹화 당시의 지연만큼 실제로 기다려서, 동시 요청의 효과가 벽시계 시간에 드러나게 합니다.
+    model = bench_model(args.backend, args.recordings, latency=args.latency, latency_scale=1.0)
+
+    for label, fn in (("single-shot", single_shot), ("tiled", tiled)):
+        timings = []
+        found = 0
+        missed = 0
+        for _ in range(args.rounds):
+            for name, image in images:
+                start = time.perf_counter()
+                result = fn(model, image, args.homework_lang, args.max_tiles)
+                timings.append(time.perf_counter() - start)
+                count = len(result.get("questions", []))
+                found += count
+                if name in expected:
+                    missed += max(0, int(expected[name]) - count)
+        line = (
+            f"{label:<12} questions {found / args.rounds:6.1f}/round  "
+            f"p50 {statistics.median(timings):5.2f} s  p95 {percentile(timings, 0.95):5.2f} s"
+        )
+        if expected:
+            line += f"  missed {missed / args.rounds:.1f}/round"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
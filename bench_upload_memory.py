@@ -0,0 +1,136 @@
+import argparse
+import gc
+import io
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from bench_load import rss_mb
+from image_prep import normalize_upload, preview_image
+from upload_store import UploadStore
+
+# ==========================================
+# 가만히 있는 세션들의 업로드 메모리 벤치마크
+# ==========================================
+# 휴대폰 사진(기본 12MP)을 올려 두고 가만히 있는 세션 N 개를 한 프로세스에 만들고 서버 RSS 를 잽니다.
+#   before   : 세션이 원본 업로드 바이트 + 디코딩된 정규화 이미지 + 미리보기 이미지를 들고 있음 (이전 app.py)
+#   after    : 사진을 올리고 아직 버튼을 누르지 않은 세션 (지금 app.py). 업로더 위젯이 원본 바이트를 계속 들고 있고,
+#              정규화한 사진은 스풀된 SpooledImage 로 남음. 바이트는 UploadStore 한도 안에서만 메모리에
+#              (미리보기는 내용 해시로 서버 전체가 공유하는 캐시라 세션별로 늘지 않음)
+#   released : 제출한 뒤의 세션. release_uploader 가 업로더를 바꿔서 원본 바이트까지 놓은 상태
+# 모드마다 새 프로세스에서 재서 서로의 메모리가 섞이지 않게 합니다.
+# 마지막 열은 한도 때문에 메모리에서 내려간 세션의 사진을 다시 읽는 시간(디스크)입니다.
+# python bench_upload_memory.py --sessions 50,100,200 --pages 1 --global-mb 128
+
+SOURCES = 4
+MODES = ("before", "after", "released")
+
+
+def photo(seed, width, height):
+    # 색이 조금 섞인 학습지 사진 흉내 (흑백 판정에 걸리지 않도록 RGB 잡음을 넣음)
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (245, 240, 230))
+    draw = ImageDraw.Draw(image)
+    y = height // 20
+    while y < height * 0.9:
+        draw.rectangle((width // 12, y, rng.randint(width // 2, width - width // 12), y + height // 110), fill=(20, 20, 60))
+        y += rng.randint(height // 40, height // 12)
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    image = Image.blend(image, noise, 0.08)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+class Upload(io.BytesIO):
+    # 업로드마다 따로 받은 바이트. BytesIO 는 넘겨받은 bytes 를 복사하지 않고 같이 쓰므로,
+    # 원본 몇 장을 돌려 쓰는 이 벤치마크에서는 세션마다 복사해야 실제 업로드처럼 메모리가 늡니다.
+    def __init__(self, data):
+        super().__init__(bytes(bytearray(data)))
+        self.size = len(data)
+
+
+def build_sessions(mode, sessions, pages, sources, store):
+    state = []
+    for s in range(sessions):
+        uploads = {}
+        for p in range(pages):
+            raw = sources[(s * pages + p) % len(sources)]
+            page = normalize_upload(Upload(raw))
+            if mode == "before":
+                uploads[p] = {"raw": Upload(raw), "page": page, "preview": preview_image(page.image)}
+            elif mode == "after":
+                uploads[p] = {"raw": Upload(raw), "page": store.put(f"session-{s}", page)}
+            else:
+                uploads[p] = {"page": store.put(f"session-{s}", page)}
+        state.append(uploads)
+    return state
+
+
+def measure(args):
+    sources = [photo(seed, args.width, args.height) for seed in range(SOURCES)]
+    with tempfile.TemporaryDirectory() as path:
+        store = UploadStore(
+            path,
+            session_limit=int(args.session_mb * 1024 * 1024),
+            global_limit=int(args.global_mb * 1024 * 1024),
+        )
+        gc.collect()
+        baseline = rss_mb()
+        state = build_sessions(args.mode, args.sessions, args.pages, sources, store)
+        gc.collect()
+        grown = rss_mb() - baseline
+
+        # 가장 먼저 들어온 (가장 오래 가만히 있던) 세션의 사진을 다시 씁니다.
+        start = time.perf_counter()
+        for entry in state[0].values():
+            len(entry["page"].data)
+        reread_ms = (time.perf_counter() - start) * 1000
+        return {
+            "mode": args.mode,
+            "sessions": args.sessions,
+            "rss_mb": grown,
+            "per_session_mb": grown / args.sessions,
+            "reread_ms": reread_ms,
+            **(store.stats() if args.mode != "before" else {}),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="50,100,200")
+    parser.add_argument("--pages", type=int, default=1, help="uploaded photos per session")
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--session-mb", type=float, default=4.0)
+    parser.add_argument("--global-mb", type=float, default=128.0)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        args.sessions = int(args.sessions)
+        print(json.dumps(measure(args)))
+        return
+
+    print(f"{'sessions':>8} {'mode':<8} {'RSS MB':>8} {'MB/sess':>8} {'hot MB':>7} {'evicted':>8} {'reread ms':>10}")
+    for sessions in [int(n) for n in args.sessions.split(",") if n.strip()]:
+        for mode in MODES:
+            command = [sys.executable, __file__, "--mode", mode, "--sessions", str(sessions)]
+            for name in ("pages", "width", "height", "session_mb", "global_mb"):
+                command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+            row = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+            hot = f"{row['hot_bytes'] / 1024 / 1024:7.1f}" if "hot_bytes" in row else f"{'-':>7}"
+            evicted = f"{row['evictions']:>8}" if "evictions" in row else f"{'-':>8}"
+            print(
+                f"{sessions:>8} {mode:<8} {row['rss_mb']:8.0f} {row['per_session_mb']:8.2f} {hot} {evicted} "
+                f"{row['reread_ms']:10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
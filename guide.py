@@ -0,0 +1,205 @@
+import json
+
+# ==========================================
+# 구조화된 코칭 가이드 (JSON)
+# ==========================================
+# 2단계 응답을 자유 Markdown 대신 스키마가 정해진 JSON 으로 받아서
+# 섹션별로 검증/캐시/재생성하고, 화면은 앱에서 직접 그립니다.
+
+SECTION_NAMES = ("solution", "coaching", "vocabulary", "praise")
+
+SECTION_TITLES = {
+    "solution": "📝 Detailed Solution & Explanation",
+    "coaching": "🗣️ Coaching Guide",
+    "vocabulary": "📚 Essential Vocabulary",
+    "praise": "💖 Praise the Hero",
+}
+
+STRING = {"type": "STRING"}
+STRING_LIST = {"type": "ARRAY", "items": STRING}
+
+SECTION_SCHEMAS = {
+    "solution": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "number": STRING,
+                "question": STRING,
+                "answer": STRING,
+                "steps": STRING_LIST,
+                "explanation": STRING,
+            },
+            "required": ["number", "answer", "explanation"],
+        },
+    },
+    "coaching": {
+        "type": "OBJECT",
+        "properties": {
+            "how_to_explain": STRING_LIST,
+            "questions_to_ask": STRING_LIST,
+        },
+        "required": ["how_to_explain", "questions_to_ask"],
+    },
+    "vocabulary": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "word": STRING,
+                "meaning": STRING,
+                "pronunciation": STRING,
+            },
+            "required": ["word", "meaning", "pronunciation"],
+        },
+    },
+    "praise": {
+        "type": "OBJECT",
+        "properties": {
+            "say_to_child": STRING,
+            "pronunciation": STRING,
+            "meaning": STRING,
+        },
+        "required": ["say_to_child", "pronunciation", "meaning"],
+    },
+}
+
+
+def guide_schema(sections=SECTION_NAMES):
+    # Gemini response_schema 형식 (OpenAPI 부분집합)
+    return {
+        "type": "OBJECT",
+        "properties": {name: SECTION_SCHEMAS[name] for name in sections},
+        "required": list(sections),
+    }
+
+
+class GuideError(ValueError):
+    pass
+
+
+def _check(value, schema, path):
+    kind = schema["type"]
+    if kind == "STRING":
+        if not isinstance(value, str):
+            raise GuideError(f"{path}: expected text")
+    elif kind == "ARRAY":
+        if not isinstance(value, list):
+            raise GuideError(f"{path}: expected a list")
+        for i, item in enumerate(value):
+            _check(item, schema["items"], f"{path}[{i}]")
+    elif kind == "OBJECT":
+        if not isinstance(value, dict):
+            raise GuideError(f"{path}: expected an object")
+        for key in schema.get("required", ()):
+            if key not in value:
+                raise GuideError(f"{path}: missing '{key}'")
+        for key, sub in schema["properties"].items():
+            if key in value:
+                _check(value[key], sub, f"{path}.{key}")
+
+
+def validate_guide(data, sections=SECTION_NAMES):
+    _check(data, guide_schema(sections), "guide")
+    return data
+
+
+def parse_guide(text, sections=SECTION_NAMES):
+    # 가이드 JSON 이 아니면 (예: 예전 Markdown 답변) None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not any(name in data for name in sections):
+        return None
+    return validate_guide(data, sections)
+
+
+def parse_partial_items(text, pos, key):
+    # 아직 닫히지 않은 배열 섹션(풀이/어휘)에서 끝까지 도착한 항목만 꺼냅니다.
+    decoder = json.JSONDecoder()
+    items = []
+    pos += 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+            _check(item, SECTION_SCHEMAS[key]["items"], key)
+        except (ValueError, GuideError):
+            return items
+        items.append(item)
+
+
+def parse_partial_sections(text, partial_items=True):
+    # 스트리밍 중인 JSON 에서 이미 끝까지 도착한 최상위 섹션만 꺼냅니다.
+    # partial_items 면 지금 쓰이고 있는 배열 섹션도 끝난 항목까지 보여줍니다 (첫 풀이가 섹션 전체보다 훨씬 빨리 옵니다).
+    decoder = json.JSONDecoder()
+    sections = {}
+    pos = text.find("{")
+    if pos < 0:
+        return sections
+    pos += 1
+    length = len(text)
+    while True:
+        while pos < length and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length or text[pos] != '"':
+            return sections
+        try:
+            key, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            return sections
+        while pos < length and text[pos] in " \t\r\n:":
+            pos += 1
+        try:
+            value, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            if partial_items and key in SECTION_SCHEMAS and text[pos:pos + 1] == "[":
+                items = parse_partial_items(text, pos, key)
+                if items:
+                    sections[key] = items
+            return sections
+        if key in SECTION_SCHEMAS:
+            try:
+                _check(value, SECTION_SCHEMAS[key], key)
+            except GuideError:
+                continue
+            sections[key] = value
+
+
+def section_markdown(name, value):
+    if name == "solution":
+        lines = []
+        for q in value:
+            title = f"{q['number']}. {q.get('question', '')}".strip()
+            lines.append(f"**{title}**")
+            for i, step in enumerate(q.get("steps", []), 1):
+                lines.append(f"- Step {i}: {step}")
+            lines.append(f"- ✅ **{q['answer']}**")
+            lines.append(f"- {q['explanation']}")
+            lines.append("")
+        return "\n".join(lines)
+    if name == "coaching":
+        lines = [f"- {tip}" for tip in value["how_to_explain"]]
+        lines += [f"- ❓ {question}" for question in value["questions_to_ask"]]
+        return "\n".join(lines)
+    if name == "vocabulary":
+        lines = ["| Word | Meaning | Pronunciation |", "| --- | --- | --- |"]
+        lines += [f"| {v['word']} | {v['meaning']} | {v['pronunciation']} |" for v in value]
+        return "\n".join(lines)
+    if name == "praise":
+        return (
+            f"- 🗨️ **Say to Child:** \"{value['say_to_child']}\"\n"
+            f"- 🗣️ **Pronunciation:** \"{value['pronunciation']}\"\n"
+            f"- 🧠 **Meaning:** \"{value['meaning']}\""
+        )
+    raise KeyError(name)
+
+
+def guide_markdown(guide):
+    parts = []
+    for i, name in enumerate(SECTION_NAMES, 1):
+        if name in guide:
+            parts.append(f"### {i}. {SECTION_TITLES[name]}\n\n{section_markdown(name, guide[name])}")
+    return "\n\n".join(parts)
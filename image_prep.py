@@ -0,0 +1,136 @@
+import hashlib
+import io
+import logging
+import time
+
+# ==========================================
+# 업로드 이미지 정규화
+# ==========================================
+# 휴대폰 사진(12MP, 수 MB)을 그대로 보내지 않고
+# EXIF 회전 -> (흑백이면) 그레이스케일 -> 긴 변 축소 -> JPEG/WebP 재인코딩 순서로 줄입니다.
+# PIL 은 처음 사진을 다룰 때 불러옵니다 (앱의 첫 화면에는 필요 없음).
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EDGE = 1600
+DEFAULT_FORMAT = "JPEG"
+DEFAULT_QUALITY = 85
+PREVIEW_WIDTH = 700
+# 여러 장일 때 나란히 보이는 작은 썸네일 폭 (st.image(width=...) 와 같아야 Streamlit 이 다시 줄이지 않습니다)
+THUMBNAIL_WIDTH = 160
+PREVIEW_QUALITY = 70
+
+# 채널 간 차이가 이 값보다 작으면 흑백 프린트로 봅니다.
+MONOCHROME_TOLERANCE = 12
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class PreparedImage:
+    def __init__(self, image, data, mime_type, original_bytes, elapsed):
+        self._image = image
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.elapsed = elapsed
+        self.sha256 = hashlib.sha256(data).hexdigest()
+
+    @property
+    def image(self):
+        # release() 뒤에는 필요할 때마다 바이트에서 다시 디코딩하고, 픽셀을 붙잡아 두지 않습니다.
+        if self._image is not None:
+            return self._image
+        image = open_image(io.BytesIO(self.data))
+        image.load()
+        return image
+
+    def release(self):
+        self._image = None
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - len(self.data)
+
+    @classmethod
+    def from_bytes(cls, data, mime_type):
+        # 이미 정규화된 바이트(작업 큐 등에 저장된 것)에서 다시 만듭니다.
+        image = open_image(io.BytesIO(data))
+        image.load()
+        return cls(image, data, mime_type, len(data), 0.0)
+
+    def as_part(self):
+        # generate_content 에 바로 넣을 수 있는 Blob 형태
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def open_image(fp):
+    from PIL import Image
+
+    return Image.open(fp)
+
+
+def is_monochrome(image, tolerance=MONOCHROME_TOLERANCE):
+    if image.mode in ("1", "L", "LA", "I", "F"):
+        return True
+    sample = image.convert("RGB")
+    sample.thumbnail((128, 128))
+    for r, g, b in sample.getdata():
+        if max(r, g, b) - min(r, g, b) > tolerance:
+            return False
+    return True
+
+
+def normalize_image(image, max_edge=DEFAULT_MAX_EDGE, fmt=DEFAULT_FORMAT, quality=DEFAULT_QUALITY, original_bytes=None):
+    from PIL import Image, ImageOps
+
+    start = time.perf_counter()
+    fmt = fmt.upper()
+
+    if original_bytes is None:
+        original_bytes = image.width * image.height * len(image.getbands())
+
+    image = ImageOps.exif_transpose(image)
+
+    if is_monochrome(image):
+        image = image.convert("L")
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    data = buffer.getvalue()
+
+    elapsed = time.perf_counter() - start
+    prepared = PreparedImage(image, data, MIME_TYPES[fmt], original_bytes, elapsed)
+    logger.info(
+        "normalized image %dx%d %s: %d -> %d bytes (saved %d) in %.1f ms",
+        image.width, image.height, image.mode,
+        original_bytes, len(data), prepared.saved_bytes, elapsed * 1000,
+    )
+    return prepared
+
+
+def normalize_upload(uploaded_file, **kwargs):
+    original_bytes = uploaded_file.size if hasattr(uploaded_file, "size") else None
+    return normalize_image(open_image(uploaded_file), original_bytes=original_bytes, **kwargs)
+
+
+def preview_image(image, width=PREVIEW_WIDTH):
+    # 화면의 미리보기 칸은 좁기 때문에 그 폭에 맞는 사본만 브라우저로 보냅니다.
+    preview = image.copy()
+    preview.thumbnail((width, width * 4))
+    return preview
+
+
+def preview_bytes(image, width=PREVIEW_WIDTH, quality=PREVIEW_QUALITY):
+    # 미리보기는 progressive JPEG 로 보냅니다: 작고, 느린 모바일 회선에서도 흐린 전체 모습이 먼저 뜹니다.
+    # (WebP 는 st.image 가 PNG 로 다시 인코딩하므로 쓰지 않습니다.)
+    buffer = io.BytesIO()
+    preview_image(image, width).save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
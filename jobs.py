@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# ==========================================
+# 백그라운드 작업 큐 (SQLite 브로커)
+# ==========================================
+# 제출 버튼은 작업 ID 만 받고 바로 돌아가고, 실제 Gemini 호출은 워커 스레드가 처리합니다.
+# 작업 상태/결과는 SQLite 파일에 남기 때문에 새로고침이나 세션이 바뀌어도 ID 로 다시 찾을 수 있습니다.
+# 같은 파일을 보는 여러 서버 프로세스가 있어도 작업은 한 워커만 가져갑니다.
+
+DEFAULT_JOBS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        handler,
+        path=DEFAULT_JOBS_PATH,
+        workers=4,
+        poll_interval=0.2,
+        progress_interval=0.5,
+        stale_after=120.0,
+        retention_seconds=3 * 24 * 3600,
+    ):
+        # handler(job, progress) -> 결과 텍스트. progress(text) 로 중간 결과를 남길 수 있습니다.
+        self.handler = handler
+        self.path = path
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.stale_after = stale_after
+        self.retention_seconds = retention_seconds
+        self.wakeup = threading.Event()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, blob BLOB,"
+                " status TEXT NOT NULL, partial TEXT, result TEXT, error TEXT,"
+                " created REAL NOT NULL, started REAL, heartbeat REAL, finished REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created)")
+        self.threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def submit(self, kind, params, blob=None):
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, blob, status, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), blob, QUEUED, time.time()),
+            )
+        finally:
+            conn.close()
+        self.wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, kind, params, status, partial, result, error, created, started, finished"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        keys = ("id", "kind", "params", "status", "partial", "result", "error", "created", "started", "finished")
+        job = dict(zip(keys, row))
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def position(self, job_id):
+        # 대기 중이면 앞에 몇 개가 있는지 (1 부터), 아니면 None
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT status, created FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] != QUEUED:
+                return None
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?", (QUEUED, row[1])
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return ahead + 1
+
+    def _claim(self):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # 서버가 죽어 멈춘 작업은 다시 대기열로 돌립니다.
+            conn.execute(
+                "UPDATE jobs SET status = ? WHERE status = ? AND heartbeat < ?",
+                (QUEUED, RUNNING, now - self.stale_after),
+            )
+            row = conn.execute(
+                "SELECT id, kind, params, blob FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started = ?, heartbeat = ? WHERE id = ?",
+                    (RUNNING, now, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "params": json.loads(row[2]), "blob": row[3]}
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def _cleanup(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+                (time.time() - self.retention_seconds,),
+            )
+        finally:
+            conn.close()
+
+    def _run(self, job):
+        last = [0.0]
+        stop = threading.Event()
+
+        def beat():
+            # 첫 조각이 오기 전(스케줄러/예산 대기, 1단계 추출)에도 살아 있다고 알려 다른 워커가 가져가지 않게 합니다.
+            while not stop.wait(self.stale_after / 4):
+                try:
+                    self._update(job["id"], heartbeat=time.time())
+                except sqlite3.Error:
+                    pass
+
+        heartbeat = threading.Thread(target=beat, name=f"job-heartbeat-{job['id'][:8]}", daemon=True)
+        heartbeat.start()
+
+        def progress(text):
+            now = time.time()
+            if now - last[0] >= self.progress_interval:
+                last[0] = now
+                self._update(job["id"], partial=text, heartbeat=now)
+
+        try:
+            result = self.handler(job, progress)
+        except Exception as e:
+            self._update(job["id"], status=FAILED, error=str(e), finished=time.time())
+        else:
+            self._update(job["id"], status=DONE, result=result, partial=None, finished=time.time())
+        finally:
+            stop.set()
+
+    def _work(self):
+        idle_rounds = 0
+        while True:
+            try:
+                job = self._claim()
+            except sqlite3.OperationalError:
+                job = None
+            if job is None:
+                idle_rounds += 1
+                if idle_rounds % 3000 == 0:
+                    try:
+                        self._cleanup()
+                    except sqlite3.Error:
+                        pass
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+                continue
+            try:
+                self._run(job)
+            except Exception:
+                # 결과 기록이 실패해도 워커는 살려 둡니다. 멈춘 작업은 하트비트가 끊겨 다시 대기열로 돌아갑니다.
+                pass
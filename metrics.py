@@ -0,0 +1,166 @@
+import bisect
+import contextlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# 단계별 지연 측정 (프로세스 안 히스토그램)
+# ==========================================
+# with span("decode"): ... 처럼 앱의 각 단계를 감싸면 걸린 시간이 단계별 히스토그램에 쌓입니다.
+# 측정 비용은 perf_counter 두 번 + 잠금 한 번 + 이분 탐색 한 번이라 요청 시간에 비해 무시할 수 있습니다.
+# 결과는 Prometheus 텍스트 형식으로 파일에 쓰거나 로컬 HTTP(/metrics)로 내보냅니다 (외부 서비스 불필요).
+# 테스트에서는 Registry() 를 따로 만들어 span(..., registry=...) 로 넘기면 됩니다.
+
+METRIC_NAME = "super_parents_stage_seconds"
+
+# 초 단위 버킷 (수 ms 단위의 로컬 처리부터 수십 초짜리 모델 호출까지)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+DEFAULT_METRICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "metrics.prom")
+
+
+def percentile(values, q):
+    # 표본에서 바로 구하는 분위수 (가장 가까운 순위). 벤치마크와 라우터의 최근 지연 창에서 씁니다. 비어 있으면 None.
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        # 버킷 안에서는 선형 보간한 근삿값입니다 (Prometheus histogram_quantile 과 같은 방식).
+        counts, _, count = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets, counts):
+            if seen + bucket_count >= rank and bucket_count:
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+
+class Registry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def summary(self):
+        rows = []
+        for stage, histogram in sorted(self.histograms.items()):
+            _, total, count = histogram.snapshot()
+            if count:
+                rows.append({
+                    "stage": stage,
+                    "count": count,
+                    "mean_ms": total / count * 1000,
+                    "p50_ms": histogram.quantile(0.50) * 1000,
+                    "p95_ms": histogram.quantile(0.95) * 1000,
+                })
+        return rows
+
+    def render_prometheus(self):
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each stage of the homework flow.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for upper, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{upper}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=DEFAULT_METRICS_PATH):
+        # node_exporter textfile collector 처럼 읽는 쪽이 반쯤 쓴 파일을 보지 않도록 바꿔치기합니다.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+@contextlib.contextmanager
+def span(stage, registry=REGISTRY):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, time.perf_counter() - start)
+
+
+def start_file_exporter(path=DEFAULT_METRICS_PATH, interval=15.0, registry=REGISTRY):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                registry.write_prometheus(path)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=run, name="metrics-file-exporter", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_http_exporter(port, host="127.0.0.1", registry=REGISTRY):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http-exporter", daemon=True).start()
+    return server
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# ==========================================
+# 유사 이미지(near-duplicate) 인덱스
+# ==========================================
+# 같은 반 부모님들이 같은 학습지를 다시 저장/축소/밝기만 바꿔 올리는 경우가 있습니다.
+# 바이트 해시로는 안 맞기 때문에 256비트 DCT pHash 로 후보를 찾고, 작은 흑백 썸네일을 직접 비교해서 확인합니다.
+# 해시만으로는 안 됩니다: 같은 양식에 숫자만 다른 학습지는 전체 모양이 같아서 해시가 거의 같고,
+# 그 답을 재사용하면 다른 학습지의 문제와 정답을 보여주게 됩니다. 썸네일의 8x8 블록별 차이 중
+# 가장 큰 값을 보면 숫자 몇 개만 바뀐 곳이 드러납니다 (bench_phash.py 의 같은 양식 세트는 절대 맞으면 안 됩니다).
+#
+# 검색은 multi-index hashing 입니다. 256비트를 (max_distance + 1) 개 구간으로 나누면
+# 거리가 max_distance 이하인 두 해시는 적어도 한 구간이 완전히 같습니다(비둘기집 원리).
+# 그래서 구간별 dict 조회로 후보만 뽑고, 후보들만 실제 해밍 거리와 썸네일을 비교합니다.
+# 썸네일(~48KB)은 SQLite 에만 두고 후보가 나왔을 때만 읽습니다.
+
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+DCT_SIZE = 64
+THUMB_SIZE = (192, 256)
+THUMB_BLOCK = 8
+DEFAULT_MAX_DISTANCE = 2
+# 같은 사진을 다시 인코딩/축소한 경우 ~17 이하, 같은 양식에 숫자만 다른 학습지는 22 이상이었습니다.
+DEFAULT_MAX_PIXEL_DIFF = 14.0
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "phash.sqlite3")
+
+_DCT = np.cos(np.pi * (2 * np.arange(DCT_SIZE)[None, :] + 1) * np.arange(DCT_SIZE)[:, None] / (2 * DCT_SIZE))
+
+
+class Fingerprint:
+    def __init__(self, value, thumb):
+        self.value = value
+        self.thumb = thumb
+
+
+def phash(image):
+    # 64x64 흑백의 2차원 DCT 에서 저주파 16x16 계수를 중앙값과 비교합니다 (256비트).
+    pixels = np.asarray(image.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def thumbnail(image):
+    # 밝기/대비 차이는 autocontrast 로 맞춥니다.
+    return ImageOps.autocontrast(image.convert("L").resize(THUMB_SIZE, Image.BOX)).tobytes()
+
+
+def thumbnail_distance(a, b):
+    # 블록별 평균 밝기 차이 중 최댓값 (0~255). 숫자 하나만 달라도 그 블록이 크게 튑니다.
+    w, h = THUMB_SIZE
+    diff = np.abs(
+        np.frombuffer(a, dtype=np.uint8).astype(np.int16) - np.frombuffer(b, dtype=np.uint8).astype(np.int16)
+    ).reshape(h // THUMB_BLOCK, THUMB_BLOCK, w // THUMB_BLOCK, THUMB_BLOCK)
+    return float(diff.mean(axis=(1, 3)).max())
+
+
+def fingerprint(image):
+    return Fingerprint(phash(image), thumbnail(image))
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def band_masks(max_distance, bits=HASH_BITS):
+    bands = max_distance + 1
+    masks = []
+    start = 0
+    for i in range(bands):
+        width = bits // bands + (1 if i < bits % bands else 0)
+        masks.append(((1 << width) - 1) << start)
+        start += width
+    return masks
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_distance=DEFAULT_MAX_DISTANCE, max_pixel_diff=DEFAULT_MAX_PIXEL_DIFF):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_pixel_diff = max_pixel_diff
+        self.masks = band_masks(max_distance)
+        # (scope, 구간 번호, 구간 값) -> [(hash, answer_key, 행 번호), ...]
+        self.buckets = {}
+        # 파일이 없을 때만 썸네일을 메모리에 둡니다 (행 번호 -> 썸네일).
+        self.thumbs = {}
+        self.loaded_rowid = 0
+        self.lock = threading.Lock()
+        if path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._connect() as conn:
+                # 예전 64비트 dHash 테이블(hashes)은 같은 양식의 다른 학습지를 구분하지 못해서 읽지 않습니다.
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS fingerprints ("
+                    " id INTEGER PRIMARY KEY, scope TEXT NOT NULL, hash BLOB NOT NULL,"
+                    " thumb BLOB NOT NULL, answer_key TEXT NOT NULL)"
+                )
+            self._sync()
+
+    def __len__(self):
+        return sum(len(v) for (scope, band, _), v in self.buckets.items() if band == 0)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _add_memory(self, scope, value, answer_key, rowid):
+        for band, mask in enumerate(self.masks):
+            self.buckets.setdefault((scope, band, value & mask), []).append((value, answer_key, rowid))
+
+    def _sync(self):
+        # 다른 프로세스가 추가한 행만 읽어옵니다.
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, scope, hash, answer_key FROM fingerprints WHERE id > ? ORDER BY id", (self.loaded_rowid,)
+            ).fetchall()
+        finally:
+            conn.close()
+        with self.lock:
+            for rowid, scope, value, answer_key in rows:
+                if rowid > self.loaded_rowid:
+                    self._add_memory(scope, int.from_bytes(value, "big"), answer_key, rowid)
+                    self.loaded_rowid = rowid
+
+    def _thumb(self, rowid):
+        if self.path is None:
+            return self.thumbs[rowid]
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT thumb FROM fingerprints WHERE id = ?", (rowid,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def add(self, scope, fp, answer_key):
+        if self.path is None:
+            with self.lock:
+                self.loaded_rowid += 1
+                self.thumbs[self.loaded_rowid] = fp.thumb
+                self._add_memory(scope, fp.value, answer_key, self.loaded_rowid)
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO fingerprints (scope, hash, thumb, answer_key) VALUES (?, ?, ?, ?)",
+                    (scope, fp.value.to_bytes(HASH_BITS // 8, "big"), fp.thumb, answer_key),
+                )
+        finally:
+            conn.close()
+        self._sync()
+
+    def candidates(self, scope, value, max_distance=None):
+        # 해밍 거리가 가까운 순서의 [(거리, answer_key, 행 번호), ...] (썸네일 확인 전)
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        found = {}
+        with self.lock:
+            for band, mask in enumerate(self.masks):
+                for candidate, answer_key, rowid in self.buckets.get((scope, band, value & mask), ()):
+                    distance = hamming(candidate, value)
+                    if distance <= max_distance:
+                        found[rowid] = (distance, answer_key, rowid)
+        return sorted(found.values())
+
+    def lookup(self, scope, fp, max_distance=None, sync=True):
+        # 썸네일까지 확인된 가장 가까운 (거리, answer_key) 를 돌려주고, 없으면 None
+        if sync and self.path is not None:
+            self._sync()
+        for distance, answer_key, rowid in self.candidates(scope, fp.value, max_distance):
+            thumb = self._thumb(rowid)
+            if thumb is not None and thumbnail_distance(thumb, fp.thumb) <= self.max_pixel_diff:
+                return distance, answer_key
+        return None
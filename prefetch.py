@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# 추측 실행 (업로드하자마자 미리 분석)
+# ==========================================
+# 부모님은 사진을 올리고 미리보기를 본 뒤에야 버튼을 누릅니다. 그 몇 초 동안 미리 분석을 시작해 두고,
+# 버튼을 누르면 이미 돌고 있는 요청에 붙습니다. 사진이나 언어가 바뀌면 이전 요청은
+# 아직 시작 전이면 취소하고, 이미 보냈다면 결과를 버립니다 (낭비된 호출로 셉니다).
+# 키는 (세션, 이미지 해시, 부모 언어, 숙제 언어, ...) 처럼 요청한 세션과 내용을 그대로 담은 튜플입니다.
+# 세션을 키에 넣어서, 추측 실행을 버리거나(discard) 가져가는(attach) 것은 시작한 세션만 할 수 있습니다.
+
+
+class Speculation:
+    def __init__(self, future):
+        self.future = future
+        self.started = time.monotonic()
+        self.finished = None
+
+
+class Prefetcher:
+    def __init__(self, workers=4, max_age=600.0):
+        self.max_age = max_age
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.lock = threading.Lock()
+        self.running = {}
+        self.stats = {"started": 0, "used": 0, "cancelled": 0, "wasted": 0, "saved_seconds": 0.0}
+
+    def _prune(self, now):
+        # 탭을 닫아 아무도 찾아가지 않은 결과는 오래되면 버립니다.
+        for key, speculation in list(self.running.items()):
+            if speculation.finished is not None and now - speculation.finished > self.max_age:
+                del self.running[key]
+                self.stats["wasted"] += 1
+
+    def start(self, key, fn):
+        with self.lock:
+            self._prune(time.monotonic())
+            if key in self.running:
+                return
+            speculation = Speculation(self.pool.submit(fn))
+            self.running[key] = speculation
+            self.stats["started"] += 1
+        speculation.future.add_done_callback(lambda _: setattr(speculation, "finished", time.monotonic()))
+
+    def discard(self, key):
+        with self.lock:
+            speculation = self.running.pop(key, None)
+            if speculation is None:
+                return
+            if speculation.future.cancel():
+                self.stats["cancelled"] += 1
+            else:
+                self.stats["wasted"] += 1
+
+    def attach(self, key):
+        # 미리 시작한 요청이 있으면 끝날 때까지 기다려 결과를 돌려주고, 없으면 None
+        with self.lock:
+            speculation = self.running.pop(key, None)
+        if speculation is None:
+            return None
+        if speculation.future.cancel():
+            with self.lock:
+                self.stats["cancelled"] += 1
+            return None
+        # 버튼을 누른 시점까지 이미 진행된 시간만큼 기다림이 줄어듭니다.
+        attached = time.monotonic()
+        saved = (speculation.finished or attached) - speculation.started
+        try:
+            result = speculation.future.result()
+        except Exception:
+            result = None
+        with self.lock:
+            self.stats["used"] += 1
+            self.stats["saved_seconds"] += saved
+        return result
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self.running)
+        return stats
@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+from PIL import Image
+
+# ==========================================
+# 사진 품질 검사 (API 호출 전)
+# ==========================================
+# 흐리거나 빛 반사가 심한 사진은 30초를 기다려도 쓸모없는 답이 나옵니다.
+# 그래서 PIL 이미지를 NumPy 로 빠르게(~수십 ms) 검사해서 다시 찍도록 먼저 안내합니다.
+# - 선명도: 라플라시안 분산
+# - 노출/반사: 밝기 평균, 종이보다 하얗게 날아간 픽셀 비율, 글씨와 종이의 대비
+# - 글자 크기: 행 투영(projection)으로 찾은 글줄 높이의 중앙값
+
+ANALYSIS_EDGE = 1024
+
+DEFAULT_THRESHOLDS = {
+    "sharpness_reject": 25.0,
+    "sharpness_warn": 80.0,
+    "dark_reject": 70.0,
+    "dark_warn": 100.0,
+    "glare_reject": 0.20,
+    "glare_warn": 0.05,
+    "contrast_warn": 80.0,
+    "text_height_warn": 8.0,
+}
+
+REJECT, WARN = "reject", "warn"
+
+
+class QualityReport:
+    def __init__(self, metrics, issues, elapsed):
+        self.metrics = metrics
+        self.issues = issues
+        self.elapsed = elapsed
+
+    @property
+    def rejected(self):
+        return any(level == REJECT for level, _ in self.issues)
+
+    @property
+    def ok(self):
+        return not self.issues
+
+
+def to_gray_array(image, edge=ANALYSIS_EDGE):
+    gray = image.convert("L")
+    scale = 1.0
+    if max(gray.size) > edge:
+        scale = edge / max(gray.size)
+        gray = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))), Image.BILINEAR)
+    return np.asarray(gray, dtype=np.float32), scale
+
+
+def laplacian_variance(gray):
+    lap = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def glare_fraction(gray):
+    # 종이 전체가 하얗게 찍힌 스캔 같은 사진은 정상입니다.
+    # 종이 바탕(중앙값)보다 확실히 더 밝게 날아간 부분만 반사로 셉니다.
+    paper = float(np.median(gray))
+    cut = max(250.0, paper + 15.0)
+    if cut > 255.0:
+        return 0.0
+    return float((gray >= cut).mean())
+
+
+def median_text_height(gray):
+    # 평균보다 충분히 어두운 픽셀을 잉크로 보고, 잉크가 있는 행이 이어지는 구간을 글줄로 봅니다.
+    ink = gray < (gray.mean() - max(gray.std(), 1.0))
+    rows = ink.mean(axis=1) > 0.01
+    heights = []
+    run = 0
+    for has_ink in rows:
+        if has_ink:
+            run += 1
+        elif run:
+            heights.append(run)
+            run = 0
+    if run:
+        heights.append(run)
+    heights = [h for h in heights if h >= 2]
+    if not heights:
+        return 0.0
+    return float(np.median(heights))
+
+
+def check_quality(image, thresholds=None):
+    start = time.perf_counter()
+    t = dict(DEFAULT_THRESHOLDS)
+    if thresholds:
+        t.update(thresholds)
+
+    gray, scale = to_gray_array(image)
+    metrics = {
+        "sharpness": laplacian_variance(gray),
+        "brightness": float(gray.mean()),
+        # 글씨(가장 어두운 1%)와 종이(밝은 쪽 95%) 사이의 밝기 차이
+        "contrast": float(np.percentile(gray, 95) - np.percentile(gray, 1)),
+        "glare": glare_fraction(gray),
+        # 글줄 높이는 원본(정규화된 이미지) 픽셀 기준으로 환산합니다.
+        "text_height": median_text_height(gray) / scale,
+    }
+
+    issues = []
+    if metrics["sharpness"] < t["sharpness_reject"]:
+        issues.append((REJECT, "The photo is blurry. Hold the phone steady and take it again."))
+    elif metrics["sharpness"] < t["sharpness_warn"]:
+        issues.append((WARN, "The photo looks a little blurry. Some words may be misread."))
+
+    if metrics["brightness"] < t["dark_reject"]:
+        issues.append((REJECT, "The photo is too dark. Turn on a light and take it again."))
+    elif metrics["brightness"] < t["dark_warn"]:
+        issues.append((WARN, "The photo is quite dark."))
+
+    if metrics["glare"] > t["glare_reject"]:
+        issues.append((REJECT, "Strong glare is hiding the page. Tilt the phone or move away from the lamp."))
+    elif metrics["glare"] > t["glare_warn"]:
+        issues.append((WARN, "There is some glare on the page."))
+
+    if metrics["contrast"] < t["contrast_warn"]:
+        issues.append((WARN, "The page looks washed out (low contrast)."))
+
+    if 0 < metrics["text_height"] < t["text_height_warn"]:
+        issues.append((WARN, "The text is very small. Move closer so the page fills the photo."))
+
+    return QualityReport(metrics, issues, time.perf_counter() - start)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+# ==========================================
+# 결과 캐시 (디스크 기반 LRU + TTL)
+# ==========================================
+# 같은 숙제 사진을 다시 올리거나 버튼을 두 번 눌러도 Gemini 를 다시 호출하지 않도록
+# 답변을 로컬 SQLite 파일에 저장합니다. 파일 하나를 여러 세션/프로세스가 함께 씁니다.
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results.sqlite3")
+
+COUNTERS = ("hits", "misses", "evictions", "expired")
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def image_fingerprint(image):
+    # 파일 포맷/EXIF 가 달라도 픽셀이 같으면 같은 키가 나오도록 디코딩된 픽셀로 해시합니다.
+    h = hashlib.sha256()
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode("ascii"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def make_key(image_hash, parent_lang, homework_lang, model_name, prompt_hash):
+    parts = [image_hash, parent_lang, homework_lang, model_name, prompt_hash]
+    return hash_text("\x1f".join(parts))
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=500, max_bytes=50 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [(c,) for c in COUNTERS])
+
+    def _connect(self):
+        # 연결은 호출마다 새로 엽니다. 스레드/프로세스 사이에 공유해도 안전하고 비용도 작습니다.
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _bump(self, conn, name, amount=1):
+        if amount:
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bump(conn, "expired")
+                row = None
+            if row is None:
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+            return row[0]
+        finally:
+            conn.close()
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _evict(self, conn, now):
+        # 만료된 항목을 먼저 지우고, 그래도 한도를 넘으면 가장 오래 안 쓴 것부터 지웁니다.
+        expired = conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+        self._bump(conn, "expired", expired)
+
+        evicted = 0
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        while count > self.max_entries or (total > self.max_bytes and count > 1):
+            key, size = conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 1").fetchone()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        self._bump(conn, "evictions", evicted)
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            result = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        finally:
+            conn.close()
+        result["entries"] = count
+        result["bytes"] = total
+        return result
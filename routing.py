@@ -0,0 +1,229 @@
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend import MODEL_NAME
+from metrics import percentile
+from scheduler import CallCancelled, is_timeout
+
+# ==========================================
+# 모델 등급 라우팅 + 헤지 요청
+# ==========================================
+# 등급 표(가벼운 모델 -> 무거운 모델 순서)를 위에서부터 보고, 조건(블록 수, 문제 수)에 맞는 첫 등급으로 보냅니다.
+# 시간 초과나 오류가 나면 표의 다음 등급으로 넘어갑니다.
+# 한 등급 안에서는 첫 응답(스트리밍이면 첫 청크)이 그 등급의 관측 p95 안에 오지 않으면
+# 같은 요청을 한 번 더 보내고(헤지) 먼저 도착한 쪽을 씁니다. 늦은 쪽은 결과를 버립니다.
+# 헤지/마감 시계는 스케줄러가 요청을 처음 내보낸 뒤(첫 generate_content 시작)부터 잽니다.
+# 처음 내보내기 전(대기열, 토큰 버킷)에는 헤지도 다음 등급으로의 전환도 하지 않고,
+# 그 뒤의 재시도(429/5xx 백오프 포함)는 같은 마감 안에서 이어집니다.
+# 시간 초과는 스케줄러에서 재시도하지 않고(retry_timeouts=False) 바로 다음 등급으로 넘깁니다.
+# 회로 차단기에는 표의 모든 등급이 시간 초과로 실패했을 때 한 번만 셉니다.
+
+DEFAULT_TIERS = (
+    {"name": "lite", "model": "gemini-2.5-flash-lite", "max_blocks": 1, "max_questions": 1, "deadline": 30.0},
+    {"name": "standard", "model": MODEL_NAME, "deadline": 90.0},
+)
+
+# 표에서 조건으로 쓸 수 있는 키와, 그 값을 비교할 요청 특징
+LIMITS = {"max_blocks": "blocks", "max_questions": "questions"}
+
+WINDOW = 500
+MIN_SAMPLES = 20
+# 요청이 아직 대기열에 있는지 다시 확인하는 간격 (초)
+POLL_INTERVAL = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Attempt:
+    # 보낸 요청 하나. admitted 는 스케줄러가 처음 내보낸 시각이고, 그 전(대기열)에는 None 입니다.
+    # 재시도해도 바뀌지 않습니다. cancelled 가 켜지면 대기 중인 요청은 보내지 않습니다.
+    def __init__(self):
+        self.admitted = None
+        self.cancelled = False
+
+    def run(self, fn):
+        # 스케줄러가 내보낸 뒤에 부르는 부분 (scheduler.call 에 넘기는 함수 안에서 씁니다).
+        if self.cancelled:
+            raise CallCancelled("A faster copy of this request already answered.")
+        if self.admitted is None:
+            self.admitted = time.monotonic()
+        return fn()
+
+    def remaining(self, deadline):
+        # 처음 내보낸 뒤 남은 마감 시간 (재시도의 SDK 타임아웃에 씁니다)
+        if self.admitted is None:
+            return deadline
+        return max(0.0, deadline - (time.monotonic() - self.admitted))
+
+
+class LatencyStats:
+    def __init__(self, window=WINDOW):
+        self.first = collections.deque(maxlen=window)
+        self.total = collections.deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record_first(self, seconds):
+        with self.lock:
+            self.first.append(seconds)
+
+    def record_total(self, seconds):
+        with self.lock:
+            self.total.append(seconds)
+
+    def hedge_delay(self, default):
+        # 표본이 적을 때는 설정값을 쓰고, 충분히 모이면 첫 응답 시간의 p95 를 씁니다.
+        with self.lock:
+            if len(self.first) < MIN_SAMPLES:
+                return default
+            return percentile(self.first, 0.95)
+
+    def summary(self):
+        with self.lock:
+            first, total = list(self.first), list(self.total)
+        return {
+            "count": len(total),
+            "first_p50": percentile(first, 0.50),
+            "p50": percentile(total, 0.50),
+            "p95": percentile(total, 0.95),
+            "p99": percentile(total, 0.99),
+        }
+
+
+def eligible(tier, features):
+    # 조건이 없는 등급은 항상 가능. 조건이 있으면 알 수 있는 특징이 하나 이상 있어야 하고 모두 한도 안이어야 합니다.
+    limits = [(key, feature) for key, feature in LIMITS.items() if key in tier]
+    if not limits:
+        return True
+    known = [(tier[key], features[feature]) for key, feature in limits if features.get(feature) is not None]
+    return bool(known) and all(value <= limit for limit, value in known)
+
+
+class Router:
+    def __init__(
+        self, tiers=DEFAULT_TIERS, hedge_after=10.0, hedging=True, default_deadline=90.0, workers=32, breaker=None
+    ):
+        self.tiers = [dict(tier) for tier in tiers]
+        # 스케줄러와 같은 회로 차단기. 모든 등급이 시간 초과로 끝났을 때만 실패로 셉니다.
+        self.breaker = breaker
+        self.hedge_after = hedge_after
+        self.hedging = hedging
+        self.default_deadline = default_deadline
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-call")
+        self.latency = {tier["name"]: LatencyStats() for tier in self.tiers}
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def chain(self, features):
+        # 조건에 맞는 첫 등급부터 표의 끝까지가 대체(fallback) 순서입니다.
+        for i, tier in enumerate(self.tiers):
+            if eligible(tier, features):
+                return self.tiers[i:]
+        return self.tiers[-1:]
+
+    def call(self, start, features=None, discard=None):
+        # start(tier, attempt) -> (first, rest). first 는 첫 응답(또는 첫 청크), rest 는 나머지 청크 이터레이터나 None.
+        # start 는 실제 모델 호출을 attempt.run(...) 으로 감싸고, 대기 중에는 attempt.cancelled 를 확인해야 합니다.
+        # (tier 이름, first, rest) 를 돌려주고, rest 를 끝까지 읽으면 전체 지연이 기록됩니다.
+        # discard(tier, first, rest): 이미 보냈지만 진 요청의 응답 (사용량 기록/스트림 닫기용).
+        errors = []
+        for i, tier in enumerate(self.chain(features or {})):
+            if i:
+                self._count("fallbacks")
+            try:
+                began, first, rest = self._hedged(tier, start, discard)
+            except Exception as e:
+                self._count(f"{tier['name']}_errors")
+                errors.append(e)
+                continue
+            return tier["name"], first, self._timed(tier, began, first, rest)
+        if self.breaker is not None and all(is_timeout(e) for e in errors):
+            self.breaker.record_failure()
+        raise errors[-1]
+
+    def _hedged(self, tier, start, discard=None):
+        stats = self.latency[tier["name"]]
+        deadline = float(tier.get("deadline", self.default_deadline))
+        hedge_after = stats.hedge_delay(float(tier.get("hedge_after", self.hedge_after)))
+        attempts = {}
+
+        def submit():
+            attempt = Attempt()
+            future = self.pool.submit(start, tier, attempt)
+            attempts[future] = attempt
+            return future
+
+        primary = submit()
+        pending = [primary]
+        hedged = not self.hedging
+        error = None
+        try:
+            while pending:
+                # 시계는 실제로 보낸 요청 중 가장 먼저 시작한 것부터 잽니다. 모두 대기 중이면 기다리기만 합니다.
+                admitted = [attempts[future].admitted for future in pending]
+                admitted = [began for began in admitted if began is not None]
+                timeout = POLL_INTERVAL
+                if admitted:
+                    elapsed = time.monotonic() - min(admitted)
+                    if elapsed >= deadline:
+                        self._count(f"{tier['name']}_timeouts")
+                        raise DeadlineExceeded(f"{tier['model']} gave no answer within {deadline:.0f} s")
+                    if not hedged and elapsed >= hedge_after:
+                        # 첫 응답이 p95 를 넘겼습니다. 같은 요청을 하나 더 보내 먼저 오는 쪽을 씁니다.
+                        hedged = True
+                        self._count("hedges")
+                        pending.append(submit())
+                    limit = deadline if hedged else min(deadline, hedge_after)
+                    timeout = min(timeout, max(0.0, limit - elapsed))
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    began = attempts[future].admitted
+                    stats.record_first(time.monotonic() - began)
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    first, rest = future.result()
+                    return began, first, rest
+            raise error
+        finally:
+            # 이겼거나 포기한 뒤: 아직 대기 중인 복사본은 보내지 않고, 이미 보낸 것은 discard 로 넘깁니다.
+            for future in pending:
+                attempts[future].cancelled = True
+                future.add_done_callback(lambda future: self._discard(tier, future, discard))
+
+    def _discard(self, tier, future, discard):
+        if future.cancelled() or future.exception() is not None:
+            return
+        first, rest = future.result()
+        if discard is not None:
+            discard(tier, first, rest)
+        elif rest is not None and hasattr(rest, "close"):
+            rest.close()
+
+    def _timed(self, tier, began, first, rest):
+        stats = self.latency[tier["name"]]
+        if rest is None:
+            stats.record_total(time.monotonic() - began)
+            return None
+
+        def chunks():
+            for chunk in rest:
+                yield chunk
+            stats.record_total(time.monotonic() - began)
+
+        return chunks()
+
+    def summary(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return {name: stats.summary() for name, stats in self.latency.items()}, counters
@@ -0,0 +1,212 @@
+import collections
+import itertools
+import random
+import threading
+import time
+
+# ==========================================
+# 공용 요청 스케줄러
+# ==========================================
+# 모든 세션의 Gemini 호출이 이 스케줄러 하나를 거칩니다.
+# - 토큰 버킷으로 RPM / TPM 쿼터 안에서만 요청을 내보냅니다.
+# - 세션 구분 없이 먼저 온 요청부터 처리하고(FIFO), 대기 순번을 알려줍니다.
+# - 429 / 5xx 는 지수 백오프 + 지터로 다시 시도합니다.
+# - 백엔드가 계속 실패하면 회로 차단기가 열려 한동안 바로 실패시킵니다.
+#   다시 닫을지는 시험 요청 하나로만 판단합니다 (half-open).
+# - 마감을 따로 관리하는 쪽(routing.Router)은 retry_timeouts=False 로 부릅니다.
+#   시간 초과는 재시도하지 않고 회로 차단기에도 세지 않은 채 바로 돌려주어, 다음 등급으로 넘어가게 합니다.
+
+RETRYABLE_CODES = (429, 500, 502, 503, 504)
+TIMEOUT_CODES = (504,)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CallCancelled(Exception):
+    # 대기열에 있는 동안 호출한 쪽이 더 이상 결과가 필요 없다고 알린 요청 (예: 헤지 복사본이 진 경우)
+    pass
+
+
+def is_retryable(error):
+    # google.api_core 예외는 HTTP 상태 코드를 .code 로 가지고 있습니다.
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_CODES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def is_timeout(error):
+    # 504 DEADLINE_EXCEEDED 와 SDK/소켓의 TimeoutError
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in TIMEOUT_CODES
+    return isinstance(error, TimeoutError)
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        # amount 만큼 꺼내려면 몇 초 기다려야 하는지 (0 이면 지금 가능)
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        # half-open 에서 내보낸 시험 요청의 시작 시각 (없으면 None)
+        self.probe_started = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        # 시험 요청으로 내보내면 True. half-open 에서는 시험 요청 하나만 통과시키고 나머지는 open 처럼 막습니다.
+        # 시험 요청이 reset_timeout 안에 끝나지 않으면 다음 요청이 다시 시험합니다.
+        with self.lock:
+            now = time.monotonic()
+            state = self._state(now)
+            probing = self.probe_started is not None and now - self.probe_started < self.reset_timeout
+            if state == "open" or (state == "half-open" and probing):
+                raise CircuitOpenError("The AI service is temporarily unavailable. Please try again in a minute.")
+            if state == "half-open":
+                self.probe_started = now
+                return True
+            return False
+
+    def release_probe(self):
+        # 시험 요청이 성공/실패 판정 없이 끝났을 때 (대기 중 취소, 요청 자체의 오류, 시간 초과)
+        with self.lock:
+            self.probe_started = None
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_failure(self):
+        with self.lock:
+            now = time.monotonic()
+            self.failures += 1
+            # half-open 상태에서 시험 요청이 실패하면 바로 다시 엽니다.
+            if self.failures >= self.failure_threshold or self._state(now) == "half-open":
+                self.opened_at = now
+            self.probe_started = None
+
+
+class Scheduler:
+    def __init__(self, rpm=1000, tpm=1_000_000, max_retries=4, base_delay=1.0, max_delay=30.0, breaker=None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.cond = threading.Condition()
+        self.queue = collections.deque()
+        self.tickets = itertools.count()
+        self.stats = collections.Counter()
+
+    def _count(self, name):
+        with self.cond:
+            self.stats[name] += 1
+
+    def queue_length(self):
+        with self.cond:
+            return len(self.queue)
+
+    def _acquire(self, estimated_tokens, on_wait, cancelled=None):
+        ticket = next(self.tickets)
+        with self.cond:
+            self.queue.append(ticket)
+        last_position = None
+        try:
+            while True:
+                if cancelled is not None and cancelled():
+                    self._count("cancelled")
+                    raise CallCancelled("The request was withdrawn while waiting in line.")
+                with self.cond:
+                    position = self.queue.index(ticket)
+                    if position == 0:
+                        now = time.monotonic()
+                        delay = max(
+                            self.requests.wait_time(1, now),
+                            self.tokens.wait_time(estimated_tokens, now),
+                        )
+                        if delay == 0:
+                            self.requests.take(1)
+                            self.tokens.take(estimated_tokens)
+                            return
+                    else:
+                        delay = None
+                # 콜백(화면 갱신 등)은 잠금 밖에서 부릅니다.
+                if on_wait is not None and position != last_position:
+                    on_wait(position + 1)
+                    last_position = position
+                with self.cond:
+                    self.cond.wait(timeout=min(delay, 1.0) if delay is not None else 1.0)
+        finally:
+            with self.cond:
+                self.queue.remove(ticket)
+                self.cond.notify_all()
+
+    def _backoff(self, attempt):
+        # full jitter: 0 ~ base * 2^attempt 사이에서 무작위
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, estimated_tokens=3000, on_wait=None, cancelled=None, retry_timeouts=True):
+        # cancelled: 대기 중에 확인할 함수. True 를 돌려주면 보내지 않고 CallCancelled 를 올립니다.
+        # retry_timeouts=False: 시간 초과는 재시도/회로 차단기 없이 바로 올립니다 (마감은 호출한 쪽이 관리).
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            try:
+                self._acquire(estimated_tokens, on_wait, cancelled)
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e) or (not retry_timeouts and is_timeout(e)):
+                    if probe:
+                        self.breaker.release_probe()
+                    if is_timeout(e):
+                        self._count("timeouts")
+                    raise
+                self._count("retryable_errors")
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    self._count("failed")
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            self._count("succeeded")
+            return result
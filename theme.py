@@ -0,0 +1,68 @@
+import os
+
+# ==========================================
+# 테마 (정적 CSS + 색상 변수)
+# ==========================================
+# 스타일시트(static/theme.css)와 헤더는 색상을 CSS 변수(var(--sp-*))로만 참조하는 고정 내용이라
+# 재실행/테마와 관계없이 매번 똑같습니다. 스타일시트는 정적 파일로 한 번만 받게 합니다.
+# 테마를 바꾸면 :root 의 변수 몇 개만 담은 작은 <style> 블록만 달라집니다.
+
+THEMES = {
+    "light": {
+        "bg": "#F3F4F6",
+        "text": "#1F2937",
+        "card": "#FFFFFF",
+        "border": "#E5E7EB",
+        "header": "#4F46E5",
+    },
+    "dark": {
+        "bg": "#0E1117",
+        "text": "#FAFAFA",
+        "card": "#262730",
+        "border": "#374151",
+        "header": "#312E81",
+    },
+}
+
+# 스타일시트 원본. Streamlit 정적 파일(.streamlit/config.toml 의 enableStaticServing)로 내보내서
+# 브라우저가 한 번 받아 캐시하고, 재실행마다 보내는 것은 @import 한 줄뿐입니다.
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "theme.css")
+STYLESHEET_URL = "app/static/theme.css"
+
+with open(STYLESHEET_PATH, encoding="utf-8") as f:
+    STATIC_CSS = f.read()
+
+HEADER_HTML = """
+<div class="custom-header">
+    <div style="font-size: 3rem; margin-bottom: 10px;">🦸‍♂️ ♡ 🦸‍♀️</div>
+    <h1>Super Parents<br>Heroes Across<br> Languages</h1>
+    <p style="margin-bottom: 10px;">
+        <span class="gold-text">No barrier beats a parent’s love.</span>
+    </p>
+    <p>
+        <span class="white-text">Understand in your language, teach with confidence.<br>Children may speak differently, <br>but they listen with their hearts.</span>
+    </p>
+</div>
+"""
+
+
+def theme_vars(colors):
+    declarations = " ".join(f"--sp-{name}: {value};" for name, value in colors.items())
+    return f"<style>:root {{ {declarations} }}</style>"
+
+
+def stylesheet(static_serving):
+    # 정적 파일을 쓸 수 있으면 @import 한 줄, 아니면 (설정 없이 띄운 경우) 스타일시트 전체를 넣습니다.
+    if static_serving:
+        return f'<style>@import url("{STYLESHEET_URL}");</style>'
+    return f"<style>{STATIC_CSS}</style>"
+
+
+# 스타일시트 태그와 테마별 변수 블록은 모듈을 읽을 때 한 번만 만듭니다.
+# 둘을 따로 그려서, 테마를 바꿀 때는 변수 블록 요소만 달라집니다.
+STYLESHEETS = {static_serving: stylesheet(static_serving) for static_serving in (True, False)}
+THEME_VARS = {name: theme_vars(colors) for name, colors in THEMES.items()}
+
+
+def theme_name(theme_mode):
+    return "dark" if "Dark" in theme_mode else "light"
@@ -0,0 +1,163 @@
+import numpy as np
+from PIL import Image
+
+# ==========================================
+# 빽빽한 학습지를 문제 블록으로 나누기
+# ==========================================
+# 한 번의 큰 요청은 문제를 건너뛰기도 하고 꼬리 지연도 가장 깁니다.
+# 페이지를 이진화해서 (1) 종이 영역을 찾고 (2) 기울기를 바로잡은 뒤
+# (3) 가로 투영(projection profile)의 빈 줄을 기준으로 위에서 아래로 문제 블록을 자릅니다.
+# 잘린 블록들은 작은 요청으로 동시에 보내고, 결과는 읽는 순서대로 다시 합칩니다.
+
+ANALYSIS_EDGE = 800
+DEFAULT_MAX_TILES = 6
+MIN_GAP_RATIO = 0.015      # 이보다 높은 빈 줄 구간에서 자릅니다 (페이지 높이 대비)
+MIN_BLOCK_RATIO = 0.04     # 이보다 낮은 블록은 이웃과 합칩니다
+PADDING_RATIO = 0.01
+SKEW_ANGLES = np.arange(-5.0, 5.01, 0.5)
+
+
+def otsu_threshold(gray):
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def ink_mask(image):
+    gray = np.asarray(image.convert("L"), dtype=np.uint8)
+    return gray < otsu_threshold(gray)
+
+
+def page_box(mask):
+    # 잉크가 있는 영역의 경계 상자 (y0, y1, x0, x1). 가장자리 잡티는 무시합니다.
+    rows = np.where(mask.mean(axis=1) > 0.002)[0]
+    cols = np.where(mask.mean(axis=0) > 0.002)[0]
+    if len(rows) == 0 or len(cols) == 0:
+        return 0, mask.shape[0], 0, mask.shape[1]
+    return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+def estimate_skew(mask):
+    # 글줄이 수평일 때 행 합계의 분산이 가장 커집니다.
+    small = Image.fromarray((mask * 255).astype(np.uint8))
+    best_angle, best_score = 0.0, -1.0
+    for angle in SKEW_ANGLES:
+        rotated = np.asarray(small.rotate(float(angle), resample=Image.NEAREST), dtype=np.float32)
+        score = float(rotated.sum(axis=1).var())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def split_rows(mask, min_gap, min_block):
+    rows = mask.mean(axis=1) > 0.002
+    segments = []
+    start, gap = None, 0
+    for y, has_ink in enumerate(rows):
+        if has_ink:
+            if start is None:
+                start = y
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap >= min_gap:
+                segments.append([start, y - gap + 1])
+                start, gap = None, 0
+    if start is not None:
+        segments.append([start, len(rows) - gap])
+
+    # 너무 낮은 블록(제목 한 줄 등)은 바로 아래 블록과 합칩니다.
+    merged = []
+    for segment in segments:
+        if merged and merged[-1][1] - merged[-1][0] < min_block:
+            merged[-1][1] = segment[1]
+        else:
+            merged.append(segment)
+    if len(merged) > 1 and merged[-1][1] - merged[-1][0] < min_block:
+        merged[-2][1] = merged.pop()[1]
+    return merged
+
+
+def limit_blocks(blocks, max_tiles):
+    # 블록이 너무 많으면 합쳤을 때 가장 작은 이웃 쌍부터 합칩니다.
+    blocks = [list(b) for b in blocks]
+    while len(blocks) > max_tiles:
+        i = min(range(len(blocks) - 1), key=lambda k: blocks[k + 1][1] - blocks[k][0])
+        blocks[i][1] = blocks.pop(i + 1)[1]
+    return blocks
+
+
+def find_blocks(image, max_tiles=DEFAULT_MAX_TILES):
+    # (기울기를 바로잡은 이미지, 축소 배율, 잉크 영역 상자, 축소 이미지 기준 블록 목록)
+    image = image.convert("RGB") if image.mode not in ("L", "RGB") else image
+    scale = min(1.0, ANALYSIS_EDGE / max(image.size))
+    small = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.BILINEAR)
+
+    angle = estimate_skew(ink_mask(small))
+    fill = 255 if image.mode == "L" else (255, 255, 255)
+    if angle:
+        image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+        small = small.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+        scale = small.width / image.width
+
+    mask = ink_mask(small)
+    y0, y1, x0, x1 = page_box(mask)
+    page_height = y1 - y0
+    blocks = split_rows(
+        mask[y0:y1, x0:x1],
+        min_gap=max(2, int(page_height * MIN_GAP_RATIO)),
+        min_block=max(4, int(page_height * MIN_BLOCK_RATIO)),
+    )
+    return image, scale, (y0, y1, x0, x1), limit_blocks(blocks, max_tiles)
+
+
+def count_blocks(image, max_tiles=DEFAULT_MAX_TILES):
+    # 모델 등급 라우팅용: 문제 블록이 몇 개로 보이는지만 셉니다.
+    return len(find_blocks(image, max_tiles)[3])
+
+
+def split_into_blocks(image, max_tiles=DEFAULT_MAX_TILES):
+    # 읽는 순서(위 -> 아래)의 PIL 이미지 목록. 나눌 수 없으면 페이지 하나만 돌려줍니다.
+    image, scale, (y0, y1, x0, x1), blocks = find_blocks(image, max_tiles)
+    pad = int(max(image.size) * PADDING_RATIO)
+    left = max(0, int(x0 / scale) - pad)
+    right = min(image.width, int(x1 / scale) + pad)
+    tiles = []
+    for top, bottom in blocks:
+        top = max(0, int((y0 + top) / scale) - pad)
+        bottom = min(image.height, int((y0 + bottom) / scale) + pad)
+        tiles.append(image.crop((left, top, right, bottom)))
+    return tiles or [image]
+
+
+def merge_extractions(parts):
+    # 블록별 1단계 JSON 을 읽는 순서대로 하나로 합칩니다. 어휘는 중복을 뺍니다.
+    merged = {
+        "subject": "",
+        "topic": "",
+        "homework_language": "",
+        "reading_summary": "",
+        "questions": [],
+        "vocabulary": [],
+    }
+    seen_terms = set()
+    for part in parts:
+        for key in ("subject", "topic", "homework_language"):
+            if not merged[key] and part.get(key):
+                merged[key] = part[key]
+        if part.get("reading_summary"):
+            merged["reading_summary"] = f"{merged['reading_summary']}\n{part['reading_summary']}".strip()
+        merged["questions"].extend(part.get("questions", []))
+        for item in part.get("vocabulary", []):
+            term = str(item.get("term", "")).strip().lower()
+            if term and term not in seen_terms:
+                seen_terms.add(term)
+                merged["vocabulary"].append(item)
+    return merged
@@ -0,0 +1,175 @@
+import collections
+import os
+import threading
+import time
+
+from image_prep import PreparedImage
+
+# ==========================================
+# 업로드 보관소 (디스크 스풀 + 메모리 예산)
+# ==========================================
+# 세션마다 정규화된 사진 바이트와 디코딩된 픽셀을 들고 있으면, 가만히 있는 부모님 수백 명만으로도
+# 서버 메모리가 GB 단위가 됩니다. 그래서 정규화된 바이트는 내용 해시 이름의 파일로 디스크에 쓰고,
+# 세션에는 해시/형식 같은 작은 정보(SpooledImage)만 남깁니다.
+# 자주 쓰는 바이트는 메모리에 올려두되 세션별/서버 전체 한도를 넘으면 가장 오래 안 쓴 것부터 내리고
+# (LRU, 가만히 있는 세션이 먼저 빠짐), 다시 필요하면 파일에서 읽습니다.
+
+DEFAULT_UPLOAD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "uploads")
+
+EXTENSIONS = {"image/jpeg": ".jpg", "image/webp": ".webp"}
+
+# 오래된 스풀 파일 정리는 이 간격보다 자주 하지 않습니다.
+PRUNE_INTERVAL = 600
+
+
+class UploadExpired(Exception):
+    # 스풀 파일이 정리되어 사진 바이트를 더 이상 읽을 수 없을 때
+    pass
+
+
+class SpooledImage(PreparedImage):
+    # PreparedImage 와 같은 모양이지만 바이트는 보관소에서, 픽셀은 필요할 때 그 바이트에서 읽습니다.
+    def __init__(self, store, session, sha256, mime_type, width, height, original_bytes, elapsed):
+        self._image = None
+        self.store = store
+        self.session = session
+        self.sha256 = sha256
+        self.mime_type = mime_type
+        self.size = (width, height)
+        self.original_bytes = original_bytes
+        self.elapsed = elapsed
+
+    @property
+    def data(self):
+        return self.store.read(self.session, self.sha256, self.mime_type)
+
+
+class UploadStore:
+    def __init__(self, path=DEFAULT_UPLOAD_PATH, session_limit=4 * 1024 * 1024, global_limit=128 * 1024 * 1024,
+                 max_age=24 * 3600):
+        # 한도는 메모리에 올려둔 바이트 기준입니다. 디스크 파일은 max_age 동안 안 읽히면 지웁니다.
+        self.path = path
+        self.session_limit = session_limit
+        self.global_limit = global_limit
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.hot = collections.OrderedDict()
+        self.session_bytes = collections.Counter()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.disk_reads = 0
+        self.last_prune = 0.0
+        os.makedirs(path, exist_ok=True)
+        self.prune()
+
+    def _file(self, sha256, mime_type):
+        return os.path.join(self.path, sha256 + EXTENSIONS.get(mime_type, ".bin"))
+
+    def put(self, session, prepared):
+        # 정규화된 사진을 스풀하고, 세션에 남길 SpooledImage 를 돌려줍니다.
+        # 디코딩된 픽셀은 여기서 놓아줍니다 (호출한 쪽도 prepared 를 더 들고 있지 않아야 합니다).
+        path = self._file(prepared.sha256, prepared.mime_type)
+        if not self._touch(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(prepared.data)
+            os.replace(tmp, path)
+        width, height = prepared.image.size
+        with self.lock:
+            self._admit(session, prepared.sha256, prepared.data)
+        prepared.release()
+        if time.monotonic() - self.last_prune > PRUNE_INTERVAL:
+            self.prune()
+        return SpooledImage(
+            self, session, prepared.sha256, prepared.mime_type, width, height,
+            prepared.original_bytes, prepared.elapsed,
+        )
+
+    def read(self, session, sha256, mime_type):
+        key = (session, sha256)
+        with self.lock:
+            data = self.hot.get(key)
+            if data is not None:
+                self.hot.move_to_end(key)
+        path = self._file(sha256, mime_type)
+        # 읽힌 파일은 (메모리에서 읽었더라도) 정리 대상에서 빠지도록 시간을 갱신합니다.
+        self._touch(path)
+        if data is not None:
+            return data
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise UploadExpired("This photo is no longer available. Please upload it again.") from None
+        with self.lock:
+            self.disk_reads += 1
+            self._admit(session, sha256, data)
+        return data
+
+    def _touch(self, path):
+        # 파일이 있으면 수정 시간을 지금으로 바꾸고 True, 없으면 False
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _admit(self, session, sha256, data):
+        key = (session, sha256)
+        if key in self.hot:
+            self.hot.move_to_end(key)
+            return
+        self.hot[key] = data
+        self.session_bytes[session] += len(data)
+        self.total_bytes += len(data)
+        # 방금 올린 것은 남기고, 같은 세션의 오래된 것 -> 서버 전체에서 오래된 것 순으로 내립니다.
+        while self.session_bytes[session] > self.session_limit:
+            oldest = next(k for k in self.hot if k[0] == session)
+            if oldest == key:
+                break
+            self._evict(oldest)
+        while self.total_bytes > self.global_limit and len(self.hot) > 1:
+            oldest = next(iter(self.hot))
+            if oldest == key:
+                break
+            self._evict(oldest)
+
+    def _evict(self, key):
+        data = self.hot.pop(key)
+        self.session_bytes[key[0]] -= len(data)
+        if self.session_bytes[key[0]] <= 0:
+            del self.session_bytes[key[0]]
+        self.total_bytes -= len(data)
+        self.evictions += 1
+
+    def forget(self, session, sha256):
+        # 세션에서 빠진 사진은 메모리에서만 내립니다. 파일은 다른 세션이 같은 사진을 쓸 수 있어 남깁니다.
+        with self.lock:
+            if (session, sha256) in self.hot:
+                self._evict((session, sha256))
+                self.evictions -= 1
+
+    def prune(self):
+        self.last_prune = time.monotonic()
+        cutoff = time.time() - self.max_age
+        with self.lock:
+            hot = {sha256 for _, sha256 in self.hot}
+        for name in os.listdir(self.path):
+            if name.split(".", 1)[0] in hot:
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hot_bytes": self.total_bytes,
+                "hot_entries": len(self.hot),
+                "sessions": len(self.session_bytes),
+                "evictions": self.evictions,
+                "disk_reads": self.disk_reads,
+            }
@@ -0,0 +1,208 @@
+import contextlib
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+# ==========================================
+# 토큰/비용 기록 + 예산
+# ==========================================
+# 모든 호출의 usage_metadata(프롬프트/이미지/출력 토큰)를 로컬 SQLite 에 추가만 하는 방식으로 남기고,
+# 언어 쌍 / 모델 / 프롬프트 버전별로 모아 봅니다 (app.py, app_20251120.py, _app.py 비교용).
+# 예산: 이미 쓴 토큰만으로 한도를 넘으면 바로 거절하고,
+# 지금 진행 중인 다른 요청들의 예상치 때문에 넘을 것 같으면 그 요청들이 끝날 때까지 잠시 기다립니다.
+
+DEFAULT_USAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "usage.sqlite3")
+
+# 100만 토큰당 USD (입력, 출력). secrets.toml 의 [prices] 로 바꿀 수 있습니다.
+DEFAULT_PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+_local = threading.local()
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def session_scope(session_id):
+    # 작업 큐 워커처럼 Streamlit 세션 밖에서 실행되는 호출을 원래 세션에 묶습니다.
+    previous = getattr(_local, "session", None)
+    _local.session = session_id
+    try:
+        yield
+    finally:
+        _local.session = previous
+
+
+def scoped_session():
+    return getattr(_local, "session", None)
+
+
+def today():
+    return datetime.date.today().isoformat()
+
+
+def usage_counts(response):
+    # generate_content 응답(스트리밍이면 마지막 청크)의 usage_metadata 에서 토큰 수를 꺼냅니다.
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return None
+    image_tokens = 0
+    for detail in getattr(meta, "prompt_tokens_details", None) or ():
+        modality = getattr(detail, "modality", "")
+        if "IMAGE" in str(getattr(modality, "name", modality)).upper():
+            image_tokens += int(getattr(detail, "token_count", 0) or 0)
+    prompt_tokens = int(getattr(meta, "prompt_token_count", 0) or 0)
+    output_tokens = int(getattr(meta, "candidates_token_count", 0) or 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "image_tokens": image_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": int(getattr(meta, "total_token_count", 0) or 0) or prompt_tokens + output_tokens,
+    }
+
+
+def cost_usd(model, prompt_tokens, output_tokens, prices=DEFAULT_PRICES):
+    price_in, price_out = prices.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class UsageStore:
+    def __init__(self, path=DEFAULT_USAGE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                " ts REAL NOT NULL, day TEXT NOT NULL, session TEXT NOT NULL,"
+                " parent_lang TEXT NOT NULL, homework_lang TEXT NOT NULL, model TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, image_tokens INTEGER NOT NULL,"
+                " output_tokens INTEGER NOT NULL, total_tokens INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS usage_day ON usage(day)")
+            conn.execute("CREATE INDEX IF NOT EXISTS usage_session ON usage(session)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, session, parent_lang, homework_lang, model, prompt_version, counts):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), today(), session, parent_lang or "", homework_lang or "", model, prompt_version,
+                    counts["prompt_tokens"], counts["image_tokens"], counts["output_tokens"], counts["total_tokens"],
+                ),
+            )
+        finally:
+            conn.close()
+
+    def day_total(self, day=None):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT COALESCE(SUM(total_tokens), 0) FROM usage WHERE day = ?", (day or today(),))
+            return row.fetchone()[0]
+        finally:
+            conn.close()
+
+    def session_total(self, session):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT COALESCE(SUM(total_tokens), 0) FROM usage WHERE session = ?", (session,))
+            return row.fetchone()[0]
+        finally:
+            conn.close()
+
+    def aggregate(self, since_day=None, prices=DEFAULT_PRICES):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT parent_lang, homework_lang, model, prompt_version, COUNT(*),"
+                " SUM(prompt_tokens), SUM(image_tokens), SUM(output_tokens), SUM(total_tokens)"
+                " FROM usage WHERE day >= ? GROUP BY parent_lang, homework_lang, model, prompt_version"
+                " ORDER BY SUM(total_tokens) DESC",
+                (since_day or "",),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                "languages": f"{homework} → {parent}" if parent else homework,
+                "model": model,
+                "prompt_version": version,
+                "calls": calls,
+                "prompt_tokens": prompt,
+                "image_tokens": image,
+                "output_tokens": output,
+                "total_tokens": total,
+                "cost_usd": round(cost_usd(model, prompt, output, prices), 4),
+            }
+            for parent, homework, model, version, calls, prompt, image, output, total in rows
+        ]
+
+
+class Budget:
+    def __init__(self, store, daily_limit=0, session_limit=0, max_wait=60.0):
+        # 한도가 0 이면 그 예산은 쓰지 않습니다.
+        self.store = store
+        self.daily_limit = daily_limit
+        self.session_limit = session_limit
+        self.max_wait = max_wait
+        self.cond = threading.Condition()
+        self.reserved = 0
+        self.reserved_by_session = {}
+
+    def check(self, session, tokens):
+        # 이미 기록된 사용량만으로 한도를 넘는지. 넘으면 이유를, 아니면 None 을 돌려줍니다.
+        if self.daily_limit and self.store.day_total() + tokens > self.daily_limit:
+            return "Today's AI budget for this service has been used up. Please try again tomorrow."
+        if self.session_limit and self.store.session_total(session) + tokens > self.session_limit:
+            return "You have reached the limit for this session. Please come back later."
+        return None
+
+    def _fits(self, session, tokens):
+        if self.daily_limit and self.store.day_total() + self.reserved + tokens > self.daily_limit:
+            return False
+        if self.session_limit:
+            pending = self.reserved_by_session.get(session, 0)
+            if self.store.session_total(session) + pending + tokens > self.session_limit:
+                return False
+        return True
+
+    def acquire(self, session, tokens):
+        # 예상 토큰만큼 예약합니다. 끝나면 (기록 후) release(session, tokens) 를 불러야 합니다.
+        if not self.daily_limit and not self.session_limit:
+            return
+        deadline = time.monotonic() + self.max_wait
+        with self.cond:
+            while True:
+                reason = self.check(session, tokens)
+                if reason:
+                    raise BudgetExceeded(reason)
+                if self._fits(session, tokens):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BudgetExceeded("The AI budget is almost used up. Please try again in a little while.")
+                self.cond.wait(timeout=min(remaining, 1.0))
+            self.reserved += tokens
+            self.reserved_by_session[session] = self.reserved_by_session.get(session, 0) + tokens
+
+    def release(self, session, tokens):
+        if not self.daily_limit and not self.session_limit:
+            return
+        with self.cond:
+            self.reserved -= tokens
+            self.reserved_by_session[session] -= tokens
+            if not self.reserved_by_session[session]:
+                del self.reserved_by_session[session]
+            self.cond.notify_all()